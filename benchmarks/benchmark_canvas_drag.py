@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""Repaint time per mouse move while dragging a vertex of a large shape.
+
+Drags a vertex of a polygon covering a quarter of a 4,000 x 4,000 image,
+on top of 1,000 and 10,000 polygons of 40 vertices, in a 1,000 x 1,000
+canvas. Each move repaints the area of the dragged shape, as
+Canvas.mouseMoveEvent does. Compares the canvas, which draws the shapes
+not being edited from a cached layer, against the former paintEvent
+drawing every shape in the repainted area, kept below as LegacyCanvas.
+"""
+
+from __future__ import print_function
+
+import time
+
+import numpy as np
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+from labelus.shape import Shape
+from labelus.widgets.canvas import Canvas
+from scene import make_scene
+
+
+class LegacyCanvas(Canvas):
+
+    def paintEvent(self, event):
+        p = self._painter
+        p.begin(self)
+        p.scale(self.scale, self.scale)
+        p.translate(self.offsetToCenter())
+        exposed = self.transformRect(event.rect())
+        source = exposed.toAlignedRect().intersected(self.pixmap.rect())
+        p.drawPixmap(source, self.pixmap, source)
+        Shape.scale = self.scale
+        margin = self.paintMargin()
+        for shape in self.shapesIn(
+                exposed.adjusted(-margin, -margin, margin, margin)):
+            if shape.selected or not self._hideBackround:
+                shape.fill = shape.selected or shape == self.hShape
+                shape.paint(p)
+        p.end()
+
+
+def make_canvas(cls, n_shapes):
+    canvas = make_scene(cls, n_shapes)
+    canvas.resize(1000, 1000)
+    large = Shape(label='large')
+    large.points = np.array([[500, 500], [2500, 500], [2500, 2500],
+                             [500, 2500]], dtype=float)
+    large.close()
+    canvas.loadShapes([large], replace=False)
+    canvas.show()
+    QtWidgets.QApplication.processEvents()
+    return canvas, large
+
+
+def drag(canvas, shape, n_moves=50):
+    canvas.hShape, canvas.hVertex = shape, 2
+    t = time.time()
+    for i in range(n_moves):
+        dirty = canvas.shapesRect([shape])
+        canvas.boundedMoveVertex(QtCore.QPointF(2500 + i, 2500 + i))
+        canvas.repaint(canvas.widgetRect(
+            dirty.united(canvas.shapesRect([shape]))))
+    return (time.time() - t) / n_moves
+
+
+def main():
+    app = QtWidgets.QApplication([])  # NOQA
+    print('{:>8s} {:>26s}'.format('shapes', 'ms per move'))
+    for n_shapes in [1000, 10000]:
+        times = []
+        for cls in [LegacyCanvas, Canvas]:
+            canvas, shape = make_canvas(cls, n_shapes)
+            times.append(drag(canvas, shape))
+            canvas.close()
+        print('{:>8d} {:>12.1f} -> {:>10.1f}'.format(
+            n_shapes, times[0] * 1000, times[1] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Lag of a touchpad zoom gesture over a large scene.
+
+Sends 60 Ctrl+wheel events of 1/12 of a wheel step, 4 ms apart, to a
+1,000 x 1,000 canvas showing a 4,000 x 4,000 image with 10,000 polygons,
+zooming as MainWindow.paintCanvas does. Reports the canvas repaints done,
+the time from the first event to the canvas showing the final zoom, then
+the time of the full render once the gesture settled. The simplified
+outlines of the shapes at both zooms are built beforehand, see
+benchmark_shape_lod.py.
+
+Compares the canvas, which applies the wheel input once per frame and
+previews the zoom by scaling its cached layer, against the former
+handling of each event, kept below as LegacyCanvas.
+"""
+
+from __future__ import print_function
+
+import time
+
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+from labelus.widgets.canvas import Canvas
+from scene import make_scene
+
+
+class LegacyCanvas(Canvas):
+
+    def wheelEvent(self, ev):
+        self.zoomRequest.emit(ev.angleDelta().y(), ev.pos())
+        ev.accept()
+
+    def zooming(self):
+        return False
+
+
+def make_canvas(cls, n_shapes=10000):
+    canvas = make_scene(cls, n_shapes)
+    area = QtWidgets.QScrollArea()
+    area.setWidget(canvas)
+    area.setWidgetResizable(True)
+
+    def zoom(delta, pos):
+        canvas.scale *= 1.1 ** (delta / 120.0)
+        canvas.adjustSize()
+        canvas.update()
+
+    canvas.zoomRequest.connect(zoom)
+    area.resize(1000, 1000)
+    area.show()
+    QtWidgets.QApplication.processEvents()
+    return area, canvas
+
+
+def gesture(canvas, n_events=60, delta=10, interval=0.004):
+    app = QtWidgets.QApplication.instance()
+    paints = []
+    paint_event = canvas.paintEvent
+
+    def paint_logged(event):
+        paints.append(canvas.scale)
+        paint_event(event)
+
+    scale = canvas.scale
+    final_scale = scale * 1.1 ** (n_events * delta / 120.0)
+    for value in [final_scale, scale]:
+        canvas.scale = value
+        canvas.adjustSize()
+        canvas.repaint()
+    canvas.paintEvent = paint_logged
+    pos = QtCore.QPointF(500, 500)
+    start = time.time()
+    for i in range(n_events):
+        t = time.time()
+        event = QtGui.QWheelEvent(
+            pos, pos, QtCore.QPoint(), QtCore.QPoint(0, delta),
+            QtCore.Qt.NoButton, QtCore.Qt.ControlModifier,
+            QtCore.Qt.NoScrollPhase, False)
+        app.sendEvent(canvas, event)
+        app.processEvents()
+        time.sleep(max(0, interval - (time.time() - t)))
+    while not paints or abs(paints[-1] - final_scale) > 1e-6:
+        app.processEvents()
+    shown = time.time() - start
+    while canvas.zooming():
+        app.processEvents()
+    t = time.time()
+    n_paints = len(paints)
+    while len(paints) == n_paints and canvas._layerPreview:
+        app.processEvents()
+    settle = time.time() - t
+    return n_paints, shown, settle
+
+
+def main():
+    app = QtWidgets.QApplication([])  # NOQA
+    print('{:>14s} {:>22s} {:>22s}'.format(
+        'repaints', 'final zoom shown [ms]', 'settled render [ms]'))
+    results = []
+    for cls in [LegacyCanvas, Canvas]:
+        area, canvas = make_canvas(cls)
+        results.append(gesture(canvas))
+        area.close()
+    (p0, l0, s0), (p1, l1, s1) = results
+    row = '{:>6d} -> {:>5d} {:>10.0f} -> {:>8.0f} {:>10.0f} -> {:>8.0f}'
+    print(row.format(p0, p1, l0 * 1000, l1 * 1000, s0 * 1000, s1 * 1000))
+
+
+if __name__ == '__main__':
+    main()
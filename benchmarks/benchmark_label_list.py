@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+"""Load, select-all, save and delete-many through the polygon label list.
+
+Compares the ShapeListModel and LabelListView of the polygon dock against
+the former QListWidget with one item per shape and linear item/shape
+lookups, kept below as LegacyLabelList, replaying what MainWindow does
+for each operation on scenes of 1,000 and 8,000 shapes. The lists are
+shown, so that the views lay their rows out as in the application.
+"""
+
+from __future__ import print_function
+
+import time
+
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+from labelus.shape import Shape
+from labelus.widgets import LabelListView
+from labelus.widgets import ShapeListModel
+
+
+class LegacyLabelList(QtWidgets.QListWidget):
+
+    def __init__(self):
+        super(LegacyLabelList, self).__init__()
+        self.itemsToShapes = []
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+
+    def get_shape_from_item(self, item):
+        for item_, shape in self.itemsToShapes:
+            if item_ is item:
+                return shape
+
+    def get_item_from_shape(self, shape):
+        for item, shape_ in self.itemsToShapes:
+            if shape_ is shape:
+                return item
+
+    def load(self, shapes):
+        for shape in shapes:
+            item = QtWidgets.QListWidgetItem(shape.label)
+            item.setFlags(item.flags() | QtCore.Qt.ItemIsUserCheckable)
+            item.setCheckState(QtCore.Qt.Checked)
+            self.itemsToShapes.append((item, shape))
+            self.addItem(item)
+
+    def shapes(self):
+        return [self.get_shape_from_item(self.item(i))
+                for i in range(self.count())]
+
+    def selectShapes(self, shapes):
+        self.clearSelection()
+        for shape in shapes:
+            self.get_item_from_shape(shape).setSelected(True)
+
+    def selectedShapes(self):
+        return [self.get_shape_from_item(item)
+                for item in self.selectedItems()]
+
+    def removeShapes(self, shapes):
+        for shape in shapes:
+            item = self.get_item_from_shape(shape)
+            self.takeItem(self.row(item))
+
+
+class LabelList(LabelListView):
+
+    def __init__(self):
+        super(LabelList, self).__init__()
+        self.setModel(ShapeListModel(self))
+
+    def load(self, shapes):
+        self.model().appendShapes(shapes)
+
+    def shapes(self):
+        return self.model().shapes()
+
+    def removeShapes(self, shapes):
+        self.model().removeShapes(shapes)
+
+
+def make_shapes(n_shapes):
+    shapes = []
+    for i in range(n_shapes):
+        shape = Shape(label=str(i), shape_type='rectangle')
+        shape.addPoint(QtCore.QPointF(i, 0))
+        shape.addPoint(QtCore.QPointF(i + 10, 10))
+        shapes.append(shape)
+    return shapes
+
+
+def run(cls, n_shapes):
+    widget = cls()
+    widget.show()
+    shapes = make_shapes(n_shapes)
+    times = []
+
+    t = time.time()
+    widget.load(shapes)
+    QtWidgets.QApplication.processEvents()
+    times.append(time.time() - t)
+
+    # select all on the canvas, then read the selection back from the list
+    t = time.time()
+    widget.selectShapes(shapes)
+    selected = widget.selectedShapes()
+    times.append(time.time() - t)
+    assert len(selected) == n_shapes
+
+    # save, formatting the shapes in the order of the list
+    t = time.time()
+    data = [dict(label=s.label, points=[(p.x(), p.y()) for p in s.points])
+            for s in widget.shapes()]
+    times.append(time.time() - t)
+    assert len(data) == n_shapes
+
+    # delete every other shape, all shapes being selected
+    t = time.time()
+    widget.removeShapes(shapes[::2])
+    QtWidgets.QApplication.processEvents()
+    times.append(time.time() - t)
+    assert len(widget.shapes()) == n_shapes - len(shapes[::2])
+    widget.close()
+    return times
+
+
+def main():
+    app = QtWidgets.QApplication([])  # NOQA
+    print('{:>8s} {:>22s} {:>22s} {:>22s} {:>22s}'.format(
+        'shapes', 'load [ms]', 'select all [ms]', 'save [ms]',
+        'delete half [ms]'))
+    for n_shapes in [1000, 8000]:
+        legacy = run(LegacyLabelList, n_shapes)
+        indexed = run(LabelList, n_shapes)
+        print('{:>8d}'.format(n_shapes) + ''.join(
+            ' {:>10.0f} -> {:>8.1f}'.format(t0 * 1000, t1 * 1000)
+            for t0, t1 in zip(legacy, indexed)))
+
+
+if __name__ == '__main__':
+    main()
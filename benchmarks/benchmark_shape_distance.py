@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""Per-mousemove cost of Shape.nearestVertex and Shape.nearestEdge.
+
+Compares the vectorised kernels of Shape against the former per-point
+Python loops, for polygons of 10, 1,000 and 100,000 vertices.
+"""
+
+from __future__ import print_function
+
+import math
+import timeit
+
+from qtpy import QtCore
+
+import labelus.utils
+from labelus.shape import Shape
+
+
+def make_polygon(n_points, radius=1000.0):
+    shape = Shape()
+    for i in range(n_points):
+        theta = 2 * math.pi * i / n_points
+        shape.addPoint(QtCore.QPointF(radius + radius * math.cos(theta),
+                                      radius + radius * math.sin(theta)))
+    shape.close()
+    return shape
+
+
+def loop_nearest_vertex(shape, point, epsilon):
+    min_distance = float('inf')
+    min_i = None
+    for i, p in enumerate(shape.points):
+        dist = labelus.utils.distance(p - point)
+        if dist <= epsilon and dist < min_distance:
+            min_distance = dist
+            min_i = i
+    return min_i
+
+
+def loop_nearest_edge(shape, point, epsilon):
+    min_distance = float('inf')
+    post_i = None
+    for i in range(len(shape.points)):
+        line = [shape.points[i - 1], shape.points[i]]
+        dist = labelus.utils.distancetoline(point, line)
+        if dist <= epsilon and dist < min_distance:
+            min_distance = dist
+            post_i = i
+    return post_i
+
+
+def bench(func, number):
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    point = QtCore.QPointF(1999.0, 1000.5)
+    epsilon = 10.0
+    print('{:>10s} {:>14s} {:>14s} {:>9s}'.format(
+        'vertices', 'loop [ms]', 'vector [ms]', 'speedup'))
+    for n_points in [10, 1000, 100000]:
+        shape = make_polygon(n_points)
+        shape.pointsArray  # the mirror is built once, not per mousemove
+
+        def loop():
+            loop_nearest_vertex(shape, point, epsilon)
+            loop_nearest_edge(shape, point, epsilon)
+
+        def vector():
+            shape.nearestVertex(point, epsilon)
+            shape.nearestEdge(point, epsilon)
+
+        assert loop_nearest_vertex(shape, point, epsilon) == \
+            shape.nearestVertex(point, epsilon)
+        assert loop_nearest_edge(shape, point, epsilon) == \
+            shape.nearestEdge(point, epsilon)
+
+        number = max(1, 10000 // n_points)
+        t_loop = bench(loop, number) * 1000
+        t_vector = bench(vector, number * 10) * 1000
+        print('{:>10d} {:>14.4f} {:>14.4f} {:>8.1f}x'.format(
+            n_points, t_loop, t_vector, t_loop / t_vector))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+"""Paint time of large scenes at fit-window zoom, with and without LOD.
+
+Paints 2,000 polygons of 500 vertices each, spread over a 20,000 x 20,000
+image, into a 1,000 x 1,000 widget-sized image as Canvas.paintEvent does.
+The first paint at a scale builds the simplified outlines, later paints
+reuse them.
+"""
+
+from __future__ import print_function
+
+import math
+import time
+
+import numpy as np
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+from labelus.shape import Shape
+
+
+def make_scene(n_shapes=2000, n_points=500, size=20000):
+    rng = np.random.RandomState(0)
+    theta = np.linspace(0, 2 * math.pi, n_points, endpoint=False)
+    shapes = []
+    for i in range(n_shapes):
+        cx, cy = rng.uniform(200, size - 200, 2)
+        radius = 150 * (1 + 0.1 * np.sin(7 * theta + i))
+        shape = Shape(label=str(i))
+        shape.points = np.stack(
+            [cx + radius * np.cos(theta), cy + radius * np.sin(theta)], axis=1)
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def paint(shapes, scale):
+    image = QtGui.QImage(1000, 1000, QtGui.QImage.Format_ARGB32)
+    image.fill(0)
+    painter = QtGui.QPainter(image)
+    painter.setRenderHint(QtGui.QPainter.Antialiasing)
+    painter.scale(scale, scale)
+    Shape.scale = scale
+    t = time.time()
+    for shape in shapes:
+        shape.paint(painter)
+    painter.end()
+    return time.time() - t
+
+
+def main():
+    app = QtWidgets.QApplication([])  # NOQA
+    scale = 1000 / 20000.0
+    print('{:>10s} {:>16s} {:>16s}'.format(
+        'LOD', 'first paint [ms]', 'repaint [ms]'))
+    for tolerance in [0, Shape.lod_tolerance]:
+        Shape.lod_tolerance = tolerance
+        shapes = make_scene()
+        first = paint(shapes, scale)
+        again = min(paint(shapes, scale) for _ in range(3))
+        print('{:>10s} {:>16.0f} {:>16.0f}'.format(
+            'off' if tolerance == 0 else '{} px'.format(tolerance),
+            first * 1000, again * 1000))
+
+
+if __name__ == '__main__':
+    main()
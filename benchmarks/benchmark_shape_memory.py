@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""Memory and copy time of Shape for scenes of 10,000 polygons.
+
+Compares Shape against the former representation, kept below as
+LegacyShape: instance dict, list of QPointF, per-instance highlight
+settings and `copy.deepcopy`. Memory is the growth of the resident set
+size, as the QPointF are allocated by Qt and invisible to tracemalloc.
+"""
+
+from __future__ import print_function
+
+import copy
+import gc
+import math
+import os
+import subprocess
+import sys
+import timeit
+
+from qtpy import QtCore
+
+from labelus.shape import Shape
+
+
+class LegacyShape(object):
+
+    def __init__(self):
+        self.label = None
+        self.points = []
+        self.fill = False
+        self.selected = False
+        self.shape_type = 'polygon'
+        self.flags = None
+        self._highlightIndex = None
+        self._highlightMode = Shape.NEAR_VERTEX
+        self._highlightSettings = {
+            Shape.NEAR_VERTEX: (8, Shape.P_ROUND),
+            Shape.MOVE_VERTEX: (1.5, Shape.P_SQUARE),
+        }
+        self._closed = False
+        self._linePath = None
+        self._vertexPath = None
+        self._vertexPathKey = None
+        self._pointsArray = None
+
+    def addPoint(self, point):
+        self.points.append(point)
+
+    def close(self):
+        self._closed = True
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+
+def rss():
+    """Resident set size in bytes, Linux only."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def make_scene(cls, n_shapes, n_points):
+    shapes = []
+    for j in range(n_shapes):
+        shape = cls()
+        shape.label = 'shape{}'.format(j)
+        shape.flags = {}
+        x0 = 100 * (j % 100)
+        y0 = 100 * (j // 100)
+        for i in range(n_points):
+            theta = 2 * math.pi * i / n_points
+            shape.addPoint(QtCore.QPointF(x0 + 40 * math.cos(theta),
+                                          y0 + 40 * math.sin(theta)))
+        shape.close()
+        shapes.append(shape)
+    return shapes
+
+
+def measure(cls, n_points, n_shapes=10000):
+    """Return (memory in MB, copy time in s) of a scene of `cls` shapes."""
+    gc.collect()
+    before = rss()
+    shapes = make_scene(cls, n_shapes, n_points)
+    gc.collect()
+    memory = (rss() - before) / 1e6
+    # copying all shapes, like a multi-selection move does
+    t_copy = min(timeit.repeat(
+        lambda: [s.copy() for s in shapes], number=1, repeat=3))
+    return memory, t_copy
+
+
+def main():
+    if len(sys.argv) == 3:
+        cls = {'legacy': LegacyShape, 'shape': Shape}[sys.argv[1]]
+        print(*measure(cls, int(sys.argv[2])))
+        return
+    print('{:>8s} {:>12s} {:>12s} {:>14s} {:>14s}'.format(
+        'points', 'legacy [MB]', 'shape [MB]', 'legacy copy', 'shape copy'))
+    for n_points in [4, 50, 200]:
+        results = []
+        for name in ['legacy', 'shape']:
+            # a fresh process each, freed memory would be reused otherwise
+            output = subprocess.check_output(
+                [sys.executable, __file__, name, str(n_points)])
+            results.append([float(v) for v in output.split()])
+        (mem_legacy, t_legacy), (mem_shape, t_shape) = results
+        print('{:>8d} {:>12.1f} {:>12.1f} {:>12.0f}ms {:>12.0f}ms'.format(
+            n_points, mem_legacy, mem_shape, t_legacy * 1000, t_shape * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Scene shared by the canvas benchmarks."""
+
+import math
+
+import numpy as np
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.shape import Shape
+
+
+def make_scene(cls, n_shapes, size=4000, n_points=40):
+    """Return a canvas of class `cls` showing a `size` x `size` image at
+    1,000 px, with `n_shapes` polygons of `n_points` vertices spread over
+    it.
+    """
+    canvas = cls()
+    pixmap = QtGui.QPixmap(size, size)
+    pixmap.fill(QtCore.Qt.darkGreen)
+    canvas.scale = 1000.0 / size
+    canvas.loadPixmap(pixmap, 'date1')
+
+    rng = np.random.RandomState(0)
+    theta = np.linspace(0, 2 * math.pi, n_points, endpoint=False)
+    shapes = []
+    for i in range(n_shapes):
+        cx, cy = rng.uniform(50, size - 50, 2)
+        shape = Shape(label=str(i))
+        shape.points = np.stack(
+            [cx + 30 * np.cos(theta), cy + 30 * np.sin(theta)], axis=1)
+        shape.close()
+        shapes.append(shape)
+    canvas.loadShapes(shapes)
+    return canvas
@@ -14,20 +14,35 @@ from labelus import PY2
 from labelus import QT5
 
 from . import utils
+from labelus.autosave import AutoSaver
 from labelus.config import get_config
+from labelus.image_cache import image_cache
 from labelus.label_file import LabelFile
 from labelus.label_file import LabelFileError
 from labelus.logger import logger
+from labelus.prefetch import load_pair_data
+from labelus.prefetch import PairPrefetcher
+from labelus.pyramid import ImagePyramid
+from labelus.pyramid import pyramid_cache
+from labelus.scanner import list_label_files
+from labelus.scanner import manifest_filename
+from labelus.scanner import PairScanner
+from labelus.scanner import scan_dir_pairs
 from labelus.shape import DEFAULT_FILL_COLOR
 from labelus.shape import DEFAULT_LINE_COLOR
 from labelus.shape import Shape
+from labelus.undo import SetAttribute
 from labelus.widgets import Canvas
 from labelus.widgets import ColorDialog
 from labelus.widgets import EscapableQListWidget
 from labelus.widgets import LabelDialog
-from labelus.widgets import LabelQListWidget
+from labelus.widgets import LabelListView
+from labelus.widgets import pair_stem
+from labelus.widgets import PairListModel
+from labelus.widgets import ShapeListModel
 from labelus.widgets import ToolBar
 from labelus.widgets import ZoomWidget
+from labelus.watcher import DirectoryWatcher
 
 
 
@@ -65,17 +80,15 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self._noSelectionSlot = False
 
-
-        self.labelList = LabelQListWidget()
+        self.labelModel = ShapeListModel(self)
+        self.labelList = LabelListView()
+        self.labelList.setModel(self.labelModel)
         self.lastOpenDir = None
 
-        self.labelList.itemActivated.connect(self.labelSelectionChanged)
-        self.labelList.itemSelectionChanged.connect(self.labelSelectionChanged)
-        # Connect to itemChanged to detect checkbox changes.
-        self.labelList.itemChanged.connect(self.labelItemChanged)
-        self.labelList.setDragDropMode(
-            QtWidgets.QAbstractItemView.InternalMove)
-        self.labelList.setParent(self)
+        self.labelList.activated.connect(self.labelSelectionChanged)
+        self.labelList.selectionModel().selectionChanged.connect(
+            self.labelSelectionChanged)
+        self.labelList.shapesMoved.connect(self.labelOrderChanged)
         self.shape_dock = QtWidgets.QDockWidget('Polygon Labels', self)
         self.shape_dock.setObjectName('Labels')
         self.shape_dock.setWidget(self.labelList)
@@ -85,15 +98,20 @@ class MainWindow(QtWidgets.QMainWindow):
         self.locationSearch = QtWidgets.QLineEdit()
         self.locationSearch.setPlaceholderText('Search Location')
         self.locationSearch.textChanged.connect(self.locationSearchChanged)
-        self.locationListWidget = QtWidgets.QListWidget()
-        self.locationListWidget.itemSelectionChanged.connect(
+        self.pairModel = PairListModel(self)
+        self.locationListView = QtWidgets.QListView()
+        self.locationListView.setModel(self.pairModel)
+        self.locationListView.setUniformItemSizes(True)
+        self.locationListView.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.locationListView.selectionModel().selectionChanged.connect(
             self.locationSelectionChanged
         )
         locationListLayout = QtWidgets.QVBoxLayout()
         locationListLayout.setContentsMargins(0, 0, 0, 0)
         locationListLayout.setSpacing(0)
         locationListLayout.addWidget(self.locationSearch)
-        locationListLayout.addWidget(self.locationListWidget)
+        locationListLayout.addWidget(self.locationListView)
         self.location_dock = QtWidgets.QDockWidget(u'Location List', self)
         self.location_dock.setObjectName(u'Location')
         locationListWidget = QtWidgets.QWidget()
@@ -103,9 +121,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.zoomWidget = ZoomWidget()
         self.colorDialog = ColorDialog(parent=self)
 
-        self.canvas = self.labelList.canvas = Canvas(
+        self.canvas = Canvas(
             epsilon=self._config['epsilon'],
         )
+        self.canvas.shapeModel = self.labelModel
+        self.labelModel.visibilityChanged.connect(
+            self.canvas.shapesVisibilityChanged)
+        self.canvas.undoStack.max_bytes = \
+            self._config['undo_memory'] * 1024 * 1024
         self.canvas.zoomRequest.connect(self.zoomRequest)
 
         scrollArea = QtWidgets.QScrollArea()
@@ -121,6 +144,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.canvas.shapeMoved.connect(self.setDirty)
         self.canvas.selectionChanged.connect(self.shapeSelectionChanged)
         self.canvas.drawingPolygon.connect(self.toggleDrawingSensitive)
+        self.canvas.dateChanged.connect(self.dateChanged)
 
         self.setCentralWidget(scrollArea)
 
@@ -218,6 +242,10 @@ class MainWindow(QtWidgets.QMainWindow):
         toggleDate = action('Toggle date pair images', self.toggleDatePair,
                             shortcuts['toggle_date'], None, 'Toogle "date image" mode',
                             checkable=True)
+        blinkDate = action('Blink date pair images', self.toggleBlinkDate,
+                           shortcuts['toggle_blink'], None,
+                           'Alternate the date pair images on a timer',
+                           checkable=True)
 
         createMode = action(
             'Create Polygons',
@@ -292,6 +320,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
         undo = action('Undo', self.undoShapeEdit, shortcuts['undo'], 'undo',
                       'Undo last add and edit of shape', enabled=False)
+        redo = action('Redo', self.redoShapeEdit, shortcuts['redo'], None,
+                      'Redo last undone edit of shape', enabled=False)
 
         hideAll = action('&Hide\nPolygons',
                          functools.partial(self.togglePolygons, False),
@@ -381,9 +411,9 @@ class MainWindow(QtWidgets.QMainWindow):
             deleteFile=deleteFile,
             lineColor=color1, fillColor=color2,
             toggleKeepPrevMode=toggle_keep_prev_mode,
-            toggleDate=toggleDate,
+            toggleDate=toggleDate, blinkDate=blinkDate,
             delete=delete, copy=copy,
-            undoLastPoint=undoLastPoint, undo=undo,
+            undoLastPoint=undoLastPoint, undo=undo, redo=redo,
             addPointToEdge=addPointToEdge,
             createMode=createMode, editMode=editMode,
             createRectangleMode=createRectangleMode,
@@ -404,6 +434,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 delete,
                 None,
                 undo,
+                redo,
                 undoLastPoint,
                 None,
                 addPointToEdge,
@@ -413,6 +444,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 None,
                 toggle_keep_prev_mode,
                 toggleDate,
+                blinkDate,
             ),
             # menu shown at right click
             menu=(
@@ -428,6 +460,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 shapeLineColor,
                 shapeFillColor,
                 undo,
+                redo,
                 undoLastPoint,
                 addPointToEdge,
             ),
@@ -536,6 +569,8 @@ class MainWindow(QtWidgets.QMainWindow):
         )
 
         self.statusBar().showMessage('%s started.' % __appname__)
+        self.cacheStatus = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.cacheStatus)
         self.statusBar().show()
 
         if output_file is not None and self._config['auto_save']:
@@ -550,6 +585,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # Application state.
         self.image_date1 = QtGui.QImage()
         self.image_date2 = QtGui.QImage()
+        self._dateTitles = {}  # date -> window title
         self.image_date1Path = None
         self.image_date2Path = None
         self.recentPairs = []
@@ -560,6 +596,52 @@ class MainWindow(QtWidgets.QMainWindow):
         self.zoom_level = 100
         self.fit_window = False
 
+        image_cache.setMaxBytes(
+            self._config['image_cache']['memory_budget'] * 1024 * 1024)
+        # encoded bytes are only needed to be stored in label files
+        image_cache.keep_data = \
+            self._config['store_data'] or not self._config['low_memory']
+        pyramid = self._config['pyramid']
+        pyramid_cache.configure(
+            cache_dir=pyramid['cache_dir'],
+            min_pixels=pyramid['min_pixels'],
+            tile_size=pyramid['tile_size'],
+            tile_bytes=pyramid['memory_budget'] * 1024 * 1024,
+            disk_bytes=pyramid['disk_budget'] * 1024 * 1024,
+        )
+        self.autoSaver = AutoSaver(
+            delay=self._config['auto_save_delay'], parent=self)
+        self.autoSaver.failed.connect(self.autoSaveFailed)
+        prefetch = self._config['prefetch']
+        self.prefetcher = PairPrefetcher(
+            memory_budget=prefetch['memory_budget'] * 1024 * 1024,
+            max_threads=max(prefetch['next'], prefetch['prev']),
+            parent=self,
+        )
+        # a prefetched pair may hold the label file from before the save
+        self.autoSaver.saved.connect(self.prefetcher.invalidate)
+        self.pairScanner = PairScanner(parent=self)
+        self.pairScanner.found.connect(self.addScannedPairs)
+        self.pairScanner.progress.connect(self.scanProgress)
+        self.pairScanner.finished.connect(self.scanFinished)
+        # load flag and pair to select of the running scan
+        self._scanLoad = False
+        self._scanSelect = None
+        self._scanExtensions = []
+        # pairs added, removed or annotated by other processes
+        self.dirWatcher = DirectoryWatcher(
+            delay=self._config['watch']['delay'], parent=self)
+        self.dirWatcher.changed.connect(self.syncDirectories)
+        self._pairDirs = set()  # watched image directories
+        # label directory and its files when last listed, see syncLabelFiles
+        self._labelFiles = (None, set())
+        # new subdirectories of watched ones are walked on a worker thread
+        self.dirScanner = PairScanner(parent=self)
+        self.dirScanner.found.connect(self.addWatchedPairs)
+        self.dirScanner.finished.connect(self.watchedScanFinished)
+        self._newDirs = set()  # waiting for dirScanner
+        self._dirScanRunning = False
+
         if filename_date1 is not None and filename_date2 is not None and osp.isdir(filename_date1):
             #Only filenames allowed, no directory
             self.importDirPairs(filename_date1, load=False)
@@ -585,11 +667,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.restoreState(
             self.settings.value('window/state', QtCore.QByteArray()))
         self.lineColor = QtGui.QColor(
-            self.settings.value('line/color', Shape.line_color))
+            self.settings.value('line/color', Shape.default_line_color))
         self.fillColor = QtGui.QColor(
-            self.settings.value('fill/color', Shape.fill_color))
-        Shape.line_color = self.lineColor
-        Shape.fill_color = self.fillColor
+            self.settings.value('fill/color', Shape.default_fill_color))
+        Shape.default_line_color = self.lineColor
+        Shape.default_fill_color = self.fillColor
+        Shape.lod_tolerance = self._config['lod_tolerance']
 
         # Populate the File menu dynamically.
         self.updateFileMenu()
@@ -626,7 +709,7 @@ class MainWindow(QtWidgets.QMainWindow):
     # Support Functions
 
     def noShapes(self):
-        return not self.labelList.itemsToShapes
+        return not len(self.labelModel)
 
     def populateModeActions(self):
         tool, menu = self.actions.tool, self.actions.menu
@@ -647,17 +730,21 @@ class MainWindow(QtWidgets.QMainWindow):
         utils.addActions(self.menus.edit, actions + self.actions.editMenu)
 
     def setDirty(self):
+        self.updateUndoActions()
         if self._config['auto_save'] or self.actions.saveAuto.isChecked():
             # label_file = osp.splitext(self.imagePath)[0] + '.json'
-            label_file = osp.splitext(self.image_date1Path)[0].split('.')[0] + '.json'
-            if self.output_dir:
-                label_file_without_path = osp.basename(label_file)
-                label_file = osp.join(self.output_dir, label_file_without_path)
-            self.saveLabels(label_file)
+            label_file = self.getPairLabelFile(self.image_date1Path)
+            # saveFile writes there too until a label file is loaded
+            self._autoSaveFile = label_file
+            self.autoSaver.schedule(
+                label_file,
+                self.labelSaveArgs,
+                functools.partial(self.setLocationChecked,
+                                  self.image_date1Path),
+            )
             return
         self.dirty = True
         self.actions.save.setEnabled(True)
-        self.actions.undo.setEnabled(self.canvas.isShapeRestorable)
         title = __appname__
         # if self.filename is not None:
         #     title = '{} - {}*'.format(title, self.filename)
@@ -700,7 +787,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.statusBar().showMessage(message, delay)
 
     def resetState(self):
-        self.labelList.clear()
+        # take the snapshot of pending auto saves before the state is gone
+        self.autoSaver.flush()
+        self.labelModel.clear()
         # self.filename = None
         self.filename_date1 = None
         self.filename_date2 = None
@@ -711,15 +800,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.image_date1Data = None
         self.image_date2Data = None
         self.labelFile = None
+        self._autoSaveFile = None
         self.otherData = None
         self.canvas.resetState()
 
-    def currentItem(self):
-        items = self.labelList.selectedItems()
-        if items:
-            return items[0]
-        return None
-
     # def addRecentFile(self, filename):
     #     if filename in self.recentFiles:
     #         self.recentFiles.remove(filename)
@@ -736,10 +820,29 @@ class MainWindow(QtWidgets.QMainWindow):
     # Callbacks
 
     def undoShapeEdit(self):
-        self.canvas.restoreShape()
-        self.labelList.clear()
-        self.loadShapes(self.canvas.shapes)
-        self.actions.undo.setEnabled(self.canvas.isShapeRestorable)
+        if self.canvas.undo():
+            self.refreshLabelList()
+            self.setDirty()
+
+    def redoShapeEdit(self):
+        if self.canvas.redo():
+            self.refreshLabelList()
+            self.setDirty()
+
+    def updateUndoActions(self):
+        self.actions.undo.setEnabled(self.canvas.canUndo())
+        self.actions.redo.setEnabled(self.canvas.canRedo())
+
+    def refreshLabelList(self):
+        """Match the label list to the canvas shapes after an undo or redo.
+        """
+        shapes = self.canvas.shapes
+        self._noSelectionSlot = True
+        self.labelModel.setShapes(shapes)
+        self._noSelectionSlot = False
+        self.shapeSelectionChanged([])
+        for action in self.actions.onShapesPresent:
+            action.setEnabled(bool(shapes))
 
     def tutorial(self):
         url = 'https://github.com/granularai/labelus/tree/labelus/examples/tutorial'  # NOQA
@@ -752,7 +855,8 @@ class MainWindow(QtWidgets.QMainWindow):
         """
         self.actions.editMode.setEnabled(not drawing)
         self.actions.undoLastPoint.setEnabled(drawing)
-        self.actions.undo.setEnabled(not drawing)
+        self.actions.undo.setEnabled(not drawing and self.canvas.canUndo())
+        self.actions.redo.setEnabled(not drawing and self.canvas.canRedo())
         self.actions.delete.setEnabled(not drawing)
 
     def toggleDrawMode(self, edit=True, createMode='polygon'):
@@ -853,38 +957,45 @@ class MainWindow(QtWidgets.QMainWindow):
         return False
 
     def locationSearchChanged(self):
-        self.importDirPairs(
-            self.lastOpenDir,
-            pattern=self.locationSearch.text(),
-            load=False,
-        )
+        self.pairModel.setFilter(self.locationSearch.text())
+        self.reselectCurrentPair()
+
+    def reselectCurrentPair(self):
+        row = self.pairModel.rowOfPair(
+            self.filename_date1, self.filename_date2)
+        if row >= 0:
+            # keep the current pair selected without loading it again
+            selectionModel = self.locationListView.selectionModel()
+            selectionModel.blockSignals(True)
+            self.selectLocationRow(row)
+            selectionModel.blockSignals(False)
 
     def locationSelectionChanged(self):
-        items = self.locationListWidget.selectedItems()
-        if not items:
+        indexes = self.locationListView.selectionModel().selectedRows()
+        if not indexes:
             return
-        item = items[0]
+        row = indexes[0].row()
 
         if not self.mayContinue():
             return
 
-        currIndex = self.pairImageList.index((str(item.text()) + '.d1.jpg', str(item.text()) + '.d2.jpg'))
-        if currIndex < len(self.pairImageList):
-            filename_date1, filename_date2 = self.pairImageList[currIndex]
-            if filename_date1 and filename_date2:
-                self.loadPair(filename_date1, filename_date2)
+        # Neighbours of the previous pair are of no use after a jump, the
+        # prefetch is restarted around the new pair once it is loaded.
+        self.prefetcher.cancel()
+
+        filename_date1, filename_date2 = self.pairModel.pair(row)
+        if filename_date1 and filename_date2:
+            self.loadPair(filename_date1, filename_date2)
 
     # React to canvas signals.
     def shapeSelectionChanged(self, selected_shapes):
         self._noSelectionSlot = True
         for shape in self.canvas.selectedShapes:
             shape.selected = False
-        self.labelList.clearSelection()
         self.canvas.selectedShapes = selected_shapes
         for shape in self.canvas.selectedShapes:
             shape.selected = True
-            item = self.labelList.get_item_from_shape(shape)
-            item.setSelected(True)
+        self.labelList.selectShapes(selected_shapes)
         self._noSelectionSlot = False
         n_selected = len(selected_shapes)
         self.actions.delete.setEnabled(n_selected)
@@ -892,24 +1003,18 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actions.shapeLineColor.setEnabled(n_selected)
         self.actions.shapeFillColor.setEnabled(n_selected)
 
-    def addLabel(self, shape):
-        item = QtWidgets.QListWidgetItem(shape.label)
-        item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-        item.setCheckState(Qt.Checked)
-        self.labelList.itemsToShapes.append((item, shape))
-        self.labelList.addItem(item)
-        for action in self.actions.onShapesPresent:
-            action.setEnabled(True)
+    def addLabels(self, shapes):
+        self.labelModel.appendShapes(shapes)
+        if shapes:
+            for action in self.actions.onShapesPresent:
+                action.setEnabled(True)
 
     def remLabels(self, shapes):
-        for shape in shapes:
-            item = self.labelList.get_item_from_shape(shape)
-            self.labelList.takeItem(self.labelList.row(item))
+        self.labelModel.removeShapes(shapes)
 
     def loadShapes(self, shapes, replace=True):
         self._noSelectionSlot = True
-        for shape in shapes:
-            self.addLabel(shape)
+        self.addLabels(shapes)
         self.labelList.clearSelection()
         self._noSelectionSlot = False
         self.canvas.loadShapes(shapes, replace=replace)
@@ -940,8 +1045,8 @@ class MainWindow(QtWidgets.QMainWindow):
             s.append(shape)
         self.loadShapes(s)
 
-    def saveLabels(self, filename):
-        lf = LabelFile()
+    def labelSaveArgs(self):
+        """Return keyword arguments of `LabelFile.save` for current labels."""
 
         def format_shape(s):
             return dict(
@@ -955,38 +1060,39 @@ class MainWindow(QtWidgets.QMainWindow):
                 flags=s.flags
             )
 
-        shapes = [format_shape(shape) for shape in self.labelList.shapes]
+        shapes = [format_shape(shape) for shape in self.labelModel.shapes()]
+        image_date1Data = image_date2Data = None
+        if self._config['store_data']:
+            # images drawn from a pyramid do not keep their bytes around
+            image_date1Data = self.image_date1Data or \
+                LabelFile.load_image_file(self.image_date1Path)
+            image_date2Data = self.image_date2Data or \
+                LabelFile.load_image_file(self.image_date2Path)
+        return dict(
+            shapes=shapes,
+            image_date1Path=osp.basename(self.image_date1Path),
+            image_date2Path=osp.basename(self.image_date2Path),
+            image_date1Data=image_date1Data,
+            image_date2Data=image_date2Data,
+            imageHeight=self.image_date1.height(),
+            imageWidth=self.image_date1.width(),
+            lineColor=self.lineColor.getRgb(),
+            fillColor=self.fillColor.getRgb(),
+            otherData=self.otherData,
+            flags={},
+        )
+
+    def saveLabels(self, filename):
+        lf = LabelFile()
+        # this save supersedes any pending auto save of the same file
+        self.autoSaver.cancel(filename)
         try:
-            image_date1Path = osp.relpath(
-                self.image_date1Path, osp.dirname(filename))
-            image_date2Path = osp.relpath(
-                self.image_date2Path, osp.dirname(filename))
-            image_date1Data = self.image_date1Data if self._config['store_data'] else None
-            image_date2Data = self.image_date2Data if self._config['store_data'] else None
             if osp.dirname(filename) and not osp.exists(osp.dirname(filename)):
                 os.makedirs(osp.dirname(filename))
-            lf.save(
-                filename=filename,
-                shapes=shapes,
-                image_date1Path=osp.basename(self.image_date1Path),
-                image_date2Path=osp.basename(self.image_date2Path),
-                image_date1Data=image_date1Data,
-                image_date2Data=image_date2Data,
-                imageHeight=self.image_date1.height(),
-                imageWidth=self.image_date1.width(),
-                lineColor=self.lineColor.getRgb(),
-                fillColor=self.fillColor.getRgb(),
-                otherData=self.otherData,
-                flags={},
-            )
+            lf.save(filename=filename, **self.labelSaveArgs())
             self.labelFile = lf
-            items = self.locationListWidget.findItems(
-                osp.splitext(self.image_date1Path)[0].split('.')[0], Qt.MatchExactly
-            )
-            if len(items) > 0:
-                if len(items) != 1:
-                    raise RuntimeError('There are duplicate files.')
-                items[0].setCheckState(Qt.Checked)
+            self.prefetcher.invalidate(filename)
+            self.setLocationChecked(self.image_date1Path)
             # disable allows next and previous image to proceed
             # self.filename = filename
             return True
@@ -994,32 +1100,30 @@ class MainWindow(QtWidgets.QMainWindow):
             self.errorMessage('Error saving label data', '<b>%s</b>' % e)
             return False
 
+    def setLocationChecked(self, image_date1Path):
+        self.pairModel.checkStem(pair_stem(image_date1Path))
+
+    def autoSaveFailed(self, filename, message):
+        self.errorMessage('Error saving label data',
+                          '<b>%s</b><p>%s</p>' % (filename, message))
+
     def copySelectedShape(self):
         added_shapes = self.canvas.copySelectedShapes()
         self.labelList.clearSelection()
-        for shape in added_shapes:
-            self.addLabel(shape)
+        self.addLabels(added_shapes)
         self.setDirty()
 
     def labelSelectionChanged(self):
         if self._noSelectionSlot:
             return
         if self.canvas.editing():
-            selected_shapes = []
-            for item in self.labelList.selectedItems():
-                shape = self.labelList.get_shape_from_item(item)
-                selected_shapes.append(shape)
+            selected_shapes = self.labelList.selectedShapes()
             if selected_shapes:
                 self.canvas.selectShapes(selected_shapes)
 
-    def labelItemChanged(self, item):
-        shape = self.labelList.get_shape_from_item(item)
-        label = str(item.text())
-        if label != shape.label:
-            shape.label = str(item.text())
-            self.setDirty()
-        else:  # User probably changed item visibility
-            self.canvas.setShapeVisible(shape, item.checkState() == Qt.Checked)
+    def labelOrderChanged(self):
+        self.canvas.reorderShapes(self.labelModel.shapes())
+        self.setDirty()
 
     # Callback functions:
 
@@ -1028,22 +1132,20 @@ class MainWindow(QtWidgets.QMainWindow):
 
         position MUST be in global coordinates.
         """
-        text = str(self.labelList.count() + 1)
+        text = str(len(self.labelModel) + 1)
         if text:
             self.labelList.clearSelection()
-            self.addLabel(self.canvas.setLastLabel(text, {}))
+            self.addLabels([self.canvas.setLastLabel(text, {})])
             self.actions.editMode.setEnabled(True)
             self.actions.undoLastPoint.setEnabled(False)
-            self.actions.undo.setEnabled(True)
             self.setDirty()
         else:
             self.canvas.undoLastLine()
-            self.canvas.shapesBackups.pop()
 
     def scrollRequest(self, delta, orientation):
         units = - delta * 0.1  # natural scroll
         bar = self.scrollBars[orientation]
-        bar.setValue(bar.value() + bar.singleStep() * units)
+        bar.setValue(bar.value() + int(round(bar.singleStep() * units)))
 
     def setZoom(self, value):
         self.actions.fitWidth.setChecked(False)
@@ -1052,13 +1154,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.zoomWidget.setValue(value)
 
     def addZoom(self, increment=1.1):
-        self.setZoom(self.zoomWidget.value() * increment)
+        value = self.zoomWidget.value()
+        new_value = int(round(value * increment))
+        if new_value == value and increment != 1:
+            # small touchpad steps still zoom
+            new_value += 1 if increment > 1 else -1
+        self.setZoom(new_value)
 
     def zoomRequest(self, delta, pos):
         canvas_width_old = self.canvas.width()
-        units = 1.1
-        if delta < 0:
-            units = 0.9
+        # 10% per wheel step, the canvas sums the deltas of each frame
+        units = 1.1 ** (delta / 120.0)
         self.addZoom(units)
 
         canvas_width_new = self.canvas.width()
@@ -1086,17 +1192,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.adjustScale()
 
     def togglePolygons(self, value):
-        for item, shape in self.labelList.itemsToShapes:
-            item.setCheckState(Qt.Checked if value else Qt.Unchecked)
+        self.labelModel.setAllVisible(value)
 
     def loadPair(self, filename_date1=None, filename_date2=None):
         """Load the specified pair, or the last opened file if None."""
-        # changing filePairListWidget loads file
-        if ((filename_date1, filename_date2) in self.pairImageList and
-                self.locationListWidget.currentRow() !=
-                self.pairImageList.index((filename_date1, filename_date2))):
-            self.locationListWidget.setCurrentRow(self.pairImageList.index((filename_date1, filename_date2)))
-            self.locationListWidget.repaint()
+        # changing the location dock selection loads the pair
+        row = self.pairModel.rowOfPair(filename_date1, filename_date2)
+        if row >= 0 and self.locationListView.currentIndex().row() != row:
+            self.selectLocationRow(row)
             return
 
         self.resetState()
@@ -1112,14 +1215,12 @@ class MainWindow(QtWidgets.QMainWindow):
             return False
         # assumes same name, but json extension
         self.status("Loading %s %s..." % (osp.basename(str(filename_date1)), osp.basename(str(filename_date2))))
-        label_file = osp.splitext(filename_date1)[0].split('.')[0] + '.json'
-        if self.output_dir:
-            label_file_without_path = osp.basename(label_file)
-            label_file = osp.join(self.output_dir, label_file_without_path)
-        if QtCore.QFile.exists(label_file) and \
-                LabelFile.is_label_file(label_file):
+        label_file = self.getPairLabelFile(filename_date1)
+        pair = self.prefetcher.take(filename_date1, filename_date2, label_file)
+        if pair is None:
             try:
-                self.labelFile = LabelFile(label_file)
+                pair = load_pair_data(
+                    filename_date1, filename_date2, label_file)
             except LabelFileError as e:
                 self.errorMessage(
                     'Error opening file',
@@ -1128,8 +1229,16 @@ class MainWindow(QtWidgets.QMainWindow):
                     % (e, label_file))
                 self.status("Error reading %s" % label_file)
                 return False
-            self.image_date1Data = self.labelFile.image_date1Data
-            self.image_date2Data = self.labelFile.image_date2Data
+        self.labelFile = pair.labelFile
+        self.image_date1Data = pair.image_date1Data
+        self.image_date2Data = pair.image_date2Data
+        if self._config['low_memory'] and not self._config['store_data']:
+            # read again from the image files if ever needed on save
+            self.image_date1Data = self.image_date2Data = None
+            if self.labelFile:
+                self.labelFile.image_date1Data = None
+                self.labelFile.image_date2Data = None
+        if self.labelFile:
             self.image_date1Path = osp.join(
                 osp.dirname(label_file),
                 self.labelFile.image_date1Path,
@@ -1144,13 +1253,12 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.fillColor = QtGui.QColor(*self.labelFile.fillColor)
             self.otherData = self.labelFile.otherData
         else:
-            self.image_date1Data, self.image_date2Data = LabelFile.load_image_pair(filename_date1, filename_date2)
-            if self.image_date1Data and self.image_date2Data:
+            if not pair.image_date1.isNull() and \
+                    not pair.image_date2.isNull():
                 self.image_date1Path = filename_date1
                 self.image_date2Path = filename_date2
-            self.labelFile = None
-        image_date1 = QtGui.QImage.fromData(self.image_date1Data)
-        image_date2 = QtGui.QImage.fromData(self.image_date2Data)
+        image_date1 = pair.image_date1
+        image_date2 = pair.image_date2
 
         if image_date1.isNull() or image_date2.isNull():
             formats = ['*.{}'.format(fmt.data().decode())
@@ -1169,10 +1277,20 @@ class MainWindow(QtWidgets.QMainWindow):
         self.filename_date2 = filename_date2
         if self._config['keep_prev']:
             prev_shapes = self.canvas.shapes
-        self.canvas.loadPixmap(QtGui.QPixmap.fromImage(image_date1), 'date1') #Paint date1 on the canvas
+        # both dates are converted once, toggling swaps them
+        self._dateTitles = {
+            'date1': '{} - {}'.format(
+                __appname__, osp.splitext(filename_date1)[0]),
+            'date2': '{} - {}'.format(
+                __appname__, osp.splitext(filename_date2)[0]),
+        }
+        self.canvas.loadPixmaps({
+            'date1': self.imagePixmap(image_date1),
+            'date2': self.imagePixmap(image_date2),
+        }, 'date1')
         if self.labelFile:
             self.loadLabels(self.labelFile.shapes)
-        if self._config['keep_prev'] and not self.labelList.shapes:
+        if self._config['keep_prev'] and not len(self.labelModel):
             self.loadShapes(prev_shapes, replace=False)
         self.setClean()
         self.canvas.setEnabled(True)
@@ -1181,8 +1299,81 @@ class MainWindow(QtWidgets.QMainWindow):
         self.addRecentPair(self.filename_date1, self.filename_date2)
         self.toggleActions(True)
         self.status("Loaded %s and %s" % (osp.basename(str(filename_date1)), osp.basename(str(filename_date2))))
+        self.prefetchNeighbours()
+        self.updateCacheStatus()
         return True
 
+    def imagePixmap(self, image):
+        if isinstance(image, ImagePyramid):
+            # the canvas draws the visible tiles itself
+            return image
+        if self._config['low_memory']:
+            # the canvas draws the image itself instead of a copy
+            return image
+        return QtGui.QPixmap.fromImage(image)
+
+    def pairBytes(self):
+        """Return the memory held by the images of the current pair."""
+        held = [self.image_date1Data, self.image_date2Data,
+                self.image_date1, self.image_date2]
+        if self.labelFile:
+            held += [self.labelFile.image_date1Data,
+                     self.labelFile.image_date2Data]
+        held += list(self.canvas.pixmaps.values())
+        nbytes = 0
+        seen = set()
+        for obj in held:
+            # count objects shared between the holders once
+            if not obj or id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, bytes):
+                nbytes += len(obj)
+            elif isinstance(obj, QtGui.QPixmap):
+                nbytes += obj.width() * obj.height() * obj.depth() // 8
+            else:
+                nbytes += obj.byteCount()
+        return nbytes
+
+    def getPairLabelFile(self, filename_date1):
+        label_file = osp.splitext(filename_date1)[0].split('.')[0] + '.json'
+        if self.output_dir:
+            label_file_without_path = osp.basename(label_file)
+            label_file = osp.join(self.output_dir, label_file_without_path)
+        return label_file
+
+    def updateCacheStatus(self):
+        self.cacheStatus.setText(
+            'Pair: %d MiB | Image cache: %d hits / %d misses (%d MiB)' % (
+                self.pairBytes() // (1024 * 1024),
+                image_cache.hits,
+                image_cache.misses,
+                image_cache.nbytes // (1024 * 1024),
+            )
+        )
+
+    def prefetchNeighbours(self):
+        """Start decoding the pairs around the current one in background."""
+        currIndex = self.pairModel.rowOfPair(
+            self.filename_date1, self.filename_date2)
+        if currIndex < 0:
+            self.prefetcher.prefetch([])
+            return
+        n_next = self._config['prefetch']['next']
+        n_prev = self._config['prefetch']['prev']
+        indices = []
+        for i in range(1, max(n_next, n_prev) + 1):
+            if i <= n_next and currIndex + i < len(self.pairModel):
+                indices.append(currIndex + i)
+            if i <= n_prev and currIndex - i >= 0:
+                indices.append(currIndex - i)
+        pairs = []
+        for index in indices:
+            filename_date1, filename_date2 = self.pairModel.pair(index)
+            pairs.append((filename_date1, filename_date2,
+                          self.getPairLabelFile(filename_date1)))
+        self.prefetcher.prefetch(pairs)
+
     def resizeEvent(self, event):
         if self.canvas and not self.image_date1.isNull()\
            and not self.image_date2.isNull\
@@ -1220,6 +1411,12 @@ class MainWindow(QtWidgets.QMainWindow):
     def closeEvent(self, event):
         if not self.mayContinue():
             event.ignore()
+            return
+        self.autoSaver.flush(wait=True)
+        self.prefetcher.clear()
+        self.pairScanner.cancel()
+        self.dirScanner.cancel()
+        self.dirWatcher.clear()
         self.settings.setValue(
             'filename_date1', self.filename_date1 if self.filename_date1 else '')
         self.settings.setValue(
@@ -1248,15 +1445,16 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.mayContinue():
             return
 
-        if len(self.pairImageList) <= 0:
+        if len(self.pairModel) <= 0:
             return
 
         if self.filename_date1 is None or self.filename_date2 is None:
             return
 
-        currIndex = self.pairImageList.index((self.filename_date1, self.filename_date2))
+        currIndex = self.pairModel.rowOfPair(
+            self.filename_date1, self.filename_date2)
         if currIndex - 1 >= 0:
-            filename_date1, filename_date2 = self.pairImageList[currIndex - 1]
+            filename_date1, filename_date2 = self.pairModel.pair(currIndex - 1)
             if filename_date1 and filename_date2:
                 self.loadPair(filename_date1, filename_date2)
 
@@ -1271,18 +1469,17 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.mayContinue():
             return
 
-        if len(self.pairImageList) <= 0:
+        if len(self.pairModel) <= 0:
             return
 
         filename = None
         if self.filename_date1 is None and self.filename_date2 is None:
-            filename_date1, filename_date2 = self.pairImageList[0]
+            filename_date1, filename_date2 = self.pairModel.pair(0)
         else:
-            currIndex = self.pairImageList.index((self.filename_date1, self.filename_date2))
-            if currIndex + 1 < len(self.pairImageList):
-                filename_date1, filename_date2 = self.pairImageList[currIndex + 1]
-            else:
-                filename_date1, filename_date2 = self.pairImageList[-1]
+            currIndex = self.pairModel.rowOfPair(
+                self.filename_date1, self.filename_date2)
+            row = min(currIndex + 1, len(self.pairModel) - 1)
+            filename_date1, filename_date2 = self.pairModel.pair(row)
         self.filename_date1 = filename_date1
         self.filename_date2 = filename_date2
 
@@ -1346,12 +1543,8 @@ class MainWindow(QtWidgets.QMainWindow):
         current_filename_date1 = self.filename_date1
         current_filename_date2 = self.filename_date2
         self.importDirPairs(self.lastOpenDir, load=False)
-
-        if (current_filename_date1, current_filename_date2) in self.pairImageList:
-            # retain currently selected file
-            self.filePairListWidget.setCurrentRow(
-                self.pairImageList.index((current_filename_date1, current_filename_date2)))
-            self.filePairListWidget.repaint()
+        # retain currently selected file once it is scanned again
+        self._scanSelect = (current_filename_date1, current_filename_date2)
 
     def saveFile(self, _value=False):
         assert not self.image_date1.isNull(), "cannot save empty image date1"
@@ -1360,6 +1553,8 @@ class MainWindow(QtWidgets.QMainWindow):
             if self.labelFile:
                 # DL20180323 - overwrite when in directory
                 self._saveFile(self.labelFile.filename)
+            elif self._autoSaveFile:
+                self._saveFile(self._autoSaveFile)
             elif self.output_file:
                 self._saveFile(self.output_file)
                 self.close()
@@ -1439,14 +1634,16 @@ class MainWindow(QtWidgets.QMainWindow):
             os.remove(label_file)
             logger.info('Label file is removed: {}'.format(label_file))
 
-            item = self.filePairListWidget.currentItem()
-            item.setCheckState(Qt.Unchecked)
+            row = self.pairModel.rowOfPair(
+                self.filename_date1, self.filename_date2)
+            if row >= 0:
+                self.pairModel.setChecked(row, False)
 
             self.resetState()
 
     # Message Dialogs. #
     def hasLabels(self):
-        if not self.labelList.itemsToShapes:
+        if not len(self.labelModel):
             self.errorMessage(
                 'No objects labeled',
                 'You must label at least one object to save the file.')
@@ -1491,8 +1688,8 @@ class MainWindow(QtWidgets.QMainWindow):
         if color:
             self.lineColor = color
             # Change the color for all shape lines:
-            Shape.line_color = self.lineColor
-            self.canvas.update()
+            Shape.default_line_color = self.lineColor
+            self.canvas.invalidateLayer()
             self.setDirty()
 
     def chooseColor2(self):
@@ -1500,22 +1697,23 @@ class MainWindow(QtWidgets.QMainWindow):
             self.fillColor, 'Choose fill color', default=DEFAULT_FILL_COLOR)
         if color:
             self.fillColor = color
-            Shape.fill_color = self.fillColor
-            self.canvas.update()
+            Shape.default_fill_color = self.fillColor
+            self.canvas.invalidateLayer()
             self.setDirty()
 
     def toggleKeepPrevMode(self):
         self._config['keep_prev'] = not self._config['keep_prev']
 
     def toggleDatePair(self):
-        title = __appname__
-        if self.canvas.date == 'date1':
-            self.canvas.loadOtherDate(QtGui.QPixmap.fromImage(self.image_date2), 'date2')
-            title = '{} - {}'.format(title, osp.splitext(self.filename_date2)[0])
-            self.setWindowTitle(title)
-        elif self.canvas.date == 'date2':
-            self.canvas.loadOtherDate(QtGui.QPixmap.fromImage(self.image_date1), 'date1')
-            title = '{} - {}'.format(title, osp.splitext(self.filename_date1)[0])
+        self.canvas.toggleDate()
+
+    def toggleBlinkDate(self, value):
+        self.canvas.setBlinking(value, self._config['blink_interval'])
+
+    def dateChanged(self, date):
+        self.actions.toggleDate.setChecked(date == 'date2')
+        title = self._dateTitles.get(date)
+        if title is not None:
             self.setWindowTitle(title)
 
     def deleteSelectedShape(self):
@@ -1534,7 +1732,10 @@ class MainWindow(QtWidgets.QMainWindow):
         color = self.colorDialog.getColor(
             self.lineColor, 'Choose line color', default=DEFAULT_LINE_COLOR)
         if color:
-            for shape in self.canvas.selectedShapes:
+            shapes = self.canvas.selectedShapes
+            self.canvas.pushCommand(SetAttribute(
+                shapes, 'line_color', [s.line_color for s in shapes], color))
+            for shape in shapes:
                 shape.line_color = color
             self.canvas.update()
             self.setDirty()
@@ -1543,7 +1744,10 @@ class MainWindow(QtWidgets.QMainWindow):
         color = self.colorDialog.getColor(
             self.fillColor, 'Choose fill color', default=DEFAULT_FILL_COLOR)
         if color:
-            for shape in self.canvas.selectedShapes:
+            shapes = self.canvas.selectedShapes
+            self.canvas.pushCommand(SetAttribute(
+                shapes, 'fill_color', [s.fill_color for s in shapes], color))
+            for shape in shapes:
                 shape.fill_color = color
             self.canvas.update()
             self.setDirty()
@@ -1551,8 +1755,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def copyShape(self):
         self.canvas.endMove(copy=True)
         self.labelList.clearSelection()
-        for shape in self.canvas.selectedShapes:
-            self.addLabel(shape)
+        self.addLabels(self.canvas.selectedShapes)
         self.setDirty()
 
     def moveShape(self):
@@ -1576,15 +1779,13 @@ class MainWindow(QtWidgets.QMainWindow):
             QtWidgets.QFileDialog.DontResolveSymlinks))
         self.importDirPairs(targetDirPath)
 
-    @property
-    def pairImageList(self):
-        lst = []
-        for i in range(self.locationListWidget.count()):
-            item = self.locationListWidget.item(i)
-            lst.append((item.text() + '.d1.jpg', item.text() + '.d2.jpg'))
-        return lst
+    def selectLocationRow(self, row):
+        self.pairModel.fetchUntil(row)
+        index = self.pairModel.index(row)
+        self.locationListView.setCurrentIndex(index)
+        self.locationListView.scrollTo(index)
 
-    def importDirPairs(self, dirpath, pattern=None, load=True):
+    def importDirPairs(self, dirpath, load=True):
         self.actions.openNextPair.setEnabled(True)
         self.actions.openPrevPair.setEnabled(True)
 
@@ -1594,37 +1795,148 @@ class MainWindow(QtWidgets.QMainWindow):
         self.lastOpenDir = dirpath
         self.filename_date1 = None
         self.filename_date2 = None
-        self.locationListWidget.clear()
-        for filename_date1, filename_date2 in self.scanAllPairs(dirpath):
-            if pattern and pattern not in filename_date1 and pattern and pattern not in filename_date2:
-                continue
-            label_file = osp.splitext(filename_date1)[0].split('.')[0] + '.json'
-            if self.output_dir:
-                label_file_without_path = osp.basename(label_file)
-                label_file = osp.join(self.output_dir, label_file_without_path)
-            item = QtWidgets.QListWidgetItem(osp.splitext(filename_date1)[0].split('.')[0])
-            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-            if QtCore.QFile.exists(label_file) and \
-                    LabelFile.is_label_file(label_file):
-                item.setCheckState(Qt.Checked)
-            else:
-                item.setCheckState(Qt.Unchecked)
-            self.locationListWidget.addItem(item)
-        self.openNextPair(load=load)
-
-    def scanAllPairs(self, folderPath):
+        self.prefetcher.clear()
+        self.pairModel.clear()
+        self.dirWatcher.clear()
+        self._pairDirs = set()
+        self._labelFiles = (None, set())
+        self.dirScanner.cancel()
+        self._newDirs = set()
+        self._dirScanRunning = False
+        self._scanLoad = load
+        self._scanSelect = None
         extensions = ['.%s' % fmt.data().decode("ascii").lower()
                       for fmt in QtGui.QImageReader.supportedImageFormats()]
-        bb_pairs = {}
-        for root, dirs, files in os.walk(folderPath):
-            for file in files:
-                if file.lower().endswith(tuple(extensions)):
-                    relativePath = osp.join(root, file)
-                    if file.split('.')[0] not in bb_pairs and ('.d1.' in file or '.d2.' in file):
-                        bb_pairs[file.split('.')[0]] = [relativePath]
-                    elif '.d1.' in file or '.d2.' in file:
-                        bb_pairs[file.split('.')[0]] += [relativePath]
-                        bb_pairs[file.split('.')[0]].sort()
-        pairs = bb_pairs.values()
-        pairs = sorted(pairs, key=lambda item: item[0])
-        return pairs
+        self._scanExtensions = extensions
+        manifest_file = None
+        if self._config['scan_cache']['enabled']:
+            manifest_file = manifest_filename(
+                dirpath, self._config['scan_cache']['cache_dir'])
+        self.pairScanner.scan(dirpath, extensions, label_dir=self.output_dir,
+                              manifest_file=manifest_file)
+
+    def addScannedPairs(self, pairs, checked):
+        self.pairModel.appendPairs(pairs, checked)
+        if self.filename_date1 is None and len(self.pairModel):
+            self.openNextPair(load=self._scanLoad)
+        if self._scanSelect is not None:
+            row = self.pairModel.rowOfPair(*self._scanSelect)
+            if row >= 0:
+                self._scanSelect = None
+                self.selectLocationRow(row)
+
+    def scanProgress(self, n_dirs, n_pairs):
+        self.status('Scanning %s: %d pairs found'
+                    % (self.lastOpenDir, n_pairs))
+
+    def scanFinished(self):
+        self.status('Found %d pairs in %s'
+                    % (len(self.pairModel), self.lastOpenDir))
+        if self._config['watch']['enabled']:
+            self._pairDirs = set(self.pairScanner.dirs)
+            self.dirWatcher.addDirectories(self.pairScanner.dirs)
+            if self.output_dir and osp.isdir(self.output_dir):
+                self.dirWatcher.addDirectories([self.output_dir])
+                self._labelFiles = (
+                    self.output_dir, list_label_files(self.output_dir))
+
+    def syncDirectories(self, dirs):
+        """Update the pairs of changed directories and their check state."""
+        model = self.pairModel
+        extensions = self._scanExtensions
+        output_dir = self.output_dir
+        label_files = None
+        if output_dir:
+            label_files = list_label_files(output_dir)
+        added = []
+        added_checked = []
+        removed = []
+
+        for dirpath in sorted(dirs):
+            if output_dir and osp.abspath(dirpath) == osp.abspath(output_dir):
+                self.syncLabelFiles(label_files)
+            if dirpath not in self._pairDirs:
+                continue
+            if not osp.isdir(dirpath):
+                prefix = osp.join(dirpath, '')
+                removed.extend(stem for stem in model.allStems()
+                               if stem.startswith(prefix))
+                self._pairDirs = set(d for d in self._pairDirs
+                                     if d != dirpath and
+                                     not d.startswith(prefix))
+                continue
+            try:
+                subdirs, pairs, checked = scan_dir_pairs(
+                    dirpath, extensions, label_files)
+            except OSError as e:
+                logger.warn('Failed to list {}: {}'.format(dirpath, e))
+                continue
+            stems = set(pair_stem(pair[0]) for pair in pairs)
+            removed.extend(stem for stem in model.stemsIn(dirpath)
+                           if stem not in stems)
+            for pair, is_checked in zip(pairs, checked):
+                stem = pair_stem(pair[0])
+                if stem in model:
+                    model.checkStem(stem, is_checked)
+                else:
+                    added.append(pair)
+                    added_checked.append(is_checked)
+            self._newDirs.update(subdir for subdir in subdirs
+                                 if subdir not in self._pairDirs)
+
+        if removed:
+            model.removeStems(removed)
+            self.reselectCurrentPair()
+        model.appendPairs(added, added_checked)
+        if added or removed:
+            self.status('%d pairs added, %d removed in %s' % (
+                len(added), len(removed), self.lastOpenDir))
+        self.scanNewDirectories()
+
+    def scanNewDirectories(self):
+        """Walk the new subdirectories of watched directories on a worker
+        thread, one scan at a time.
+        """
+        if self._dirScanRunning or not self._newDirs:
+            return
+        dirs = sorted(self._newDirs)
+        self._newDirs = set()
+        self._dirScanRunning = True
+        self.dirScanner.scan(dirs, self._scanExtensions,
+                             label_dir=self.output_dir)
+
+    def addWatchedPairs(self, pairs, checked):
+        added = []
+        added_checked = []
+        for pair, is_checked in zip(pairs, checked):
+            if pair_stem(pair[0]) not in self.pairModel:
+                added.append(pair)
+                added_checked.append(is_checked)
+        if added:
+            self.pairModel.appendPairs(added, added_checked)
+            self.status('%d pairs added in %s' % (
+                len(added), self.lastOpenDir))
+
+    def watchedScanFinished(self):
+        self._dirScanRunning = False
+        dirs = [d for d in self.dirScanner.dirs if d not in self._pairDirs]
+        self._pairDirs.update(dirs)
+        self.dirWatcher.addDirectories(dirs)
+        self.scanNewDirectories()
+
+    def syncLabelFiles(self, label_files):
+        """Update the check state of the pairs whose label file appeared or
+        disappeared in the label directory since it was last listed.
+        """
+        model = self.pairModel
+        label_dir, previous = self._labelFiles
+        self._labelFiles = (self.output_dir, label_files)
+        if label_dir != self.output_dir:
+            for stem in model.allStems():
+                model.checkStem(
+                    stem, osp.basename(stem) + '.json' in label_files)
+            return
+        for name in previous.symmetric_difference(label_files):
+            if name.endswith('.json'):
+                for stem in model.stemsNamed(osp.splitext(name)[0]):
+                    model.checkStem(stem, name in label_files)
@@ -0,0 +1,138 @@
+import collections
+import os
+import os.path as osp
+import threading
+
+from qtpy import QtCore
+
+from labelus.label_file import LabelFile
+from labelus.logger import logger
+
+
+class AutoSaver(QtCore.QObject):
+
+    """Write label files behind the GUI on a single background thread.
+
+    `schedule` only records how to snapshot the labels. Bursts of edits of
+    the same label file are coalesced: the snapshot is taken once `delay`
+    milliseconds after the last edit (or on `flush`), and the resulting
+    `LabelFile.save` call runs on the writer thread. Each write replaces the
+    label file atomically.
+    """
+
+    saved = QtCore.Signal(str)
+    failed = QtCore.Signal(str, str)
+
+    _done = QtCore.Signal(str, str)
+
+    def __init__(self, delay=1000, parent=None):
+        super(AutoSaver, self).__init__(parent)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.flush)
+        self._done.connect(self._onDone)
+
+        # accessed only from the GUI thread
+        self._snapshots = collections.OrderedDict()  # filename -> callable
+        self._callbacks = {}  # filename -> callable
+
+        # shared with the writer thread
+        self._cond = threading.Condition()
+        self._jobs = collections.OrderedDict()  # filename -> save kwargs
+        self._writing = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def schedule(self, filename, snapshot, callback=None):
+        """Save `filename` with the kwargs returned by `snapshot` later.
+
+        `snapshot` is called on the GUI thread and must return the keyword
+        arguments of `LabelFile.save`. `callback` is called on the GUI thread
+        once the file is written.
+        """
+        self._snapshots.pop(filename, None)
+        self._snapshots[filename] = snapshot
+        if callback is not None:
+            self._callbacks[filename] = callback
+        self._timer.start()
+
+    def hasPending(self):
+        if self._snapshots:
+            return True
+        with self._cond:
+            return bool(self._jobs) or self._writing is not None
+
+    def flush(self, wait=False):
+        """Snapshot all scheduled saves now and hand them to the writer."""
+        self._timer.stop()
+        snapshots = self._snapshots
+        self._snapshots = collections.OrderedDict()
+        jobs = [(filename, snapshot()) for filename, snapshot
+                in snapshots.items()]
+        with self._cond:
+            for filename, kwargs in jobs:
+                self._jobs.pop(filename, None)
+                self._jobs[filename] = kwargs
+            self._cond.notify_all()
+            if wait:
+                while self._jobs or self._writing is not None:
+                    self._cond.wait()
+
+    def cancel(self, filename):
+        """Forget pending saves of `filename` and wait for its write."""
+        self._snapshots.pop(filename, None)
+        self._callbacks.pop(filename, None)
+        if not self._snapshots:
+            self._timer.stop()
+        with self._cond:
+            self._jobs.pop(filename, None)
+            while self._writing == filename:
+                self._cond.wait()
+
+    def stop(self):
+        """Write everything pending and terminate the writer thread."""
+        self.flush(wait=True)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stopped:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                filename, kwargs = self._jobs.popitem(last=False)
+                self._writing = filename
+            error = ''
+            try:
+                dirname = osp.dirname(filename)
+                if dirname and not osp.exists(dirname):
+                    os.makedirs(dirname)
+                LabelFile().save(filename=filename, **kwargs)
+            except Exception as e:
+                logger.error('Failed to save {}: {}'.format(filename, e))
+                error = str(e) or e.__class__.__name__
+            with self._cond:
+                self._writing = None
+                self._cond.notify_all()
+            try:
+                self._done.emit(filename, error)
+            except RuntimeError:
+                # the saver has already been destroyed
+                pass
+
+    def _onDone(self, filename, error):
+        if error:
+            self.failed.emit(filename, error)
+            return
+        if filename not in self._snapshots:
+            callback = self._callbacks.pop(filename, None)
+            if callback is not None:
+                callback()
+        self.saved.emit(filename)
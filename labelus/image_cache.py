@@ -0,0 +1,119 @@
+import collections
+import os
+import os.path as osp
+import threading
+
+from qtpy import QtGui
+
+from labelus.label_file import LabelFile
+from labelus import utils
+
+
+class ImageCache(object):
+
+    """LRU cache of decoded images shared by the whole process.
+
+    Entries are keyed by (path, mtime, size), so an image edited on disk is
+    decoded again instead of being served stale. The least recently used
+    entries are evicted once the decoded images and their encoded bytes take
+    more than `max_bytes`. It is safe to use from worker threads.
+
+    If `keep_data` is False, the encoded bytes are dropped once decoded and
+    `load` returns None instead of them. It also does for EXIF-rotated
+    images, which are not encoded again, see LabelFile.read_image_file.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024, keep_data=True):
+        self.max_bytes = max_bytes
+        self.keep_data = keep_data
+        self.hits = 0
+        self.misses = 0
+        self._nbytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(filename):
+        stat = os.stat(filename)
+        return osp.abspath(filename), stat.st_mtime, stat.st_size
+
+    def get(self, filename):
+        """Return cached (imageData, QImage) of `filename` or None."""
+        try:
+            key = self.key(filename)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            # mark as most recently used
+            self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+        return entry[:2]
+
+    def put(self, filename, imageData, image):
+        try:
+            key = self.key(filename)
+        except OSError:
+            return
+        nbytes = len(imageData or b'') + image.byteCount()
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[2]
+            self._entries[key] = (imageData, image, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+
+    def load(self, filename):
+        """Return (imageData, QImage) of `filename`, decoding it on a miss.
+
+        Returns None if the file cannot be read or decoded.
+        """
+        entry = self.get(filename)
+        if entry is not None:
+            return entry
+        loaded = LabelFile.read_image_file(filename)
+        if loaded is None:
+            return None
+        imageData, image_pil = loaded
+        if image_pil is None:
+            image = QtGui.QImage.fromData(imageData)
+        else:
+            # already decoded to be rotated, it is encoded again only if
+            # its bytes are stored in a label file, see load_image_file
+            image = utils.pil_to_qimage(image_pil)
+        if image.isNull():
+            return None
+        if not self.keep_data:
+            imageData = None
+        self.put(filename, imageData, image)
+        return imageData, image
+
+    def setMaxBytes(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _evict(self):
+        while self._entries and self._nbytes > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self._nbytes -= entry[2]
+
+
+image_cache = ImageCache()
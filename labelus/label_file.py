@@ -1,6 +1,7 @@
 import base64
 import io
 import json
+import os
 import os.path as osp
 
 import PIL.Image
@@ -21,7 +22,7 @@ class LabelFile(object):
 
     suffix = '.json'
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, load_images=True):
         self.shapes = ()
         # self.imagePath = None
         self.image_date1Path = None
@@ -29,64 +30,76 @@ class LabelFile(object):
         # self.imageData = None
         self.image_date1Data = None
         self.image_date2Data = None #Bad file naming convention
+        self.imageHeight = None
+        self.imageWidth = None
         if filename is not None:
-            self.load(filename)
+            self.load(filename, load_images=load_images)
         self.filename = filename
 
     @staticmethod
-    def load_image_file(filename):
+    def read_image_file(filename):
+        """Read an image file, avoiding decoding it whenever possible.
+
+        Returns (imageData, image_pil). If the image needs no EXIF rotation,
+        imageData is the file content as-is and image_pil is None, so that
+        it can be decoded only once by Qt and is never re-encoded (lossy for
+        JPEG). Otherwise imageData is None and image_pil is the rotated
+        image, see encode_image for its bytes. Returns None if the file
+        cannot be opened.
+        """
         try:
-            image_pil = PIL.Image.open(filename)
+            with open(filename, 'rb') as f:
+                imageData = f.read()
+            # lazy: only the header is parsed until the pixels are needed
+            image_pil = PIL.Image.open(io.BytesIO(imageData))
         except IOError:
             logger.error('Failed opening image file: {}'.format(filename))
             return
 
+        if PY2 and QT4:
+            image_pil = utils.apply_exif_orientation(image_pil)
+            with io.BytesIO() as f:
+                image_pil.save(f, format='PNG')
+                return f.getvalue(), None
+
+        if utils.get_exif_orientation(image_pil) in [None, 1]:
+            return imageData, None
+
         # apply orientation to image according to exif
-        image_pil = utils.apply_exif_orientation(image_pil)
+        return None, utils.apply_exif_orientation(image_pil)
 
+    @staticmethod
+    def encode_image(image_pil, filename):
+        """Encode `image_pil` in the format of `filename`, JPEG or PNG."""
         with io.BytesIO() as f:
             ext = osp.splitext(filename)[1].lower()
-            if PY2 and QT4:
-                format = 'PNG'
-            elif ext in ['.jpg', '.jpeg']:
+            if ext in ['.jpg', '.jpeg']:
                 format = 'JPEG'
             else:
                 format = 'PNG'
             image_pil.save(f, format=format)
-            f.seek(0)
-            return f.read()
+            return f.getvalue()
+
+    @staticmethod
+    def load_image_file(filename):
+        image = LabelFile.read_image_file(filename)
+        if image is None:
+            return
+        imageData, image_pil = image
+        if imageData is None:
+            imageData = LabelFile.encode_image(image_pil, filename)
+        return imageData
 
     @staticmethod
     def load_image_pair(filename_date1, filename_date2):
-        try:
-            image_date1_pil = PIL.Image.open(filename_date1)
-            image_date2_pil = PIL.Image.open(filename_date2)
-        except IOError:
+        image_date1Data = LabelFile.load_image_file(filename_date1)
+        image_date2Data = LabelFile.load_image_file(filename_date2)
+        if image_date1Data is None or image_date2Data is None:
             logger.error('Failed opening image pair: {} {}'.format(filename_date1, filename_date2))
             return
+        return image_date1Data, image_date2Data
 
-        # apply orientation to image according to exif
-        image_date1_pil = utils.apply_exif_orientation(image_date1_pil)
-        image_date2_pil = utils.apply_exif_orientation(image_date2_pil)
-
-        date1_f = io.BytesIO()
-        date2_f = io.BytesIO()
-        if date1_f and date2_f:
-            date1_ext = osp.splitext(filename_date1)[-1].lower()
-            date2_ext = osp.splitext(filename_date2)[-1].lower()
-            if PY2 and QT4:
-                format = 'PNG'
-            elif date1_ext in ['.jpg', '.jpeg'] and date2_ext in ['.jpg', '.jpeg']:
-                format = 'JPEG'
-            else:
-                format = 'PNG'
-            image_date1_pil.save(date1_f, format=format)
-            image_date2_pil.save(date2_f, format=format)
-            date1_f.seek(0)
-            date2_f.seek(0)
-            return date1_f.read(), date2_f.read()
-
-    def load(self, filename):
+    def load(self, filename, load_images=True):
         keys = [
             'image_date1Data',
             'image_date2Data'
@@ -108,24 +121,29 @@ class LabelFile(object):
                 if PY2 and QT4:
                     image_date1Data = utils.img_data_to_png_data(image_date1Data)
                     image_date2Data = utils.img_data_to_png_data(image_date2Data)
-            else:
+            elif load_images:
                 # relative path from label file to relative path from cwd
                 image_date1Path = osp.join(osp.dirname(filename), data['image_date1Path'])
                 image_date2Path = osp.join(osp.dirname(filename), data['image_date2Path'])
                 image_date1Data, image_date2Data = self.load_image_pair(image_date1Path, image_date2Path)
+            else:
+                # the caller loads the images of the pair it opens and
+                # checks their size, see check_image_size
+                image_date1Data, image_date2Data = None, None
             flags = data.get('flags') or {}
             image_date1Path = data['image_date1Path']
             image_date2Path = data['image_date2Path']
-            self._check_image_height_and_width(
-                base64.b64encode(image_date1Data).decode('utf-8'),
-                data.get('imageHeight'),
-                data.get('imageWidth'),
-            )
-            self._check_image_height_and_width(
-                base64.b64encode(image_date2Data).decode('utf-8'),
-                data.get('imageHeight'),
-                data.get('imageWidth'),
-            )
+            if image_date1Data is not None and image_date2Data is not None:
+                self._check_image_height_and_width(
+                    image_date1Data,
+                    data.get('imageHeight'),
+                    data.get('imageWidth'),
+                )
+                self._check_image_height_and_width(
+                    image_date2Data,
+                    data.get('imageHeight'),
+                    data.get('imageWidth'),
+                )
             lineColor = data['lineColor']
             fillColor = data['fillColor']
             shapes = (
@@ -154,6 +172,8 @@ class LabelFile(object):
         self.image_date2Path = image_date2Path
         self.image_date1Data = image_date1Data
         self.image_date2Data = image_date2Data
+        self.imageHeight = data.get('imageHeight')
+        self.imageWidth = data.get('imageWidth')
         self.lineColor = lineColor
         self.fillColor = fillColor
         self.filename = filename
@@ -161,19 +181,31 @@ class LabelFile(object):
 
     @staticmethod
     def _check_image_height_and_width(imageData, imageHeight, imageWidth):
-        img_arr = utils.img_b64_to_arr(imageData)
-        if imageHeight is not None and img_arr.shape[0] != imageHeight:
+        # PIL parses only the header until pixels are accessed
+        with io.BytesIO(imageData) as f:
+            width, height = PIL.Image.open(f).size
+        return LabelFile._check_image_size(
+            width, height, imageHeight, imageWidth)
+
+    def check_image_size(self, width, height):
+        """Check the size of an image the caller decoded, see load."""
+        return self._check_image_size(
+            width, height, self.imageHeight, self.imageWidth)
+
+    @staticmethod
+    def _check_image_size(width, height, imageHeight, imageWidth):
+        if imageHeight is not None and height != imageHeight:
             logger.error(
                 'imageHeight does not match with imageData or imagePath, '
                 'so getting imageHeight from actual image.'
             )
-            imageHeight = img_arr.shape[0]
-        if imageWidth is not None and img_arr.shape[1] != imageWidth:
+            imageHeight = height
+        if imageWidth is not None and width != imageWidth:
             logger.error(
                 'imageWidth does not match with imageData or imagePath, '
                 'so getting imageWidth from actual image.'
             )
-            imageWidth = img_arr.shape[1]
+            imageWidth = width
         return imageHeight, imageWidth
 
     def save(
@@ -192,14 +224,14 @@ class LabelFile(object):
         flags=None,
     ):
         if image_date1Data is not None and image_date2Data is not None:
-            image_date1Data = base64.b64encode(image_date1Data).decode('utf-8')
-            image_date2Data = base64.b64encode(image_date2Data).decode('utf-8')
             imageHeight, imageWidth = self._check_image_height_and_width(
                 image_date1Data, imageHeight, imageWidth
             )
             imageHeight, imageWidth = self._check_image_height_and_width(
                 image_date2Data, imageHeight, imageWidth
             )
+            image_date1Data = base64.b64encode(image_date1Data).decode('utf-8')
+            image_date2Data = base64.b64encode(image_date2Data).decode('utf-8')
         if otherData is None:
             otherData = {}
         if flags is None:
@@ -219,11 +251,23 @@ class LabelFile(object):
         )
         for key, value in otherData.items():
             data[key] = value
+        # Write to a temporary file and rename it, so that readers never
+        # see a half-written label file.
+        tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
         try:
-            with open(filename, 'wb' if PY2 else 'w') as f:
+            with open(tmp_filename, 'wb' if PY2 else 'w') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+            if hasattr(os, 'replace'):
+                os.replace(tmp_filename, filename)
+            else:
+                if os.name == 'nt' and osp.exists(filename):
+                    # os.rename does not overwrite on Windows
+                    os.remove(filename)
+                os.rename(tmp_filename, filename)
             self.filename = filename
         except Exception as e:
+            if osp.exists(tmp_filename):
+                os.remove(tmp_filename)
             raise LabelFileError(e)
 
     @staticmethod
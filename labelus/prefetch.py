@@ -0,0 +1,265 @@
+import collections
+import os.path as osp
+import threading
+
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.image_cache import image_cache
+from labelus.label_file import LabelFile
+from labelus.logger import logger
+from labelus.pyramid import pyramid_cache
+
+
+def _file_stamp(filename):
+    try:
+        return osp.getmtime(filename)
+    except OSError:
+        return None
+
+
+def _load_image(filename):
+    pyramid = pyramid_cache.load(filename)
+    if pyramid is not None:
+        # too large to be decoded whole, the canvas draws it tile by tile
+        return None, pyramid
+    return image_cache.load(filename)
+
+
+class PairData(object):
+
+    """Everything `MainWindow.loadPair` needs to display an image pair."""
+
+    def __init__(self, filename_date1, filename_date2, label_file=None):
+        self.filename_date1 = filename_date1
+        self.filename_date2 = filename_date2
+        self.label_file = label_file
+        self.label_stamp = _file_stamp(label_file) if label_file else None
+        self.labelFile = None
+        self.image_date1Data = None
+        self.image_date2Data = None
+        self.image_date1 = QtGui.QImage()
+        self.image_date2 = QtGui.QImage()
+
+    @property
+    def key(self):
+        return self.filename_date1, self.filename_date2
+
+    def isStale(self):
+        """Return True if the label file changed since this pair was read."""
+        if not self.label_file:
+            return False
+        return _file_stamp(self.label_file) != self.label_stamp
+
+    def nbytes(self):
+        n = 0
+        for data in (self.image_date1Data, self.image_date2Data):
+            if data:
+                n += len(data)
+        for image in (self.image_date1, self.image_date2):
+            n += image.byteCount()
+        return n
+
+
+def load_pair_data(filename_date1, filename_date2, label_file=None):
+    """Read and decode an image pair and its label file.
+
+    Images are decoded through the process-wide `image_cache` unless they
+    are embedded in the label file. Very large images are not decoded, an
+    `ImagePyramid` from `pyramid_cache` takes the place of their QImage.
+    The images read from `filename_date1` and `filename_date2` are checked
+    against the size recorded in the label file. This does not touch any
+    widget, so it is safe to call from a worker thread. Raises
+    `LabelFileError` if `label_file` exists but is invalid.
+    """
+    pair = PairData(filename_date1, filename_date2, label_file)
+    if label_file and osp.exists(label_file) and \
+            LabelFile.is_label_file(label_file):
+        pair.labelFile = LabelFile(label_file, load_images=False)
+        pair.image_date1Data = pair.labelFile.image_date1Data
+        pair.image_date2Data = pair.labelFile.image_date2Data
+    if pair.image_date1Data and pair.image_date2Data:
+        pair.image_date1 = QtGui.QImage.fromData(pair.image_date1Data)
+        pair.image_date2 = QtGui.QImage.fromData(pair.image_date2Data)
+        return pair
+    date1 = _load_image(filename_date1)
+    date2 = _load_image(filename_date2)
+    if date1 is None or date2 is None:
+        logger.error('Failed opening image pair: {} {}'
+                     .format(filename_date1, filename_date2))
+        return pair
+    pair.image_date1Data, pair.image_date1 = date1
+    pair.image_date2Data, pair.image_date2 = date2
+    if pair.labelFile is not None:
+        for image in (pair.image_date1, pair.image_date2):
+            pair.labelFile.check_image_size(image.width(), image.height())
+    return pair
+
+
+class _PrefetchSignals(QtCore.QObject):
+
+    loaded = QtCore.Signal(object)
+
+
+class _PrefetchTask(QtCore.QRunnable):
+
+    def __init__(self, prefetcher, filename_date1, filename_date2,
+                 label_file):
+        super(_PrefetchTask, self).__init__()
+        self.prefetcher = prefetcher
+        self.filename_date1 = filename_date1
+        self.filename_date2 = filename_date2
+        self.label_file = label_file
+        self.key = (filename_date1, filename_date2)
+        self.started = False
+        self.pair = None
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            # The task may have been cancelled while it was queued.
+            if self.prefetcher._start(self):
+                self.pair = load_pair_data(
+                    self.filename_date1, self.filename_date2, self.label_file
+                )
+        except Exception as e:
+            logger.debug('Failed to prefetch {}: {}'.format(self.key, e))
+        finally:
+            self.done.set()
+        try:
+            self.prefetcher._signals.loaded.emit(self)
+        except RuntimeError:
+            # prefetcher has already been destroyed
+            pass
+
+
+class PairPrefetcher(QtCore.QObject):
+
+    """Decode neighbouring pairs on a thread pool ahead of navigation.
+
+    Decoded pairs are kept until `take` hands them over to the GUI, or until
+    they are no longer among the wanted neighbours. The total size of the
+    kept pairs is bounded by `memory_budget` (in bytes).
+    """
+
+    def __init__(self, memory_budget, max_threads=2, parent=None):
+        super(PairPrefetcher, self).__init__(parent)
+        self.memory_budget = memory_budget
+        # the pool must be destroyed (and joined) before the signals object
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, max_threads))
+        self._signals = _PrefetchSignals(self)
+        self._signals.loaded.connect(self._onLoaded)
+        self._lock = threading.Lock()
+        self._wanted = collections.OrderedDict()  # key -> label_file
+        # key -> _PrefetchTask queued or decoding, guarded by _lock
+        self._pending = {}
+        self._pairs = collections.OrderedDict()  # key -> PairData
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def prefetch(self, pairs):
+        """Prefetch `pairs`, a list of (date1, date2, label_file) by priority.
+
+        Previously prefetched pairs which are not listed are dropped.
+        """
+        wanted = collections.OrderedDict()
+        for filename_date1, filename_date2, label_file in pairs:
+            wanted[(filename_date1, filename_date2)] = label_file
+        with self._lock:
+            self._wanted = wanted
+        for key in list(self._pairs):
+            if key not in wanted:
+                self._drop(key)
+        for key, label_file in wanted.items():
+            self._schedule(key, label_file)
+
+    def cancel(self):
+        """Stop prefetching; already decoded pairs are kept until replaced.
+
+        Pairs being decoded are finished, so that they are not decoded a
+        second time if wanted again.
+        """
+        with self._lock:
+            self._wanted = collections.OrderedDict()
+            self._pool.clear()
+            self._pending = dict((key, task)
+                                 for key, task in self._pending.items()
+                                 if task.started)
+
+    def clear(self):
+        self.cancel()
+        for key in list(self._pairs):
+            self._drop(key)
+
+    def invalidate(self, label_file):
+        """Drop prefetched pairs read from `label_file`."""
+        for key, pair in list(self._pairs.items()):
+            if pair.label_file == label_file:
+                self._drop(key)
+
+    def take(self, filename_date1, filename_date2, label_file=None):
+        """Return and forget the prefetched pair, or None on a miss.
+
+        Waits for the pair if it is being decoded.
+        """
+        key = (filename_date1, filename_date2)
+        with self._lock:
+            task = self._pending.pop(key, None)
+            started = task is not None and task.started
+        if started:
+            task.done.wait()
+            pair = task.pair
+        else:
+            pair = self._pairs.get(key)
+        if pair is None:
+            return None
+        self._drop(key)
+        if pair.label_file != label_file or pair.isStale():
+            return None
+        return pair
+
+    def _schedule(self, key, label_file):
+        with self._lock:
+            if key in self._pairs or key in self._pending:
+                return
+            task = _PrefetchTask(self, key[0], key[1], label_file)
+            self._pending[key] = task
+        self._pool.start(task)
+
+    def _start(self, task):
+        """Return True if `task` is still wanted and mark it as started."""
+        with self._lock:
+            if self._pending.get(task.key) is not task or \
+                    task.key not in self._wanted:
+                return False
+            task.started = True
+            return True
+
+    def _drop(self, key):
+        pair = self._pairs.pop(key, None)
+        if pair is not None:
+            self._nbytes -= pair.nbytes()
+
+    def _onLoaded(self, task):
+        key, pair = task.key, task.pair
+        with self._lock:
+            if self._pending.get(key) is not task:
+                # cancelled before it started, or handed over by take
+                return
+            del self._pending[key]
+            if key not in self._wanted:
+                return
+        if key in self._pairs or pair is None:
+            return
+        nbytes = pair.nbytes()
+        if self._nbytes + nbytes > self.memory_budget:
+            logger.debug(
+                'Prefetch memory budget exceeded, skipping: {}'.format(key)
+            )
+            return
+        self._pairs[key] = pair
+        self._nbytes += nbytes
@@ -0,0 +1,298 @@
+import collections
+import hashlib
+import json
+import math
+import os
+import os.path as osp
+import shutil
+import threading
+
+import PIL.Image
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.logger import logger
+from labelus import utils
+
+
+PIL.Image.MAX_IMAGE_PIXELS = None
+
+INDEX_FILE = 'pyramid.json'
+
+
+def image_size(filename):
+    """Return (width, height) of an image, reading only its header."""
+    image = PIL.Image.open(filename)
+    try:
+        size = image.size
+        if utils.get_exif_orientation(image) in (5, 6, 7, 8):
+            # rotated by 90 degrees when displayed
+            size = size[::-1]
+        return size
+    finally:
+        image.close()
+
+
+def build_pyramid(filename, dirname, tile_size=512):
+    """Write the tiles of `filename` at all resolutions under `dirname`.
+
+    Level 0 is the full resolution image and each level halves the previous
+    one, down to a level that fits in a single tile. The tiles are written to
+    a temporary directory which is renamed to `dirname` once complete. The
+    index records the image path and the size of the tiles on disk.
+    """
+    image = PIL.Image.open(filename)
+    image = utils.apply_exif_orientation(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+
+    tmpdir = '{}.{}.tmp'.format(dirname, os.getpid())
+    if osp.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+    levels = []
+    nbytes = 0
+    while True:
+        width, height = image.size
+        levels.append((width, height))
+        level_dir = osp.join(tmpdir, str(len(levels) - 1))
+        os.makedirs(level_dir)
+        for row in range(int(math.ceil(height / float(tile_size)))):
+            for col in range(int(math.ceil(width / float(tile_size)))):
+                x, y = col * tile_size, row * tile_size
+                tile = image.crop((x, y, min(x + tile_size, width),
+                                   min(y + tile_size, height)))
+                tile_file = osp.join(level_dir, '{}_{}.png'.format(col, row))
+                tile.save(tile_file, compress_level=1)
+                nbytes += osp.getsize(tile_file)
+        if width <= tile_size and height <= tile_size:
+            break
+        image = image.resize(
+            (max(1, (width + 1) // 2), max(1, (height + 1) // 2)),
+            PIL.Image.BOX,
+        )
+    with open(osp.join(tmpdir, INDEX_FILE), 'w') as f:
+        json.dump({'tile_size': tile_size, 'levels': levels,
+                   'source': osp.abspath(filename), 'nbytes': nbytes}, f)
+    try:
+        os.rename(tmpdir, dirname)
+    except OSError:
+        # built concurrently by another process
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        if not osp.exists(osp.join(dirname, INDEX_FILE)):
+            raise
+
+
+def _disk_usage(dirname):
+    nbytes = 0
+    for root, _, filenames in os.walk(dirname):
+        for filename in filenames:
+            nbytes += osp.getsize(osp.join(root, filename))
+    return nbytes
+
+
+class ImagePyramid(object):
+
+    """Tiled multi-resolution copy of a large image, read back from disk.
+
+    Tiles are decoded on demand when drawn, keeping at most `max_bytes` of
+    the most recently drawn ones in memory. The pyramid exposes the size API
+    of QImage/QPixmap, so that it can stand in for the decoded image.
+    """
+
+    def __init__(self, dirname, max_bytes=128 * 1024 * 1024):
+        with open(osp.join(dirname, INDEX_FILE)) as f:
+            index = json.load(f)
+        self.dirname = dirname
+        self.tile_size = index['tile_size']
+        self.levels = [tuple(size) for size in index['levels']]
+        self.max_bytes = max_bytes
+        self._tiles = collections.OrderedDict()
+        self._nbytes = 0
+
+    def width(self):
+        return self.levels[0][0]
+
+    def height(self):
+        return self.levels[0][1]
+
+    def size(self):
+        return QtCore.QSize(self.width(), self.height())
+
+    def rect(self):
+        return QtCore.QRect(0, 0, self.width(), self.height())
+
+    def isNull(self):
+        return False
+
+    def __bool__(self):
+        return True
+
+    __nonzero__ = __bool__
+
+    def byteCount(self):
+        """Size of the decoded tiles kept in memory."""
+        return self._nbytes
+
+    def levelFor(self, scale):
+        """Return the coarsest level with at least one pixel per screen pixel.
+        """
+        level = 0
+        while level + 1 < len(self.levels) and scale * 2 ** (level + 1) <= 1:
+            level += 1
+        return level
+
+    def tile(self, level, col, row):
+        key = (level, col, row)
+        image = self._tiles.get(key)
+        if image is not None:
+            # mark as most recently used
+            self._tiles[key] = self._tiles.pop(key)
+            return image
+        image = QtGui.QImage(osp.join(
+            self.dirname, str(level), '{}_{}.png'.format(col, row)))
+        self._tiles[key] = image
+        self._nbytes += image.byteCount()
+        while len(self._tiles) > 1 and self._nbytes > self.max_bytes:
+            _, evicted = self._tiles.popitem(last=False)
+            self._nbytes -= evicted.byteCount()
+        return image
+
+    def draw(self, painter, rect, scale):
+        """Draw the part of the image within `rect` at the painter's `scale`.
+
+        Only the tiles of the level matching `scale` which intersect `rect`,
+        in full resolution coordinates, are read.
+        """
+        level = self.levelFor(scale)
+        width, height = self.levels[level]
+        fx = self.width() / float(width)
+        fy = self.height() / float(height)
+        size = self.tile_size
+        col1 = max(0, int(rect.left() / fx) // size)
+        col2 = min((width - 1) // size, int(rect.right() / fx) // size)
+        row1 = max(0, int(rect.top() / fy) // size)
+        row2 = min((height - 1) // size, int(rect.bottom() / fy) // size)
+        for row in range(row1, row2 + 1):
+            for col in range(col1, col2 + 1):
+                tile = self.tile(level, col, row)
+                if tile.isNull():
+                    continue
+                target = QtCore.QRectF(col * size * fx, row * size * fy,
+                                       tile.width() * fx, tile.height() * fy)
+                painter.drawImage(target, tile)
+
+
+class PyramidCache(object):
+
+    """Find or build the pyramids of images too large to be decoded whole.
+
+    Pyramids are stored under `cache_dir` keyed by (path, mtime, size) of the
+    image, so they are built once per image version. Images with less than
+    `min_pixels` pixels are not tiled; `min_pixels` of 0 disables pyramids.
+    Building a pyramid removes those of older versions of the image and the
+    least recently used ones beyond `disk_bytes`, 0 for no limit. It is safe
+    to use from worker threads.
+    """
+
+    def __init__(self, cache_dir=None, min_pixels=8192 * 8192,
+                 tile_size=512, tile_bytes=128 * 1024 * 1024,
+                 disk_bytes=8 * 1024 ** 3):
+        self.configure(cache_dir, min_pixels, tile_size, tile_bytes,
+                       disk_bytes)
+        self._lock = threading.Lock()
+        self._building = {}  # dirname -> lock
+
+    def configure(self, cache_dir=None, min_pixels=8192 * 8192,
+                  tile_size=512, tile_bytes=128 * 1024 * 1024,
+                  disk_bytes=8 * 1024 ** 3):
+        if cache_dir is None:
+            cache_dir = osp.join(
+                osp.expanduser('~'), '.cache', 'labelus', 'pyramids')
+        self.cache_dir = cache_dir
+        self.min_pixels = min_pixels
+        self.tile_size = tile_size
+        self.tile_bytes = tile_bytes
+        self.disk_bytes = disk_bytes
+
+    def dirname(self, filename):
+        stat = os.stat(filename)
+        key = '{}\0{}\0{}'.format(
+            osp.abspath(filename), stat.st_mtime, stat.st_size)
+        return osp.join(self.cache_dir,
+                        hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def load(self, filename):
+        """Return the ImagePyramid of `filename`, building it on first use.
+
+        Returns None if the image is small enough to be decoded whole, or if
+        it cannot be read.
+        """
+        if not self.min_pixels:
+            return None
+        try:
+            width, height = image_size(filename)
+            dirname = self.dirname(filename)
+        except (IOError, OSError):
+            return None
+        if width * height < self.min_pixels:
+            return None
+        with self._lock:
+            lock = self._building.setdefault(dirname, threading.Lock())
+        try:
+            with lock:
+                index_file = osp.join(dirname, INDEX_FILE)
+                if osp.exists(index_file):
+                    # the modification time of the index orders evictions
+                    os.utime(index_file, None)
+                else:
+                    logger.info('Building image pyramid of {}'
+                                .format(filename))
+                    build_pyramid(filename, dirname, self.tile_size)
+                    self.evict(keep=dirname)
+            return ImagePyramid(dirname, self.tile_bytes)
+        except Exception as e:
+            logger.error('Failed to build image pyramid of {}: {}'
+                         .format(filename, e))
+            return None
+
+    def evict(self, keep=None):
+        """Remove the pyramids of older versions of the image of `keep`,
+        then the least recently used ones until `disk_bytes` are left.
+        """
+        entries = []  # (last use, dirname, image path, size)
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            dirname = osp.join(self.cache_dir, name)
+            index_file = osp.join(dirname, INDEX_FILE)
+            try:
+                with open(index_file) as f:
+                    index = json.load(f)
+                used = osp.getmtime(index_file)
+            except (IOError, OSError, ValueError):
+                continue  # being built, or not a pyramid
+            nbytes = index.get('nbytes')
+            if nbytes is None:
+                nbytes = _disk_usage(dirname)
+            entries.append((used, dirname, index.get('source'), nbytes))
+        sources = [source for _, dirname, source, _ in entries
+                   if dirname == keep and source is not None]
+        removed = [entry for entry in entries
+                   if entry[2] in sources and entry[1] != keep]
+        if self.disk_bytes:
+            total = sum(entry[3] for entry in entries
+                        if entry not in removed)
+            for entry in sorted(entries):
+                if total <= self.disk_bytes:
+                    break
+                if entry[1] != keep and entry not in removed:
+                    removed.append(entry)
+                    total -= entry[3]
+        for _, dirname, source, _ in removed:
+            logger.info('Removing image pyramid of {}'.format(source))
+            shutil.rmtree(dirname, ignore_errors=True)
+
+
+pyramid_cache = PyramidCache()
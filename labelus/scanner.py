@@ -0,0 +1,345 @@
+import hashlib
+import itertools
+import json
+import os
+import os.path as osp
+import threading
+import time
+
+from qtpy import QtCore
+
+from labelus.logger import logger
+
+
+def _list_dir(dirpath):
+    """Return sorted (files, subdirs) names of `dirpath`.
+
+    Like `os.walk`, symbolic links to directories are not followed.
+    """
+    files = []
+    subdirs = []
+    if hasattr(os, 'scandir'):
+        for entry in os.scandir(dirpath):
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    else:
+        for name in os.listdir(dirpath):
+            path = osp.join(dirpath, name)
+            if osp.isdir(path) and not osp.islink(path):
+                subdirs.append(name)
+            else:
+                files.append(name)
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+
+def manifest_filename(dirpath, cache_dir=None):
+    """Return where the scan manifest of `dirpath` is kept."""
+    if cache_dir is None:
+        cache_dir = osp.join(osp.expanduser('~'), '.cache', 'labelus', 'scans')
+    key = osp.abspath(dirpath).encode('utf-8')
+    return osp.join(cache_dir, hashlib.sha1(key).hexdigest() + '.json')
+
+
+class ScanManifest(object):
+
+    """Listings of the directories of a dataset from a previous scan.
+
+    Each directory is stored with its mtime, subdirectories, image pairs and
+    label files. A directory whose mtime did not change since can be reused
+    without listing it again. `save` keeps only the directories visited
+    since `load`, so removed directories are forgotten.
+    """
+
+    version = 1
+
+    # directories modified this recently may change again within the
+    # resolution of their mtime, so they are always listed again
+    min_age = 2.0
+
+    def __init__(self, filename, root, extensions):
+        self.filename = filename
+        self.root = osp.abspath(root)
+        self.extensions = sorted(extensions)
+        self._dirs = {}
+        self._visited = {}
+
+    def load(self):
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') == self.version and \
+                data.get('root') == self.root and \
+                data.get('extensions') == self.extensions:
+            self._dirs = data['dirs']
+
+    def get(self, reldir, mtime):
+        """Return (subdirs, pairs, labels) of `reldir` or None if stale."""
+        entry = self._dirs.get(reldir)
+        if entry is None or entry[0] is None or entry[0] != mtime:
+            return None
+        self._visited[reldir] = entry
+        return entry[1], [tuple(pair) for pair in entry[2]], entry[3]
+
+    def put(self, reldir, mtime, subdirs, pairs, labels):
+        if time.time() - mtime < self.min_age:
+            mtime = None
+        self._visited[reldir] = [mtime, subdirs, pairs, labels]
+
+    def save(self):
+        dirname = osp.dirname(self.filename)
+        if not osp.exists(dirname):
+            os.makedirs(dirname)
+        data = dict(
+            version=self.version,
+            root=self.root,
+            extensions=self.extensions,
+            dirs=self._visited,
+        )
+        tmp_filename = '{}.{}.tmp'.format(self.filename, os.getpid())
+        with open(tmp_filename, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        if hasattr(os, 'replace'):
+            os.replace(tmp_filename, self.filename)
+        else:
+            if os.name == 'nt' and osp.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmp_filename, self.filename)
+
+
+def _scan_dir(root, extensions):
+    """Return (subdirs, pairs, labels) of directory `root`.
+
+    pairs is a sorted list of (date1, date2) file names and labels is the
+    list of label files names.
+    """
+    files, subdirs = _list_dir(root)
+    dates = {}  # stem -> [date1, date2]
+    labels = []
+    for name in files:
+        lower = name.lower()
+        if lower.endswith('.json'):
+            labels.append(name)
+            continue
+        if not lower.endswith(extensions):
+            continue
+        if '.d1.' in name:
+            date = 0
+        elif '.d2.' in name:
+            date = 1
+        else:
+            continue
+        pair = dates.setdefault(name.split('.')[0], [None, None])
+        if pair[date] is None:
+            pair[date] = name
+    pairs = [tuple(dates[stem]) for stem in sorted(dates)
+             if None not in dates[stem]]
+    return subdirs, pairs, labels
+
+
+def _pair_paths(root, dir_pairs, names):
+    """Return (pairs, checked) of the pairs of file names in `root`.
+
+    A pair is checked if its label file is in the set of file `names`.
+    """
+    prefix = osp.join(root, '')
+    pairs = []
+    checked = []
+    for date1, date2 in dir_pairs:
+        pairs.append((prefix + date1, prefix + date2))
+        checked.append(date1.split('.')[0] + '.json' in names)
+    return pairs, checked
+
+
+def list_label_files(label_dir):
+    """Return the set of file names in `label_dir`, empty if missing."""
+    try:
+        return set(_list_dir(label_dir)[0])
+    except OSError:
+        return set()
+
+
+def scan_dir_pairs(dirpath, extensions, label_files=None):
+    """Return (subdirs, pairs, checked) of directory `dirpath` alone.
+
+    See `scan_pairs`, `label_files` is the set of file names of the label
+    directory or None if label files are next to the images.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    subdirs, dir_pairs, labels = _scan_dir(dirpath, extensions)
+    names = set(labels) if label_files is None else label_files
+    pairs, checked = _pair_paths(dirpath, dir_pairs, names)
+    return [osp.join(dirpath, name) for name in subdirs], pairs, checked
+
+
+def scan_pairs(dirpath, extensions, label_dir=None, cancelled=None,
+               manifest=None, dirs=None):
+    """Walk `dirpath` and yield the image pairs of each directory.
+
+    Yields (pairs, checked) per directory holding pairs, where pairs is a
+    sorted list of (date1, date2) file names and checked tells whether each
+    pair has a label file, in `label_dir` or else next to its images.
+    `cancelled` is an optional `threading.Event` stopping the walk.
+    Directories unchanged since the scan recorded in the optional
+    `ScanManifest` are not listed again; the others are recorded in it.
+    The path of each directory walked is appended to the optional list
+    `dirs`.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    label_files = None
+    if label_dir is not None:
+        label_files = list_label_files(label_dir)
+    stack = ['']
+    while stack:
+        if cancelled is not None and cancelled.is_set():
+            return
+        reldir = stack.pop()
+        root = osp.join(dirpath, reldir) if reldir else dirpath
+        try:
+            listing = None
+            if manifest is not None:
+                mtime = os.stat(root).st_mtime
+                listing = manifest.get(reldir, mtime)
+            if listing is None:
+                listing = _scan_dir(root, extensions)
+                if manifest is not None:
+                    manifest.put(reldir, mtime, *listing)
+        except OSError as e:
+            logger.warn('Failed to list {}: {}'.format(root, e))
+            continue
+        if dirs is not None:
+            dirs.append(root)
+        subdirs, dir_pairs, labels = listing
+        stack.extend(osp.join(reldir, name) if reldir else name
+                     for name in reversed(subdirs))
+        if not dir_pairs:
+            continue
+        names = set(labels) if label_files is None else label_files
+        yield _pair_paths(root, dir_pairs, names)
+
+
+class PairScanner(QtCore.QObject):
+
+    """Find the image pairs of a directory tree on a worker thread.
+
+    Pairs are streamed through `found` in batches of about `batch_size`
+    pairs, or more often when the walk is slow, so the first pairs can be
+    shown before the whole tree is walked. Starting a new scan cancels the
+    previous one, whose pending batches are then discarded. Once finished,
+    `dirs` lists the directories walked.
+    """
+
+    found = QtCore.Signal(object, object)  # pairs, checked
+    progress = QtCore.Signal(int, int)  # directories with pairs, pairs
+    finished = QtCore.Signal()
+
+    _found = QtCore.Signal(int, object, object)
+    _progress = QtCore.Signal(int, int, int)
+    _finished = QtCore.Signal(int, object)
+
+    def __init__(self, batch_size=2000, interval=0.2, parent=None):
+        super(PairScanner, self).__init__(parent)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._found.connect(self._onFound)
+        self._progress.connect(self._onProgress)
+        self._finished.connect(self._onFinished)
+        self._generation = 0
+        self._cancelled = threading.Event()
+        self._thread = None
+        self.dirs = []
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def scan(self, dirpath, extensions, label_dir=None, manifest_file=None):
+        """Scan `dirpath`, or each directory of a list, see `scan_pairs`.
+
+        If `manifest_file` is given, the directory listings of a single
+        `dirpath` are reused from and saved to it.
+        """
+        if isinstance(dirpath, (list, tuple)):
+            assert manifest_file is None
+            dirpaths = list(dirpath)
+        else:
+            dirpaths = [dirpath]
+        self.cancel()
+        self._generation += 1
+        self.dirs = []
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._generation, self._cancelled,
+                  dirpaths, extensions, label_dir, manifest_file),
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+        # batches already emitted by the cancelled scan are ignored
+        self._generation += 1
+
+    def wait(self):
+        if self._thread is not None:
+            self._thread.join()
+        QtCore.QCoreApplication.sendPostedEvents(self)
+
+    def _run(self, generation, cancelled, dirpaths, extensions, label_dir,
+             manifest_file):
+        manifest = None
+        if manifest_file is not None:
+            manifest = ScanManifest(manifest_file, dirpaths[0], extensions)
+            manifest.load()
+        pairs = []
+        checked = []
+        dirs = []
+        n_dirs = n_pairs = 0
+        last_emit = time.time()
+        try:
+            for dir_pairs, dir_checked in itertools.chain.from_iterable(
+                    scan_pairs(dirpath, extensions, label_dir, cancelled,
+                               manifest, dirs)
+                    for dirpath in dirpaths):
+                pairs.extend(dir_pairs)
+                checked.extend(dir_checked)
+                n_dirs += 1
+                n_pairs += len(dir_pairs)
+                if len(pairs) >= self.batch_size or \
+                        time.time() - last_emit >= self.interval:
+                    self._found.emit(generation, pairs, checked)
+                    self._progress.emit(generation, n_dirs, n_pairs)
+                    pairs = []
+                    checked = []
+                    last_emit = time.time()
+            if pairs:
+                self._found.emit(generation, pairs, checked)
+            self._progress.emit(generation, n_dirs, n_pairs)
+            if manifest is not None and not cancelled.is_set():
+                try:
+                    manifest.save()
+                except (IOError, OSError) as e:
+                    logger.warn('Failed to save scan manifest {}: {}'
+                                .format(manifest_file, e))
+            self._finished.emit(generation, dirs)
+        except RuntimeError:
+            # the scanner has already been destroyed
+            pass
+
+    def _onFound(self, generation, pairs, checked):
+        if generation == self._generation:
+            self.found.emit(pairs, checked)
+
+    def _onProgress(self, generation, n_dirs, n_pairs):
+        if generation == self._generation:
+            self.progress.emit(n_dirs, n_pairs)
+
+    def _onFinished(self, generation, dirs):
+        if generation == self._generation:
+            self.dirs = dirs
+            self.finished.emit()
@@ -1,14 +1,10 @@
-import copy
 import math
 
+import numpy as np
 from qtpy import QtCore
 from qtpy import QtGui
 
-import labelus.utils
-
-
-# TODO(unknown):
-# - [opt] Store paths instead of creating new ones at each paint.
+from labelus.utils import simplify_polyline
 
 
 DEFAULT_LINE_COLOR = QtGui.QColor(0, 255, 0, 128)
@@ -21,13 +17,26 @@ DEFAULT_HVERTEX_FILL_COLOR = QtGui.QColor(255, 0, 0)
 
 class Shape(object):
 
+    """A labelled polygon, rectangle, circle, line, line strip or point.
+
+    Points are kept in a contiguous (N, 2) float array, grown geometrically
+    as points are added. `points` and indexing return `QPointF` copies built
+    on access, edits go through the methods below.
+    """
+
+    __slots__ = ('label', 'fill', 'selected', 'flags', '_shape_type',
+                 '_closed', '_coords', '_n', '_line_color', '_fill_color',
+                 '_highlightIndex', '_highlightMode',
+                 '_linePath', '_vertexPath', '_vertexPathKey',
+                 '_lodPaths', '_meanEdge')
+
     P_SQUARE, P_ROUND = 0, 1
 
     MOVE_VERTEX, NEAR_VERTEX = 0, 1
 
     # The following class variables influence the drawing of all shape objects.
-    line_color = DEFAULT_LINE_COLOR
-    fill_color = DEFAULT_FILL_COLOR
+    default_line_color = DEFAULT_LINE_COLOR
+    default_fill_color = DEFAULT_FILL_COLOR
     select_line_color = DEFAULT_SELECT_LINE_COLOR
     select_fill_color = DEFAULT_SELECT_FILL_COLOR
     vertex_fill_color = DEFAULT_VERTEX_FILL_COLOR
@@ -35,33 +44,93 @@ class Shape(object):
     point_type = P_ROUND
     point_size = 2
     scale = 0.1
+    # Level of detail of shapes neither selected nor highlighted: outlines
+    # are simplified within lod_tolerance screen pixels and vertex markers
+    # are hidden when vertices are on average closer than
+    # lod_marker_spacing screen pixels. A lod_tolerance of 0 disables both.
+    lod_tolerance = 0.5
+    lod_marker_spacing = 4
+
+    _highlightSettings = {
+        NEAR_VERTEX: (8, P_ROUND),
+        MOVE_VERTEX: (1.5, P_SQUARE),
+    }
 
     def __init__(self, label=None, line_color=None, shape_type=None,
                  flags=None):
         self.label = label
-        self.points = []
+        self._coords = np.empty((0, 2), dtype=np.float64)
+        self._n = 0
         self.fill = False
         self.selected = False
-        self.shape_type = shape_type
         self.flags = flags
 
         self._highlightIndex = None
         self._highlightMode = self.NEAR_VERTEX
-        self._highlightSettings = {
-            self.NEAR_VERTEX: (8, self.P_ROUND),
-            self.MOVE_VERTEX: (1.5, self.P_SQUARE),
-        }
 
         self._closed = False
 
-        if line_color is not None:
-            # Override the class line_color attribute
-            # with an object attribute. Currently this
-            # is used for drawing the pending line a different color.
-            self.line_color = line_color
+        # painter paths built lazily and reused across paints
+        self._linePath = None
+        self._vertexPath = None
+        self._vertexPathKey = None
+        self._lodPaths = {}  # tolerance -> simplified outline
+        self._meanEdge = None
+
+        # Override the class line_color attribute with an object attribute.
+        # Currently this is used for drawing the pending line a different
+        # color.
+        self._line_color = line_color
+        self._fill_color = None
 
         self.shape_type = shape_type
 
+    @property
+    def line_color(self):
+        if self._line_color is None:
+            return self.default_line_color
+        return self._line_color
+
+    @line_color.setter
+    def line_color(self, value):
+        self._line_color = value
+
+    @property
+    def fill_color(self):
+        if self._fill_color is None:
+            return self.default_fill_color
+        return self._fill_color
+
+    @fill_color.setter
+    def fill_color(self, value):
+        self._fill_color = value
+
+    @property
+    def points(self):
+        return [QtCore.QPointF(x, y) for x, y in self.pointsArray.tolist()]
+
+    @points.setter
+    def points(self, value):
+        if isinstance(value, np.ndarray):
+            coords = np.array(value, dtype=np.float64).reshape(-1, 2)
+        else:
+            coords = np.array([(p.x(), p.y()) for p in value],
+                              dtype=np.float64).reshape(-1, 2)
+        self._coords = coords
+        self._n = len(coords)
+        self._pointsChanged()
+
+    def _pointsChanged(self):
+        self._linePath = None
+        self._vertexPath = None
+        self._lodPaths = {}
+        self._meanEdge = None
+
+    @property
+    def pointsArray(self):
+        """(N, 2) float array of the points, a view of the shape storage."""
+        return self._coords[:self._n]
+
     @property
     def shape_type(self):
         return self._shape_type
@@ -74,29 +143,56 @@ class Shape(object):
            'line', 'circle', 'linestrip']:
             raise ValueError('Unexpected shape_type: {}'.format(value))
         self._shape_type = value
+        self._pointsChanged()
 
     def close(self):
         self._closed = True
+        self._linePath = None
+        self._lodPaths = {}
+        # no more points are expected, release the spare capacity
+        if len(self._coords) > self._n:
+            self._coords = self._coords[:self._n].copy()
 
     def addPoint(self, point):
-        if self.points and point == self.points[0]:
+        if self._n and point == self[0]:
             self.close()
         else:
-            self.points.append(point)
+            if self._n == len(self._coords):
+                coords = np.empty((max(4, 2 * self._n), 2), dtype=np.float64)
+                coords[:self._n] = self._coords[:self._n]
+                self._coords = coords
+            self._coords[self._n] = (point.x(), point.y())
+            self._n += 1
+            self._pointsChanged()
 
     def popPoint(self):
-        if self.points:
-            return self.points.pop()
+        if self._n:
+            point = self[-1]
+            self._n -= 1
+            self._pointsChanged()
+            return point
         return None
 
     def insertPoint(self, i, point):
-        self.points.insert(i, point)
+        self._coords = np.insert(
+            self.pointsArray, i, (point.x(), point.y()), axis=0)
+        self._n += 1
+        self._pointsChanged()
+
+    def removePoint(self, i):
+        point = self[i]
+        self._coords = np.delete(self.pointsArray, i, axis=0)
+        self._n -= 1
+        self._pointsChanged()
+        return point
 
     def isClosed(self):
         return self._closed
 
     def setOpen(self):
         self._closed = False
+        self._linePath = None
+        self._lodPaths = {}
 
     def getRectFromLine(self, pt1, pt2):
         x1, y1 = pt1.x(), pt1.y()
@@ -104,7 +200,7 @@ class Shape(object):
         return QtCore.QRectF(x1, y1, x2 - x1, y2 - y1)
 
     def paint(self, painter):
-        if self.points:
+        if self._n:
             color = self.select_line_color \
                 if self.selected else self.line_color
             pen = QtGui.QPen(color)
@@ -112,90 +208,135 @@ class Shape(object):
             pen.setWidth(max(1, int(round(2.0 / self.scale))))
             painter.setPen(pen)
 
-            line_path = QtGui.QPainterPath()
-            vrtx_path = QtGui.QPainterPath()
-
-            if self.shape_type == 'rectangle':
-                assert len(self.points) in [1, 2]
-                if len(self.points) == 2:
-                    rectangle = self.getRectFromLine(*self.points)
-                    line_path.addRect(rectangle)
-                for i in range(len(self.points)):
-                    self.drawVertex(vrtx_path, i)
-            elif self.shape_type == "circle":
-                assert len(self.points) in [1, 2]
-                if len(self.points) == 2:
-                    rectangle = self.getCircleRectFromLine(self.points)
-                    line_path.addEllipse(rectangle)
-                for i in range(len(self.points)):
-                    self.drawVertex(vrtx_path, i)
-            elif self.shape_type == "linestrip":
-                line_path.moveTo(self.points[0])
-                for i, p in enumerate(self.points):
-                    line_path.lineTo(p)
-                    self.drawVertex(vrtx_path, i)
-            else:
-                line_path.moveTo(self.points[0])
-                # Uncommenting the following line will draw 2 paths
-                # for the 1st vertex, and make it non-filled, which
-                # may be desirable.
-                # self.drawVertex(vrtx_path, 0)
-
-                for i, p in enumerate(self.points):
-                    line_path.lineTo(p)
-                    self.drawVertex(vrtx_path, i)
-                if self.isClosed():
-                    line_path.lineTo(self.points[0])
-
+            # full detail while the shape may be edited
+            full = self.selected or self._highlightIndex is not None or \
+                self.lod_tolerance <= 0
+            line_path = self.linePath() if full else self.lodPath()
             painter.drawPath(line_path)
-            painter.drawPath(vrtx_path)
-            painter.fillPath(vrtx_path, self.vertex_fill_color)
+
+            if full or self.meanEdgeLength() * self.scale >= \
+                    self.lod_marker_spacing:
+                if self._highlightIndex is not None:
+                    vertex_fill_color = self.hvertex_fill_color
+                else:
+                    vertex_fill_color = self.vertex_fill_color
+                vrtx_path = self.vertexPath()
+                painter.drawPath(vrtx_path)
+                painter.fillPath(vrtx_path, vertex_fill_color)
             if self.fill:
                 color = self.select_fill_color \
                     if self.selected else self.fill_color
                 painter.fillPath(line_path, color)
 
-    def drawVertex(self, path, i):
+    def linePath(self):
+        """Outline of the shape, rebuilt only after its points changed."""
+        if self._linePath is None:
+            self._linePath = self.makePath()
+        return self._linePath
+
+    def lodPath(self):
+        """Outline simplified for the current scale, cached per tolerance.
+
+        Tolerances are rounded down to a power of two image pixels, so that
+        zooming reuses a few cached outlines.
+        """
+        if self.lod_tolerance <= 0 or self._n < 4 or \
+                self.shape_type not in ['polygon', 'linestrip']:
+            return self.linePath()
+        tolerance = self.lod_tolerance / self.scale
+        if tolerance < 1:
+            return self.linePath()
+        tolerance = 2.0 ** math.floor(math.log(tolerance, 2))
+        path = self._lodPaths.get(tolerance)
+        if path is None:
+            closed = self.shape_type == 'polygon' and self.isClosed()
+            indices = simplify_polyline(self.pointsArray, tolerance, closed)
+            if len(indices) == self._n:
+                path = self.linePath()
+            else:
+                path = self._makePolylinePath(
+                    self.pointsArray[indices].tolist(), closed)
+            self._lodPaths[tolerance] = path
+        return path
+
+    def meanEdgeLength(self):
+        """Mean distance between consecutive vertices, in image pixels."""
+        if self._meanEdge is None:
+            if self._n < 2:
+                self._meanEdge = float('inf')
+            else:
+                d = np.diff(self.pointsArray, axis=0)
+                self._meanEdge = float(np.hypot(d[:, 0], d[:, 1]).mean())
+        return self._meanEdge
+
+    def vertexPath(self):
+        """Vertex markers, rebuilt after a point, scale or highlight change."""
+        key = (self.scale, self.point_size, self.point_type,
+               self._highlightIndex, self._highlightMode)
+        if self._vertexPath is None or self._vertexPathKey != key:
+            path = QtGui.QPainterPath()
+            for i, (x, y) in enumerate(self.pointsArray.tolist()):
+                self.drawVertex(path, i, x, y)
+            self._vertexPath = path
+            self._vertexPathKey = key
+        return self._vertexPath
+
+    def drawVertex(self, path, i, x, y):
         d = self.point_size / self.scale
         shape = self.point_type
-        point = self.points[i]
         if i == self._highlightIndex:
             size, shape = self._highlightSettings[self._highlightMode]
             d *= size
-        if self._highlightIndex is not None:
-            self.vertex_fill_color = self.hvertex_fill_color
-        else:
-            self.vertex_fill_color = Shape.vertex_fill_color
         if shape == self.P_SQUARE:
-            path.addRect(point.x() - d / 2, point.y() - d / 2, d, d)
+            path.addRect(x - d / 2, y - d / 2, d, d)
         elif shape == self.P_ROUND:
-            path.addEllipse(point, d / 2.0, d / 2.0)
+            path.addEllipse(x - d / 2, y - d / 2, d, d)
         else:
             assert False, "unsupported vertex shape"
 
+    def vertexDistances(self, point):
+        """Distances from `point` to all vertices, in one vectorised pass."""
+        diff = self.pointsArray - (point.x(), point.y())
+        return np.hypot(diff[:, 0], diff[:, 1])
+
+    def edgeDistances(self, point):
+        """Distances from `point` to all edges, in one vectorised pass.
+
+        Edge i goes from vertex i - 1 to vertex i, so edge 0 is the closing
+        edge from the last vertex to the first one.
+        """
+        p2 = self.pointsArray
+        p1 = np.roll(p2, 1, axis=0)
+        d = p2 - p1
+        p = np.array([point.x(), point.y()]) - p1
+        length2 = (d * d).sum(axis=1)
+        # parameter of the projection of point on each edge, clipped to it
+        t = np.divide((p * d).sum(axis=1), length2,
+                      out=np.zeros_like(length2), where=length2 > 0)
+        t = np.clip(t, 0, 1)
+        diff = p - t[:, None] * d
+        return np.hypot(diff[:, 0], diff[:, 1])
+
     def nearestVertex(self, point, epsilon):
-        min_distance = float('inf')
-        min_i = None
-        for i, p in enumerate(self.points):
-            dist = labelus.utils.distance(p - point)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                min_i = i
-        return min_i
+        if not self._n:
+            return None
+        dists = self.vertexDistances(point)
+        i = int(np.argmin(dists))
+        if dists[i] <= epsilon:
+            return i
+        return None
 
     def nearestEdge(self, point, epsilon):
-        min_distance = float('inf')
-        post_i = None
-        for i in range(len(self.points)):
-            line = [self.points[i - 1], self.points[i]]
-            dist = labelus.utils.distancetoline(point, line)
-            if dist <= epsilon and dist < min_distance:
-                min_distance = dist
-                post_i = i
-        return post_i
+        if self._n < 2:
+            return None
+        dists = self.edgeDistances(point)
+        i = int(np.argmin(dists))
+        if dists[i] <= epsilon:
+            return i
+        return None
 
     def containsPoint(self, point):
-        return self.makePath().contains(point)
+        return self.linePath().contains(point)
 
     def getCircleRectFromLine(self, line):
         """Computes parameters to draw with `QPainterPath::addEllipse`"""
@@ -210,28 +351,48 @@ class Shape(object):
     def makePath(self):
         if self.shape_type == 'rectangle':
             path = QtGui.QPainterPath()
-            if len(self.points) == 2:
+            if self._n == 2:
                 rectangle = self.getRectFromLine(*self.points)
                 path.addRect(rectangle)
         elif self.shape_type == "circle":
             path = QtGui.QPainterPath()
-            if len(self.points) == 2:
+            if self._n == 2:
                 rectangle = self.getCircleRectFromLine(self.points)
                 path.addEllipse(rectangle)
         else:
-            path = QtGui.QPainterPath(self.points[0])
-            for p in self.points[1:]:
-                path.lineTo(p)
+            path = self._makePolylinePath(
+                self.pointsArray.tolist(),
+                self.shape_type == 'polygon' and self.isClosed())
+        return path
+
+    @staticmethod
+    def _makePolylinePath(coords, closed):
+        path = QtGui.QPainterPath()
+        if coords:
+            path.moveTo(*coords[0])
+            for x, y in coords[1:]:
+                path.lineTo(x, y)
+            if closed:
+                path.lineTo(*coords[0])
         return path
 
     def boundingRect(self):
-        return self.makePath().boundingRect()
+        return self.linePath().boundingRect()
 
     def moveBy(self, offset):
-        self.points = [p + offset for p in self.points]
+        self._coords[:self._n] += (offset.x(), offset.y())
+        # translating is cheaper than rebuilding the paths
+        if self._linePath is not None:
+            self._linePath.translate(offset)
+        if self._vertexPath is not None:
+            self._vertexPath.translate(offset)
+        for path in self._lodPaths.values():
+            if path is not self._linePath:
+                path.translate(offset)
 
     def moveVertexBy(self, i, offset):
-        self.points[i] = self.points[i] + offset
+        self.pointsArray[i] += (offset.x(), offset.y())
+        self._pointsChanged()
 
     def highlightVertex(self, i, action):
         self._highlightIndex = i
@@ -241,13 +402,44 @@ class Shape(object):
         self._highlightIndex = None
 
     def copy(self):
-        return copy.deepcopy(self)
+        shape = Shape.__new__(Shape)
+        shape.label = self.label
+        shape.fill = self.fill
+        shape.selected = self.selected
+        shape.flags = None if self.flags is None else dict(self.flags)
+        shape._shape_type = self._shape_type
+        shape._closed = self._closed
+        shape._coords = self.pointsArray.copy()
+        shape._n = self._n
+        shape._line_color = _copy_color(self._line_color)
+        shape._fill_color = _copy_color(self._fill_color)
+        shape._highlightIndex = self._highlightIndex
+        shape._highlightMode = self._highlightMode
+        # painter paths are implicitly shared, copied on write only
+        shape._linePath = _copy_path(self._linePath)
+        shape._vertexPath = _copy_path(self._vertexPath)
+        shape._vertexPathKey = self._vertexPathKey
+        shape._lodPaths = {}
+        shape._meanEdge = self._meanEdge
+        return shape
 
     def __len__(self):
-        return len(self.points)
+        return self._n
 
     def __getitem__(self, key):
-        return self.points[key]
+        if isinstance(key, slice):
+            return self.points[key]
+        x, y = self.pointsArray[key].tolist()
+        return QtCore.QPointF(x, y)
 
     def __setitem__(self, key, value):
-        self.points[key] = value
+        self.pointsArray[key] = (value.x(), value.y())
+        self._pointsChanged()
+
+
+def _copy_color(color):
+    return None if color is None else QtGui.QColor(color)
+
+
+def _copy_path(path):
+    return None if path is None else QtGui.QPainterPath(path)
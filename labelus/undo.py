@@ -0,0 +1,223 @@
+import collections
+
+
+def _shape_nbytes(shape):
+    # rough size of a shape kept alive by a command, QPointF included
+    return 512 + 64 * len(shape)
+
+
+class Command(object):
+
+    """An edit of the canvas shapes which can be undone and redone.
+
+    Commands are recorded once the edit is done, so `redo` is only called
+    after `undo`. They hold references to the edited shapes and the few
+    values needed to restore them, not copies of all shapes.
+    """
+
+    # rough estimate of the memory held by the command, computed when it
+    # is recorded as the shapes it refers to may change afterwards
+    nbytes = 256
+
+    def undo(self, canvas):
+        raise NotImplementedError
+
+    def redo(self, canvas):
+        raise NotImplementedError
+
+
+class AddShapes(Command):
+
+    """Shapes added to the canvas, at the end of its shapes."""
+
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+        self.nbytes = 256 + sum(_shape_nbytes(shape) for shape in self.shapes)
+
+    def undo(self, canvas):
+        canvas.removeShapes(self.shapes)
+
+    def redo(self, canvas):
+        canvas.insertShapes(
+            [(len(canvas.shapes), shape) for shape in self.shapes])
+
+
+class DeleteShapes(Command):
+
+    """Shapes removed from the canvas, with their former positions."""
+
+    def __init__(self, shapes, indices):
+        self.items = sorted(zip(indices, shapes), key=lambda item: item[0])
+        self.nbytes = 256 + sum(
+            _shape_nbytes(shape) for _, shape in self.items)
+
+    def undo(self, canvas):
+        canvas.insertShapes(self.items)
+
+    def redo(self, canvas):
+        canvas.removeShapes([shape for _, shape in self.items])
+
+
+class MoveShapes(Command):
+
+    def __init__(self, shapes, offset):
+        self.shapes = list(shapes)
+        self.offset = offset
+        self.nbytes = 256 + 8 * len(self.shapes)
+
+    def undo(self, canvas):
+        canvas.moveShapesBy(self.shapes, -self.offset)
+
+    def redo(self, canvas):
+        canvas.moveShapesBy(self.shapes, self.offset)
+
+
+class MoveVertex(Command):
+
+    def __init__(self, shape, index, old, new):
+        self.shape = shape
+        self.index = index
+        self.old = old
+        self.new = new
+
+    def undo(self, canvas):
+        canvas.setVertex(self.shape, self.index, self.old)
+
+    def redo(self, canvas):
+        canvas.setVertex(self.shape, self.index, self.new)
+
+
+class InsertPoint(Command):
+
+    def __init__(self, shape, index, point):
+        self.shape = shape
+        self.index = index
+        self.point = point
+
+    def undo(self, canvas):
+        canvas.removeVertex(self.shape, self.index)
+
+    def redo(self, canvas):
+        canvas.insertVertex(self.shape, self.index, self.point)
+
+
+class SetPoints(Command):
+
+    """Points of shapes replaced, as a list of (shape, old, new) points."""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.nbytes = 256 + sum(64 * (len(old) + len(new))
+                                for _, old, new in self.changes)
+
+    def undo(self, canvas):
+        for shape, old, _ in self.changes:
+            canvas.setPoints(shape, old)
+
+    def redo(self, canvas):
+        for shape, _, new in self.changes:
+            canvas.setPoints(shape, new)
+
+
+class SetAttribute(Command):
+
+    """Attribute `name` of shapes set to `value`, like their label."""
+
+    def __init__(self, shapes, name, old_values, value):
+        self.shapes = list(shapes)
+        self.name = name
+        self.old_values = list(old_values)
+        self.value = value
+        self.nbytes = 256 + 16 * len(self.shapes)
+
+    def undo(self, canvas):
+        for shape, value in zip(self.shapes, self.old_values):
+            setattr(shape, self.name, value)
+        canvas.invalidateImageRect(canvas.shapesRect(self.shapes))
+
+    def redo(self, canvas):
+        for shape in self.shapes:
+            setattr(shape, self.name, self.value)
+        canvas.invalidateImageRect(canvas.shapesRect(self.shapes))
+
+
+class ReorderShapes(Command):
+
+    def __init__(self, old, new):
+        self.old = list(old)
+        self.new = list(new)
+        self.nbytes = 256 + 16 * len(self.old)
+
+    def undo(self, canvas):
+        canvas.setShapesOrder(self.old)
+
+    def redo(self, canvas):
+        canvas.setShapesOrder(self.new)
+
+
+class UndoStack(object):
+
+    """Undo and redo history of commands.
+
+    The history has no maximum depth, the oldest commands are forgotten only
+    once all commands are estimated to hold more than `max_bytes`.
+    Recording a command drops the commands which were undone.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._undo = collections.deque()
+        self._redo = []
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def canUndo(self):
+        return bool(self._undo)
+
+    def canRedo(self):
+        return bool(self._redo)
+
+    def push(self, command):
+        """Record `command`, whose edit is already done."""
+        for undone in self._redo:
+            self._nbytes -= undone.nbytes
+        self._redo = []
+        self._undo.append(command)
+        self._nbytes += command.nbytes
+        while len(self._undo) > 1 and self._nbytes > self.max_bytes:
+            self._nbytes -= self._undo.popleft().nbytes
+
+    def pop(self):
+        """Forget the last command without undoing it."""
+        if self._undo:
+            command = self._undo.pop()
+            self._nbytes -= command.nbytes
+            return command
+        return None
+
+    def undo(self, canvas):
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        command.undo(canvas)
+        self._redo.append(command)
+        return command
+
+    def redo(self, canvas):
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        command.redo(canvas)
+        self._undo.append(command)
+        return command
+
+    def clear(self):
+        self._undo.clear()
+        self._redo = []
+        self._nbytes = 0
@@ -3,6 +3,7 @@
 from ._io import lblsave
 
 from .image import apply_exif_orientation
+from .image import get_exif_orientation
 from .image import img_arr_to_b64
 from .image import img_b64_to_arr
 from .image import img_data_to_png_data
@@ -13,6 +14,12 @@ from .shape import polygons_to_mask
 from .shape import shape_to_mask
 from .shape import shapes_to_label
 
+from .name_index import NameIndex
+
+from .simplify import simplify_polyline
+
+from .spatial import GridIndex
+
 from .draw import draw_instances
 from .draw import draw_label
 from .draw import label_colormap
@@ -27,3 +34,4 @@ from .qt import struct
 from .qt import distance
 from .qt import distancetoline
 from .qt import fmtShortcut
+from .qt import pil_to_qimage
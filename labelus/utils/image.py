@@ -37,14 +37,18 @@ def img_data_to_png_data(img_data):
             return f.read()
 
 
-def apply_exif_orientation(image):
+def get_exif_orientation(image):
+    """Return the EXIF orientation tag of a PIL image, or None.
+
+    Only the image header is read, the pixel data is not decoded.
+    """
     try:
         exif = image._getexif()
     except AttributeError:
         exif = None
 
     if exif is None:
-        return image
+        return None
 
     exif = {
         PIL.ExifTags.TAGS[k]: v
@@ -52,7 +56,11 @@ def apply_exif_orientation(image):
         if k in PIL.ExifTags.TAGS
     }
 
-    orientation = exif.get('Orientation', None)
+    return exif.get('Orientation', None)
+
+
+def apply_exif_orientation(image):
+    orientation = get_exif_orientation(image)
 
     if orientation == 1:
         # do nothing
@@ -0,0 +1,100 @@
+import bisect
+import fnmatch
+import re
+
+
+GLOB_CHARS = '*?['
+
+
+def _is_glob(query):
+    return any(c in query for c in GLOB_CHARS)
+
+
+def _refines(query, previous):
+    """Return True if all names matching `query` match `previous` too."""
+    if _is_glob(query) or _is_glob(previous):
+        return False
+    if previous.startswith('^'):
+        return query.startswith(previous)
+    if query.startswith('^'):
+        return previous in query[1:]
+    return previous in query
+
+
+class NameIndex(object):
+
+    """Find names by substring, prefix or glob pattern.
+
+    Prefix queries, and glob patterns starting with a literal prefix, bisect
+    a sorted copy of the names built on first use. A query refining the
+    previous one, like the same text with one more character typed, only
+    tests the names matching the previous one. Other queries test all names.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+    def clear(self):
+        self._names = []
+        self._sorted = None  # (sorted names, their indices)
+        self._last = None  # (query, result, number of names searched)
+
+    def extend(self, names):
+        self._names.extend(names)
+        self._sorted = None
+
+    def search(self, query, start=0):
+        """Return the indices of the names matching `query`, in order.
+
+        `query` is a glob pattern if it contains any of `*?[`, a prefix if it
+        starts with `^`, and a substring otherwise. Only names from index
+        `start` on are searched.
+        """
+        if start > 0:
+            return self._filter(query, range(start, len(self._names)))
+        last = self._last
+        if last is not None and _refines(query, last[0]):
+            candidates = last[1] + list(range(last[2], len(self._names)))
+            result = self._filter(query, candidates)
+        else:
+            result = self._search(query)
+        self._last = (query, result, len(self._names))
+        return result
+
+    def _search(self, query):
+        if not query:
+            return list(range(len(self._names)))
+        if _is_glob(query):
+            prefix = re.split(r'[*?[]', query, 1)[0]
+            if prefix:
+                return self._filter(query, self._prefixRange(prefix))
+        elif query.startswith('^'):
+            return self._prefixRange(query[1:])
+        return self._filter(query, range(len(self._names)))
+
+    def _filter(self, query, candidates):
+        names = self._names
+        if _is_glob(query):
+            match = re.compile(fnmatch.translate(query)).match
+            return [i for i in candidates if match(names[i])]
+        if query.startswith('^'):
+            prefix = query[1:]
+            return [i for i in candidates if names[i].startswith(prefix)]
+        return [i for i in candidates if query in names[i]]
+
+    def _prefixRange(self, prefix):
+        if not prefix:
+            return list(range(len(self._names)))
+        if self._sorted is None:
+            order = sorted(range(len(self._names)),
+                           key=self._names.__getitem__)
+            self._sorted = ([self._names[i] for i in order], order)
+        keys, order = self._sorted
+        lo = bisect.bisect_left(keys, prefix)
+        hi = lo
+        while hi < len(keys) and keys[hi].startswith(prefix):
+            hi += 1
+        return sorted(order[lo:hi])
@@ -1,5 +1,6 @@
 from math import sqrt
 import os.path as osp
+import sys
 
 import numpy as np
 
@@ -83,6 +84,49 @@ def distancetoline(point, line):
     return np.linalg.norm(np.cross(p2 - p1, p1 - p3)) / np.linalg.norm(p2 - p1)
 
 
+def pil_to_qimage(image_pil):
+    """Convert a PIL image to QImage without encoding it to PNG/JPEG.
+
+    The pixels are copied out of PIL once and the QImage wraps them as they
+    are, keeping a reference to them for as long as it lives.
+    """
+    if image_pil.mode not in ['RGB', 'RGBA', 'L']:
+        if 'A' in image_pil.mode or 'transparency' in image_pil.info:
+            image_pil = image_pil.convert('RGBA')
+        else:
+            image_pil = image_pil.convert('RGB')
+    width, height = image_pil.size
+    colors = None
+    if image_pil.mode == 'RGB':
+        data = image_pil.tobytes()
+        format, depth = QtGui.QImage.Format_RGB888, 3
+    elif image_pil.mode == 'RGBA':
+        if hasattr(QtGui.QImage, 'Format_RGBA8888'):
+            data = image_pil.tobytes()
+            format = QtGui.QImage.Format_RGBA8888
+        else:
+            # Qt4: ARGB32 pixels are 32-bit words in native byte order
+            raw = 'BGRA' if sys.byteorder == 'little' else 'ARGB'
+            data = image_pil.tobytes('raw', raw)
+            format = QtGui.QImage.Format_ARGB32
+        depth = 4
+    else:
+        data = image_pil.tobytes()
+        depth = 1
+        if hasattr(QtGui.QImage, 'Format_Grayscale8'):
+            format = QtGui.QImage.Format_Grayscale8
+        else:
+            # Qt < 5.5, setting the color table detaches the image once
+            format = QtGui.QImage.Format_Indexed8
+            colors = [QtGui.qRgb(i, i, i) for i in range(256)]
+    image = QtGui.QImage(data, width, height, width * depth, format)
+    if colors is not None:
+        image.setColorTable(colors)
+    # QImage does not own `data`, it is released with the image
+    image.pixelData = data
+    return image
+
+
 def fmtShortcut(text):
     mod, key = text.split('+', 1)
     return '<b>%s</b>+<b>%s</b>' % (mod, key)
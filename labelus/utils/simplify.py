@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def simplify_polyline(points, tolerance, closed=False):
+    """Return the indices of the points kept by Douglas-Peucker.
+
+    `points` is a (N, 2) array. The points dropped are within `tolerance`
+    of the simplified line. A `closed` polyline also simplifies around its
+    first point, which is always kept.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+    if closed:
+        # the first point ends the polyline too, the first split is at the
+        # point farthest from it
+        points = np.vstack([points, points[:1]])
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a = points[i]
+        d = points[j] - a
+        p = points[i + 1:j] - a
+        length = np.hypot(d[0], d[1])
+        if length > 0:
+            dists = np.abs(d[0] * p[:, 1] - d[1] * p[:, 0]) / length
+        else:
+            dists = np.hypot(p[:, 0], p[:, 1])
+        k = int(np.argmax(dists))
+        if dists[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    indices = np.flatnonzero(keep)
+    if closed:
+        indices = indices[:-1]
+    return indices
@@ -0,0 +1,103 @@
+import collections
+import math
+
+
+class GridIndex(object):
+
+    """Uniform grid of bounding boxes to find objects near a point.
+
+    Each object is registered in every cell its bounding box overlaps, so a
+    point query only tests the objects of a few cells. Objects spanning more
+    than `max_cells` cells are kept aside and tested on every query.
+    """
+
+    def __init__(self, cell_size=256, max_cells=1024):
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        self._cells = collections.defaultdict(set)
+        self._bboxes = {}
+        self._large = set()
+
+    def __len__(self):
+        return len(self._bboxes)
+
+    def __contains__(self, obj):
+        return obj in self._bboxes
+
+    def _cell_range(self, bbox):
+        x1, y1, x2, y2 = bbox
+        c = self.cell_size
+        return (int(math.floor(x1 / c)), int(math.floor(y1 / c)),
+                int(math.floor(x2 / c)), int(math.floor(y2 / c)))
+
+    def _cells_of(self, cell_range):
+        i1, j1, i2, j2 = cell_range
+        for i in range(i1, i2 + 1):
+            for j in range(j1, j2 + 1):
+                yield i, j
+
+    def insert(self, obj, bbox):
+        """Register `obj` with `bbox` = (x1, y1, x2, y2)."""
+        if obj in self._bboxes:
+            self.remove(obj)
+        self._bboxes[obj] = bbox
+        i1, j1, i2, j2 = cell_range = self._cell_range(bbox)
+        if (i2 - i1 + 1) * (j2 - j1 + 1) > self.max_cells:
+            self._large.add(obj)
+            return
+        for cell in self._cells_of(cell_range):
+            self._cells[cell].add(obj)
+
+    def update(self, obj, bbox):
+        """Move `obj` to `bbox`; does nothing if `obj` is not registered."""
+        old_bbox = self._bboxes.get(obj)
+        if old_bbox is None:
+            return
+        if obj not in self._large and \
+                self._cell_range(old_bbox) == self._cell_range(bbox):
+            self._bboxes[obj] = bbox
+            return
+        self.insert(obj, bbox)
+
+    def remove(self, obj):
+        bbox = self._bboxes.pop(obj, None)
+        if bbox is None:
+            return
+        if obj in self._large:
+            self._large.discard(obj)
+            return
+        for cell in self._cells_of(self._cell_range(bbox)):
+            objs = self._cells.get(cell)
+            if objs is not None:
+                objs.discard(obj)
+                if not objs:
+                    del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._bboxes.clear()
+        self._large.clear()
+
+    def query(self, x, y, radius=0):
+        """Return objects whose bounding box is within `radius` of (x, y)."""
+        return self.intersect((x - radius, y - radius, x + radius, y + radius))
+
+    def intersect(self, bbox):
+        """Return objects whose bounding box overlaps `bbox`."""
+        i1, j1, i2, j2 = cell_range = self._cell_range(bbox)
+        if (i2 - i1 + 1) * (j2 - j1 + 1) > len(self._bboxes):
+            # cheaper to test every object than to visit every cell
+            candidates = self._bboxes
+        else:
+            candidates = set(self._large)
+            for cell in self._cells_of(cell_range):
+                objs = self._cells.get(cell)
+                if objs:
+                    candidates.update(objs)
+        qx1, qy1, qx2, qy2 = bbox
+        result = []
+        for obj in candidates:
+            x1, y1, x2, y2 = self._bboxes[obj]
+            if x1 <= qx2 and qx1 <= x2 and y1 <= qy2 and qy1 <= y2:
+                result.append(obj)
+        return result
@@ -0,0 +1,63 @@
+import time
+
+from qtpy import QtCore
+
+from labelus.logger import logger
+
+
+class DirectoryWatcher(QtCore.QObject):
+
+    """Report changes of a set of directories, debounced.
+
+    Changes are collected until no directory changed for `delay` ms, then
+    reported at once through `changed` with the set of changed directories.
+    During a long stream of changes, like a bulk copy, they are still
+    reported every `max_delay` ms.
+    """
+
+    changed = QtCore.Signal(object)  # set of directories
+
+    def __init__(self, delay=500, max_delay=5000, parent=None):
+        super(DirectoryWatcher, self).__init__(parent)
+        self.delay = delay
+        self.max_delay = max_delay
+        self._watcher = QtCore.QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._onDirectoryChanged)
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+        self._pending = set()
+        self._since = None
+
+    def directories(self):
+        return self._watcher.directories()
+
+    def addDirectories(self, dirs):
+        watched = set(self._watcher.directories())
+        dirs = [d for d in dirs if d and d not in watched]
+        if not dirs:
+            return
+        failed = self._watcher.addPaths(dirs)
+        if failed:
+            logger.warn('Cannot watch {} directories, e.g. {}'
+                        .format(len(failed), failed[0]))
+
+    def clear(self):
+        dirs = self._watcher.directories()
+        if dirs:
+            self._watcher.removePaths(dirs)
+        self._timer.stop()
+        self._pending = set()
+
+    def _onDirectoryChanged(self, path):
+        if not self._pending:
+            self._since = time.time()
+        self._pending.add(path)
+        if time.time() - self._since < self.max_delay / 1000.0:
+            self._timer.start(self.delay)
+
+    def _flush(self):
+        dirs = self._pending
+        self._pending = set()
+        if dirs:
+            self.changed.emit(dirs)
@@ -9,7 +9,12 @@ from .escapable_qlist_widget import EscapableQListWidget
 from .label_dialog import LabelDialog
 from .label_dialog import LabelQLineEdit
 
-from .label_qlist_widget import LabelQListWidget
+from .label_list_view import LabelListView
+
+from .pair_list_model import pair_stem
+from .pair_list_model import PairListModel
+
+from .shape_list_model import ShapeListModel
 
 from .tool_bar import ToolBar
 
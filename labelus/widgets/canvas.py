@@ -3,7 +3,16 @@ from qtpy import QtGui
 from qtpy import QtWidgets
 
 from labelus import QT5
+from labelus.pyramid import ImagePyramid
 from labelus.shape import Shape
+from labelus.undo import AddShapes
+from labelus.undo import DeleteShapes
+from labelus.undo import InsertPoint
+from labelus.undo import MoveShapes
+from labelus.undo import MoveVertex
+from labelus.undo import ReorderShapes
+from labelus.undo import SetPoints
+from labelus.undo import UndoStack
 import labelus.utils
 
 
@@ -27,6 +36,7 @@ class Canvas(QtWidgets.QWidget):
     shapeMoved = QtCore.Signal()
     drawingPolygon = QtCore.Signal(bool)
     edgeSelected = QtCore.Signal(bool)
+    dateChanged = QtCore.Signal(str)
 
     CREATE, EDIT = 0, 1
 
@@ -35,13 +45,25 @@ class Canvas(QtWidgets.QWidget):
 
     _fill_drawing = False
 
+    # wheel events are applied at most once per frame of this length, and
+    # the zoom is previewed until no zoom event came for zoom_settle, in ms
+    wheel_interval = 16
+    zoom_settle = 150
+
     def __init__(self, *args, **kwargs):
         self.epsilon = kwargs.pop('epsilon', 10.0)
         super(Canvas, self).__init__(*args, **kwargs)
         # Initialise local state.
         self.mode = self.EDIT
         self.shapes = []
-        self.shapesBackups = []
+        # spatial index of self.shapes for hit-testing, see shapesAt
+        self.shapesIndex = labelus.utils.GridIndex()
+        self._shapesOrder = {}
+        self._shapesOrderNext = 0
+        self.undoStack = UndoStack()
+        # vertex and offset of the shapes moved by the current drag
+        self._dragVertex = None
+        self._dragOffset = QtCore.QPointF()
         self.current = None
         self.selectedShapes = []  # save the selected shapes here
         self.selectedShapesCopy = []
@@ -58,7 +80,13 @@ class Canvas(QtWidgets.QWidget):
         self.scale = 0.1
         self.pixmap = QtGui.QPixmap()
         self.date = None
-        self.visible = {}
+        # pixmap of each date of the pair, self.pixmap is one of them
+        self.pixmaps = {}
+        self._blinkTimer = QtCore.QTimer(self)
+        self._blinkTimer.timeout.connect(self.toggleDate)
+        # ShapeListModel holding the visibility flags, all shapes are
+        # visible without one
+        self.shapeModel = None
         self._hideBackround = False
         self.hideBackround = False
         self.hShape = None
@@ -66,6 +94,28 @@ class Canvas(QtWidgets.QWidget):
         self.hEdge = None
         self.movingShape = False
         self._painter = QtGui.QPainter()
+        # the shapes not being edited, rendered once on a transparent
+        # layer and reused by paintEvent until the view or these shapes
+        # change, the pixmap is drawn under it so that a date swap is a blit
+        self._layer = None
+        self._layerKey = None
+        self._layerRect = QtCore.QRect()
+        self._layerDirty = QtGui.QRegion()
+        self._layerActive = []
+        # the layer was scaled from a previous zoom, see updateLayer
+        self._layerPreview = False
+        # wheel input accumulated until the next frame, see requestZoom
+        self._wheelZoom = 0
+        self._wheelPos = QtCore.QPoint()
+        self._wheelScroll = {}
+        self._wheelTimer = QtCore.QTimer(self)
+        self._wheelTimer.setSingleShot(True)
+        self._wheelTimer.setInterval(self.wheel_interval)
+        self._wheelTimer.timeout.connect(self.flushWheel)
+        self._zoomTimer = QtCore.QTimer(self)
+        self._zoomTimer.setSingleShot(True)
+        self._zoomTimer.setInterval(self.zoom_settle)
+        self._zoomTimer.timeout.connect(self.endZoom)
         self._cursor = CURSOR_DEFAULT
         # Menus:
         # 0: right-click without selection and dragging of shapes
@@ -92,30 +142,95 @@ class Canvas(QtWidgets.QWidget):
             raise ValueError('Unsupported createMode: %s' % value)
         self._createMode = value
 
-    def storeShapes(self):
-        shapesBackup = []
-        for shape in self.shapes:
-            shapesBackup.append(shape.copy())
-        if len(self.shapesBackups) >= 10:
-            self.shapesBackups = self.shapesBackups[-9:]
-        self.shapesBackups.append(shapesBackup)
+    def pushCommand(self, command):
+        """Record an edit of the shapes, already done, for undo."""
+        self.undoStack.push(command)
 
-    @property
-    def isShapeRestorable(self):
-        if len(self.shapesBackups) < 2:
-            return False
-        return True
+    def canUndo(self):
+        return self.undoStack.canUndo()
 
-    def restoreShape(self):
-        if not self.isShapeRestorable:
-            return
-        self.shapesBackups.pop()  # latest
-        shapesBackup = self.shapesBackups.pop()
-        self.shapes = shapesBackup
-        self.selectedShapes = []
-        for shape in self.shapes:
+    def canRedo(self):
+        return self.undoStack.canRedo()
+
+    def undo(self):
+        return self._replay(self.undoStack.undo)
+
+    def redo(self):
+        return self._replay(self.undoStack.redo)
+
+    def _replay(self, method):
+        # shapes may be removed, forget them before
+        self.unHighlight()
+        self.hEdge = None
+        for shape in self.selectedShapes:
             shape.selected = False
-        self.repaint()
+        self.selectedShapes = []
+        command = method(self)
+        self.update()
+        return command
+
+    # Edits of the shapes replayed by the undo commands.
+
+    def insertShapes(self, items):
+        """Insert shapes at positions, `items` is a sorted (index, shape)."""
+        for index, shape in items:
+            self.shapes.insert(index, shape)
+        if all(index == len(self.shapes) - len(items) + i
+               for i, (index, _) in enumerate(items)):
+            for _, shape in items:
+                self.indexShape(shape)
+        else:
+            # the z-order of the following shapes changed
+            self.reindexShapes()
+        self.invalidateImageRect(
+            self.shapesRect([shape for _, shape in items]))
+
+    def removeShapes(self, shapes):
+        removed = set(shapes)
+        self.shapes = [shape for shape in self.shapes if shape not in removed]
+        for shape in shapes:
+            self.unindexShape(shape)
+        self.invalidateImageRect(self.shapesRect(shapes))
+
+    def moveShapesBy(self, shapes, offset):
+        dirty = self.shapesRect(shapes)
+        for shape in shapes:
+            shape.moveBy(offset)
+            self.updateShapeIndex(shape)
+        self.invalidateImageRect(dirty.united(self.shapesRect(shapes)))
+
+    def setVertex(self, shape, index, point):
+        dirty = self.shapesRect([shape])
+        shape[index] = point
+        self.updateShapeIndex(shape)
+        self.invalidateImageRect(dirty.united(self.shapesRect([shape])))
+
+    def insertVertex(self, shape, index, point):
+        shape.insertPoint(index, point)
+        self.updateShapeIndex(shape)
+        self.invalidateImageRect(self.shapesRect([shape]))
+
+    def removeVertex(self, shape, index):
+        dirty = self.shapesRect([shape])
+        shape.removePoint(index)
+        self.updateShapeIndex(shape)
+        self.invalidateImageRect(dirty)
+
+    def setPoints(self, shape, points):
+        dirty = self.shapesRect([shape])
+        shape.points = points
+        self.updateShapeIndex(shape)
+        self.invalidateImageRect(dirty.united(self.shapesRect([shape])))
+
+    def setShapesOrder(self, shapes):
+        self.shapes = list(shapes)
+        self.reindexShapes()
+        self.invalidateLayer()
+
+    def reorderShapes(self, shapes):
+        """Reorder the shapes as `shapes`, like the label list."""
+        self.pushCommand(ReorderShapes(self.shapes, shapes))
+        self.setShapesOrder(shapes)
 
     def enterEvent(self, ev):
         self.overrideCursor(self._cursor)
@@ -127,7 +242,115 @@ class Canvas(QtWidgets.QWidget):
         self.restoreCursor()
 
     def isVisible(self, shape):
-        return self.visible.get(shape, True)
+        return self.shapeModel is None or self.shapeModel.isVisible(shape)
+
+    def indexShape(self, shape):
+        """Add `shape`, just appended to self.shapes, to the index."""
+        rect = shape.boundingRect()
+        # increasing numbers keep the z-order of self.shapes
+        self._shapesOrder[shape] = self._shapesOrderNext
+        self._shapesOrderNext += 1
+        self.shapesIndex.insert(
+            shape, (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+    def unindexShape(self, shape):
+        self._shapesOrder.pop(shape, None)
+        self.shapesIndex.remove(shape)
+
+    def updateShapeIndex(self, shape):
+        """Refresh the index after `shape` was moved or edited."""
+        if shape in self.shapesIndex:
+            rect = shape.boundingRect()
+            self.shapesIndex.update(
+                shape, (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+    def reindexShapes(self):
+        self.shapesIndex.clear()
+        self._shapesOrder = {}
+        self._shapesOrderNext = 0
+        for shape in self.shapes:
+            self.indexShape(shape)
+
+    def shapesAt(self, point, epsilon=0):
+        """Return visible shapes near `point`, the topmost first.
+
+        Only shapes whose bounding box is within `epsilon` of `point` are
+        returned, so any shape with a vertex, an edge or its inside within
+        `epsilon` is among them.
+        """
+        shapes = [s for s in self.shapesIndex.query(point.x(), point.y(),
+                                                    epsilon)
+                  if self.isVisible(s)]
+        shapes.sort(key=self._shapesOrder.get, reverse=True)
+        return shapes
+
+    def shapesIn(self, rect):
+        """Return visible shapes whose bounding box overlaps `rect`.
+
+        Shapes are returned in drawing order, the bottommost first.
+        """
+        bounds = (rect.left(), rect.top(), rect.right(), rect.bottom())
+        shapes = [s for s in self.shapesIndex.intersect(bounds)
+                  if self.isVisible(s)]
+        shapes.sort(key=self._shapesOrder.get)
+        return shapes
+
+    def paintMargin(self):
+        """Width painted around shape bounds by pens and vertex markers."""
+        # the largest marker is a highlighted vertex, see Shape
+        return (Shape.point_size * 4 + 2) / self.scale + 1
+
+    def shapesRect(self, shapes):
+        """Return the area painted by `shapes`, in image coordinates."""
+        margin = self.paintMargin()
+        rect = QtCore.QRectF()
+        for shape in shapes:
+            if shape is None or not shape.points:
+                continue
+            if len(shape) > 1:
+                bounds = shape.boundingRect()
+            else:
+                # rectangles and circles have no outline yet
+                bounds = QtCore.QRectF(shape[0], shape[0])
+            rect = rect.united(
+                bounds.adjusted(-margin, -margin, margin, margin))
+        return rect
+
+    def updateImageRect(self, rect):
+        """Schedule a repaint of `rect`, given in image coordinates."""
+        if not rect.isEmpty():
+            self.update(self.widgetRect(rect))
+
+    def invalidateImageRect(self, rect):
+        """Schedule a repaint of `rect` after shapes in it were edited."""
+        if not rect.isEmpty():
+            self.invalidateLayer(self.widgetRect(rect))
+
+    def invalidateLayer(self, rect=None):
+        """Render the cached layer again in `rect`, or all of it.
+
+        `rect` is in widget coordinates. Shapes being edited are not in the
+        layer, see activeShapes, only edits of the other shapes need this.
+        """
+        if rect is None:
+            self._layer = None
+            self.update()
+        else:
+            self._layerDirty = self._layerDirty.united(rect)
+            self.update(rect)
+
+    def activeShapes(self):
+        """Return the shapes drawn over the layer, in drawing order.
+
+        These are the selected and the highlighted shapes, the ones moved
+        or reshaped by the mouse.
+        """
+        shapes = [s for s in self.selectedShapes if s in self._shapesOrder]
+        if self.hShape in self._shapesOrder and \
+                self.hShape not in self.selectedShapes:
+            shapes.append(self.hShape)
+        shapes.sort(key=self._shapesOrder.get)
+        return shapes
 
     def drawing(self):
         return self.mode == self.CREATE
@@ -170,6 +393,10 @@ class Canvas(QtWidgets.QWidget):
             if not self.current:
                 return
 
+            dirty = self.shapesRect([self.current, self.line])
+            # the start point stays highlighted until the next move, the
+            # repaint is only queued
+            self.current.highlightClear()
             color = self.lineColor
             if self.outOfPixmap(pos):
                 # Don't allow the user to draw outside the pixmap.
@@ -199,33 +426,44 @@ class Canvas(QtWidgets.QWidget):
                 self.line.points = [self.current[0]]
                 self.line.close()
             self.line.line_color = color
-            self.repaint()
-            self.current.highlightClear()
+            dirty = dirty.united(self.shapesRect([self.current, self.line]))
+            self.update(self.widgetRect(dirty))
             return
 
         # Polygon copy moving.
         if QtCore.Qt.RightButton & ev.buttons():
             if self.selectedShapesCopy and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                dirty = self.shapesRect(self.selectedShapesCopy)
                 self.boundedMoveShapes(self.selectedShapesCopy, pos)
-                self.repaint()
+                self.updateImageRect(
+                    dirty.united(self.shapesRect(self.selectedShapesCopy)))
             elif self.selectedShapes:
                 self.selectedShapesCopy = \
                     [s.copy() for s in self.selectedShapes]
-                self.repaint()
+                self.updateImageRect(self.shapesRect(self.selectedShapes))
             return
 
         # Polygon/Vertex moving.
         self.movingShape = False
         if QtCore.Qt.LeftButton & ev.buttons():
             if self.selectedVertex():
+                dirty = self.shapesRect([self.hShape])
+                if self._dragVertex is None:
+                    self._dragVertex = (self.hShape, self.hVertex,
+                                        self.hShape[self.hVertex])
                 self.boundedMoveVertex(pos)
-                self.repaint()
+                self.updateImageRect(
+                    dirty.united(self.shapesRect([self.hShape])))
                 self.movingShape = True
             elif self.selectedShapes and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
-                self.boundedMoveShapes(self.selectedShapes, pos)
-                self.repaint()
+                dirty = self.shapesRect(self.selectedShapes)
+                start = self.prevPoint
+                if self.boundedMoveShapes(self.selectedShapes, pos):
+                    self._dragOffset += self.prevPoint - start
+                self.updateImageRect(
+                    dirty.united(self.shapesRect(self.selectedShapes)))
                 self.movingShape = True
             return
 
@@ -234,7 +472,9 @@ class Canvas(QtWidgets.QWidget):
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
         self.setToolTip("Image")
-        for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
+        # only the previous and the new highlighted shapes need a repaint
+        prevShape, prevVertex = self.hShape, self.hVertex
+        for shape in self.shapesAt(pos, self.epsilon / self.scale):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
             index = shape.nearestVertex(pos, self.epsilon / self.scale)
@@ -249,7 +489,8 @@ class Canvas(QtWidgets.QWidget):
                 self.overrideCursor(CURSOR_POINT)
                 self.setToolTip("Click & drag to move point")
                 self.setStatusTip(self.toolTip())
-                self.update()
+                if (prevShape, prevVertex) != (shape, index):
+                    self.updateImageRect(self.shapesRect([prevShape, shape]))
                 break
             elif shape.containsPoint(pos):
                 if self.selectedVertex():
@@ -261,12 +502,13 @@ class Canvas(QtWidgets.QWidget):
                     "Click & drag to move shape '%s'" % shape.label)
                 self.setStatusTip(self.toolTip())
                 self.overrideCursor(CURSOR_GRAB)
-                self.update()
+                if (prevShape, prevVertex) != (shape, None):
+                    self.updateImageRect(self.shapesRect([prevShape, shape]))
                 break
         else:  # Nothing found, clear highlights, reset state.
             if self.hShape:
                 self.hShape.highlightClear()
-                self.update()
+                self.updateImageRect(self.shapesRect([self.hShape]))
             self.hVertex, self.hShape, self.hEdge = None, None, None
         self.edgeSelected.emit(self.hEdge is not None)
 
@@ -279,6 +521,8 @@ class Canvas(QtWidgets.QWidget):
         index = self.hEdge
         point = self.prevMovePoint
         shape.insertPoint(index, point)
+        self.updateShapeIndex(shape)
+        self.pushCommand(InsertPoint(shape, index, point))
         shape.highlightVertex(index, shape.MOVE_VERTEX)
         self.hShape = shape
         self.hVertex = index
@@ -324,6 +568,8 @@ class Canvas(QtWidgets.QWidget):
                 group_mode = (int(ev.modifiers()) == QtCore.Qt.ControlModifier)
                 self.selectShapePoint(pos, multiple_selection_mode=group_mode)
                 self.prevPoint = pos
+                self._dragVertex = None
+                self._dragOffset = QtCore.QPointF()
                 self.repaint()
         elif ev.button() == QtCore.Qt.RightButton and self.editing():
             group_mode = (int(ev.modifiers()) == QtCore.Qt.ControlModifier)
@@ -338,14 +584,28 @@ class Canvas(QtWidgets.QWidget):
             if not menu.exec_(self.mapToGlobal(ev.pos())) \
                     and self.selectedShapesCopy:
                 # Cancel the move by deleting the shadow copy.
+                dirty = self.shapesRect(self.selectedShapesCopy)
                 self.selectedShapesCopy = []
-                self.repaint()
+                self.updateImageRect(dirty)
         elif ev.button() == QtCore.Qt.LeftButton and self.selectedShapes:
             self.overrideCursor(CURSOR_GRAB)
         if self.movingShape:
-            self.storeShapes()
+            self.pushMove()
             self.shapeMoved.emit()
 
+    def pushMove(self):
+        """Record the vertex or shapes moved by the current drag."""
+        if self._dragVertex is not None:
+            shape, index, old = self._dragVertex
+            if index < len(shape) and shape[index] != old:
+                self.pushCommand(
+                    MoveVertex(shape, index, old, shape[index]))
+        elif not self._dragOffset.isNull():
+            self.pushCommand(
+                MoveShapes(self.selectedShapes, self._dragOffset))
+        self._dragVertex = None
+        self._dragOffset = QtCore.QPointF()
+
     def endMove(self, copy):
         assert self.selectedShapes and self.selectedShapesCopy
         assert len(self.selectedShapesCopy) == len(self.selectedShapes)
@@ -354,14 +614,20 @@ class Canvas(QtWidgets.QWidget):
         if copy:
             for i, shape in enumerate(self.selectedShapesCopy):
                 self.shapes.append(shape)
+                self.indexShape(shape)
                 self.selectedShapes[i].selected = False
                 self.selectedShapes[i] = shape
+            self.pushCommand(AddShapes(self.selectedShapesCopy))
         else:
+            changes = []
             for i, shape in enumerate(self.selectedShapesCopy):
+                changes.append((self.selectedShapes[i],
+                                self.selectedShapes[i].points, shape.points))
                 self.selectedShapes[i].points = shape.points
+                self.updateShapeIndex(self.selectedShapes[i])
+            self.pushCommand(SetPoints(changes))
         self.selectedShapesCopy = []
         self.repaint()
-        self.storeShapes()
         return True
 
     def hideBackroundShapes(self, value):
@@ -396,8 +662,8 @@ class Canvas(QtWidgets.QWidget):
             index, shape = self.hVertex, self.hShape
             shape.highlightVertex(index, shape.MOVE_VERTEX)
         else:
-            for shape in reversed(self.shapes):
-                if self.isVisible(shape) and shape.containsPoint(point):
+            for shape in self.shapesAt(point):
+                if shape.containsPoint(point):
                     self.calculateOffsets(shape, point)
                     self.setHiding()
                     if multiple_selection_mode:
@@ -423,6 +689,7 @@ class Canvas(QtWidgets.QWidget):
         if self.outOfPixmap(pos):
             pos = self.intersectionPoint(point, pos)
         shape.moveVertexBy(index, pos - point)
+        self.updateShapeIndex(shape)
 
     def boundedMoveShapes(self, shapes, pos):
         if self.outOfPixmap(pos):
@@ -443,6 +710,7 @@ class Canvas(QtWidgets.QWidget):
         if dp:
             for shape in shapes:
                 shape.moveBy(dp)
+                self.updateShapeIndex(shape)
             self.prevPoint = pos
             return True
         return False
@@ -456,10 +724,13 @@ class Canvas(QtWidgets.QWidget):
     def deleteSelected(self):
         deleted_shapes = []
         if self.selectedShapes:
-            for shape in self.selectedShapes:
-                self.shapes.remove(shape)
-                deleted_shapes.append(shape)
-            self.storeShapes()
+            deleted_shapes = list(self.selectedShapes)
+            deleted = set(deleted_shapes)
+            indices = [i for i, shape in enumerate(self.shapes)
+                       if shape in deleted]
+            self.pushCommand(DeleteShapes(
+                [self.shapes[i] for i in indices], indices))
+            self.removeShapes(deleted_shapes)
             self.selectedShapes = []
             self.update()
         return deleted_shapes
@@ -485,21 +756,45 @@ class Canvas(QtWidgets.QWidget):
         if not self.pixmap:
             return super(Canvas, self).paintEvent(event)
 
+        # most shapes come from the layer, so that moving a vertex or a
+        # shape repaints that shape only
+        active = self.activeShapes()
+        self.updateLayer(event.rect(), active)
+
         p = self._painter
         p.begin(self)
-        # p.setRenderHint(QtGui.QPainter.Antialiasing)
-        # p.setRenderHint(QtGui.QPainter.HighQualityAntialiasing)
-        # p.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        p.scale(self.scale, self.scale)
+        p.translate(self.offsetToCenter())
+
+        # only draw what intersects the exposed area
+        exposed = self.transformRect(event.rect())
+        source = exposed.toAlignedRect().intersected(self.pixmap.rect())
+        if source.isEmpty():
+            pass
+        elif isinstance(self.pixmap, ImagePyramid):
+            self.pixmap.draw(p, source, self.scale)
+        elif isinstance(self.pixmap, QtGui.QImage):
+            # low memory mode, the image is not copied to a pixmap
+            p.drawImage(source, self.pixmap, source)
+        else:
+            p.drawPixmap(source, self.pixmap, source)
+
+        p.resetTransform()
+        target = event.rect().intersected(self._layerRect)
+        ratio = self._layer.devicePixelRatio() if QT5 else 1.0
+        source = target.translated(-self._layerRect.topLeft())
+        p.drawPixmap(QtCore.QRectF(target), self._layer, QtCore.QRectF(
+            source.x() * ratio, source.y() * ratio,
+            source.width() * ratio, source.height() * ratio))
 
         p.scale(self.scale, self.scale)
         p.translate(self.offsetToCenter())
 
-        p.drawPixmap(0, 0, self.pixmap)
         Shape.scale = self.scale
-        for shape in self.shapes:
-            if (shape.selected or not self._hideBackround) and \
-                    self.isVisible(shape):
-                shape.fill = shape.selected or shape == self.hShape
+        for shape in active:
+            if self.isVisible(shape) and \
+                    (shape.selected or not self._hideBackround):
+                shape.fill = True
                 shape.paint(p)
         if self.current:
             self.current.paint(p)
@@ -518,10 +813,137 @@ class Canvas(QtWidgets.QWidget):
 
         p.end()
 
+    def updateLayer(self, exposed, active):
+        """Bring the cached layer up to date in `exposed`.
+
+        The layer covers the visible part of the canvas. It is rendered
+        again after a zoom and shifted when scrolling. Areas left dirty by
+        edits and by shapes becoming active or inactive are rendered when
+        exposed.
+        """
+        rect = self.visibleRegion().boundingRect().united(exposed)
+        ratio = self.devicePixelRatioF() if QT5 else 1.0
+        offset = self.offsetToCenter()
+        key = (self.scale, offset.x(), offset.y(), self._hideBackround,
+               ratio)
+        if self._layer is not None and self.zooming() and \
+                key[3:] == self._layerKey[3:] and key != self._layerKey:
+            # scale the previous layer instead of rendering all shapes
+            # again, the gesture ends with a full render, see endZoom
+            self._layer, self._layerDirty = self._scaledLayer(rect, ratio)
+            self._layerPreview = True
+        elif self._layer is None or key != self._layerKey:
+            self._layer = self._newLayer(rect, ratio)
+            self._layerDirty = QtGui.QRegion(rect)
+            self._layerPreview = False
+        elif not self._layerRect.contains(rect):
+            # scrolled, keep what is still visible
+            layer = self._newLayer(rect, ratio)
+            p = QtGui.QPainter(layer)
+            p.drawPixmap(self._layerRect.topLeft() - rect.topLeft(),
+                         self._layer)
+            p.end()
+            self._layer = layer
+            self._layerDirty = self._layerDirty.intersected(rect).united(
+                QtGui.QRegion(rect).subtracted(QtGui.QRegion(self._layerRect)))
+        else:
+            rect = self._layerRect
+        self._layerKey = key
+        self._layerRect = rect
+
+        changed = set(active).symmetric_difference(self._layerActive)
+        if changed:
+            self._layerDirty = self._layerDirty.united(
+                self.widgetRect(self.shapesRect(changed)))
+        self._layerActive = active
+
+        region = self._layerDirty.intersected(exposed)
+        if region.isEmpty():
+            return
+        self._layerDirty = self._layerDirty.subtracted(region)
+
+        p = QtGui.QPainter(self._layer)
+        p.translate(-rect.topLeft())
+        p.setClipRegion(region)
+        bounds = region.boundingRect()
+        p.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        p.fillRect(bounds, QtCore.Qt.transparent)
+        p.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+        p.scale(self.scale, self.scale)
+        p.translate(offset)
+
+        exposed = self.transformRect(bounds)
+        if not self._hideBackround:
+            Shape.scale = self.scale
+            margin = self.paintMargin()
+            active = set(active)
+            for shape in self.shapesIn(
+                    exposed.adjusted(-margin, -margin, margin, margin)):
+                if shape not in active:
+                    shape.fill = False
+                    shape.paint(p)
+        p.end()
+
+    def _newLayer(self, rect, ratio):
+        layer = QtGui.QPixmap(rect.size() * ratio)
+        if QT5:
+            layer.setDevicePixelRatio(ratio)
+        layer.fill(QtCore.Qt.transparent)
+        return layer
+
+    def _scaledLayer(self, rect, ratio):
+        """Return the layer scaled to the current zoom and the area it
+        does not cover, left dirty.
+        """
+        old_scale, old_x, old_y = self._layerKey[:3]
+        offset = self.offsetToCenter()
+        # widget coordinates at the previous zoom to the current ones
+        transform = QtGui.QTransform()
+        transform.translate(-rect.x(), -rect.y())
+        transform.scale(self.scale, self.scale)
+        transform.translate(offset.x() - old_x, offset.y() - old_y)
+        transform.scale(1.0 / old_scale, 1.0 / old_scale)
+        layer = self._newLayer(rect, ratio)
+        p = QtGui.QPainter(layer)
+        p.setTransform(transform)
+        p.drawPixmap(self._layerRect.topLeft(), self._layer)
+        p.end()
+        # what was dirty is stale, the layer is rendered again at the end
+        covered = transform.mapRect(self._layerRect).translated(
+            rect.topLeft()).intersected(rect)
+        return layer, QtGui.QRegion(rect).subtracted(QtGui.QRegion(covered))
+
+    def zooming(self):
+        """Return True during a wheel zoom, the canvas is then previewed."""
+        return self._zoomTimer.isActive()
+
+    def endZoom(self):
+        """Render the canvas at full quality once the zoom settled."""
+        self._zoomTimer.stop()
+        if self._layerPreview:
+            self.invalidateLayer()
+
     def transformPos(self, point):
         """Convert from widget-logical coordinates to painter-logical ones."""
         return point / self.scale - self.offsetToCenter()
 
+    def transformRect(self, rect):
+        """Convert a widget rectangle to painter-logical coordinates."""
+        s = self.scale
+        offset = self.offsetToCenter()
+        return QtCore.QRectF(rect.x() / s - offset.x(),
+                             rect.y() / s - offset.y(),
+                             rect.width() / s, rect.height() / s)
+
+    def widgetRect(self, rect):
+        """Convert a painter-logical rectangle to the widget rectangle."""
+        s = self.scale
+        offset = self.offsetToCenter()
+        return QtCore.QRectF((rect.x() + offset.x()) * s,
+                             (rect.y() + offset.y()) * s,
+                             rect.width() * s,
+                             rect.height() * s).toAlignedRect()
+
     def offsetToCenter(self):
         s = self.scale
         area = super(Canvas, self).size()
@@ -529,7 +951,7 @@ class Canvas(QtWidgets.QWidget):
         aw, ah = area.width(), area.height()
         x = (aw - w) / (2 * s) if aw > w else 0
         y = (ah - h) / (2 * s) if ah > h else 0
-        return QtCore.QPoint(x, y)
+        return QtCore.QPoint(int(x), int(y))
 
     def outOfPixmap(self, p):
         w, h = self.pixmap.width(), self.pixmap.height()
@@ -537,9 +959,12 @@ class Canvas(QtWidgets.QWidget):
 
     def finalise(self):
         assert self.current
+        self.current.highlightClear()
         self.current.close()
         self.shapes.append(self.current)
-        self.storeShapes()
+        self.indexShape(self.current)
+        self.pushCommand(AddShapes([self.current]))
+        self.invalidateImageRect(self.shapesRect([self.current]))
         self.current = None
         self.setHiding(False)
         self.newShape.emit()
@@ -622,27 +1047,61 @@ class Canvas(QtWidgets.QWidget):
             if QtCore.Qt.ControlModifier == int(mods):
                 # with Ctrl/Command key
                 # zoom
-                self.zoomRequest.emit(delta.y(), ev.pos())
+                self.requestZoom(delta.y(), ev.pos())
             else:
                 # scroll
-                self.scrollRequest.emit(delta.x(), QtCore.Qt.Horizontal)
-                self.scrollRequest.emit(delta.y(), QtCore.Qt.Vertical)
+                self.requestScroll(delta.x(), QtCore.Qt.Horizontal)
+                self.requestScroll(delta.y(), QtCore.Qt.Vertical)
         else:
             if ev.orientation() == QtCore.Qt.Vertical:
                 mods = ev.modifiers()
                 if QtCore.Qt.ControlModifier == int(mods):
                     # with Ctrl/Command key
-                    self.zoomRequest.emit(ev.delta(), ev.pos())
+                    self.requestZoom(ev.delta(), ev.pos())
                 else:
-                    self.scrollRequest.emit(
+                    self.requestScroll(
                         ev.delta(),
                         QtCore.Qt.Horizontal
                         if (QtCore.Qt.ShiftModifier == int(mods))
                         else QtCore.Qt.Vertical)
             else:
-                self.scrollRequest.emit(ev.delta(), QtCore.Qt.Horizontal)
+                self.requestScroll(ev.delta(), QtCore.Qt.Horizontal)
         ev.accept()
 
+    def requestZoom(self, delta, pos):
+        """Zoom by wheel `delta` around `pos` at the next frame.
+
+        Touchpads send many small deltas per frame, they are summed and
+        zoomRequest is emitted once.
+        """
+        if not delta:
+            return
+        self._wheelZoom += delta
+        self._wheelPos = pos
+        self._zoomTimer.start()
+        if not self._wheelTimer.isActive():
+            self._wheelTimer.start()
+
+    def requestScroll(self, delta, orientation):
+        """Scroll by wheel `delta` at the next frame, like requestZoom."""
+        if not delta:
+            return
+        self._wheelScroll[orientation] = \
+            self._wheelScroll.get(orientation, 0) + delta
+        if not self._wheelTimer.isActive():
+            self._wheelTimer.start()
+
+    def flushWheel(self):
+        """Emit the zoom and scroll accumulated since the last frame."""
+        self._wheelTimer.stop()
+        zoom, self._wheelZoom = self._wheelZoom, 0
+        scroll, self._wheelScroll = self._wheelScroll, {}
+        if zoom:
+            self.zoomRequest.emit(zoom, self._wheelPos)
+        for orientation in [QtCore.Qt.Horizontal, QtCore.Qt.Vertical]:
+            if scroll.get(orientation):
+                self.scrollRequest.emit(scroll[orientation], orientation)
+
     def keyPressEvent(self, ev):
         key = ev.key()
         if key == QtCore.Qt.Key_Escape and self.current:
@@ -656,13 +1115,15 @@ class Canvas(QtWidgets.QWidget):
         assert text
         self.shapes[-1].label = text
         self.shapes[-1].flags = flags
-        self.shapesBackups.pop()
-        self.storeShapes()
         return self.shapes[-1]
 
     def undoLastLine(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.unindexShape(self.current)
+        self.invalidateImageRect(self.shapesRect([self.current]))
+        # the shape is not added anymore
+        self.undoStack.pop()
         self.current.setOpen()
         if self.createMode in ['polygon', 'linestrip']:
             self.line.points = [self.current[-1], self.current[0]]
@@ -684,28 +1145,61 @@ class Canvas(QtWidgets.QWidget):
         self.repaint()
 
     def loadPixmap(self, pixmap, date):
-        self.pixmap = pixmap
+        self.loadPixmaps({date: pixmap}, date)
+
+    def loadPixmaps(self, pixmaps, date):
+        """Load the pixmaps of each date, a dict, and show the one of `date`.
+        """
+        self.pixmaps = dict(pixmaps)
+        self.pixmap = self.pixmaps[date]
         self.date = date
         self.shapes = []
+        self.reindexShapes()
+        self.invalidateLayer()
         self.repaint()
+        self.dateChanged.emit(date)
 
-    def loadOtherDate(self, pixmap, date):
-        self.pixmap = pixmap
+    def showDate(self, date):
+        """Show the pixmap of `date`, converted once when it was loaded."""
+        if date == self.date or date not in self.pixmaps:
+            return
+        self.pixmap = self.pixmaps[date]
         self.date = date
-        self.repaint()
+        self.update()
+        self.dateChanged.emit(date)
+
+    def toggleDate(self):
+        """Show the pixmap of the other date."""
+        for date in self.pixmaps:
+            if date != self.date:
+                self.showDate(date)
+                return
+
+    def isBlinking(self):
+        return self._blinkTimer.isActive()
+
+    def setBlinking(self, value, interval=500):
+        """Toggle the dates every `interval` ms while `value` is True."""
+        if value:
+            self._blinkTimer.start(interval)
+        else:
+            self._blinkTimer.stop()
 
     def loadShapes(self, shapes, replace=True):
         if replace:
             self.shapes = list(shapes)
+            self.reindexShapes()
         else:
             self.shapes.extend(shapes)
-        self.storeShapes()
+            for shape in shapes:
+                self.indexShape(shape)
+        self.undoStack.clear()
         self.current = None
+        self.invalidateLayer()
         self.repaint()
 
-    def setShapeVisible(self, shape, value):
-        self.visible[shape] = value
-        self.repaint()
+    def shapesVisibilityChanged(self, shapes):
+        self.invalidateImageRect(self.shapesRect(shapes))
 
     def overrideCursor(self, cursor):
         self.restoreCursor()
@@ -718,5 +1212,6 @@ class Canvas(QtWidgets.QWidget):
     def resetState(self):
         self.restoreCursor()
         self.pixmap = None
-        self.shapesBackups = []
-        self.update()
+        self.pixmaps = {}
+        self.undoStack.clear()
+        self.invalidateLayer()
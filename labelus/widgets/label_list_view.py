@@ -0,0 +1,66 @@
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+from labelus.widgets.shape_list_model import _runs
+
+
+class LabelListView(QtWidgets.QListView):
+
+    """Polygon dock list, a view of a `ShapeListModel`.
+
+    Rows are reordered by drag and drop, which emits `shapesMoved`.
+    """
+
+    shapesMoved = QtCore.Signal()
+
+    def __init__(self, *args, **kwargs):
+        super(LabelListView, self).__init__(*args, **kwargs)
+        self.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.setDragDropMode(QtWidgets.QAbstractItemView.InternalMove)
+        self.setDefaultDropAction(QtCore.Qt.MoveAction)
+        # rows are laid out without asking the model for each of them
+        self.setUniformItemSizes(True)
+
+    def selectedRows(self):
+        # from the ranges, selectedRows() tests each row of each range
+        rows = []
+        for selection_range in self.selectionModel().selection():
+            rows.extend(range(selection_range.top(),
+                              selection_range.bottom() + 1))
+        return sorted(rows)
+
+    def selectedShapes(self):
+        model = self.model()
+        return [model.shape(row) for row in self.selectedRows()]
+
+    def selectShapes(self, shapes):
+        """Select the rows of `shapes` only, with one selection change."""
+        model = self.model()
+        rows = sorted(model.rowOfShape(shape) for shape in shapes)
+        # one range per run of consecutive rows, the selection model slows
+        # down with its number of ranges
+        selection = QtCore.QItemSelection()
+        for first, last in _runs(row for row in rows if row >= 0):
+            selection.select(model.index(first), model.index(last))
+        self.selectionModel().select(
+            selection, QtCore.QItemSelectionModel.ClearAndSelect)
+
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+        index = self.indexAt(event.pos())
+        if not index.isValid():
+            destination = self.model().rowCount()
+        elif self.dropIndicatorPosition() == self.BelowItem:
+            destination = index.row() + 1
+        else:
+            destination = index.row()
+        rows = self.selectedRows()
+        # the rows are moved here, the drag must not remove them
+        event.setDropAction(QtCore.Qt.IgnoreAction)
+        event.accept()
+        self.setState(self.NoState)
+        self.viewport().update()
+        if rows and self.model().moveShapes(rows, destination):
+            self.shapesMoved.emit()
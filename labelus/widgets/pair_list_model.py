@@ -0,0 +1,286 @@
+import os.path as osp
+
+from qtpy.QtCore import Qt
+from qtpy import QtCore
+
+from labelus.utils import NameIndex
+
+
+def pair_stem(filename):
+    """Return the path shared by both images of a pair.
+
+    For example `data/401` for `data/401.d1.jpg`.
+    """
+    # called for every scanned pair, so avoid osp.split and osp.join
+    i = filename.rfind(osp.sep)
+    if osp.altsep:
+        i = max(i, filename.rfind(osp.altsep))
+    return filename[:i + 1] + filename[i + 1:].split('.')[0]
+
+
+class PairListModel(QtCore.QAbstractListModel):
+
+    """Image pairs shown in the location dock and walked by navigation.
+
+    Pairs are stored in parallel arrays, with a stem -> row dictionary, so
+    that looking a pair up by row or by stem is O(1).
+
+    Views only see the rows fetched so far, `fetch_size` more at a time as
+    they scroll, while `len(model)` and the lookups cover all pairs.
+
+    `setFilter` hides the pairs neither image path of which matches a
+    query, see `NameIndex.search`. Rows are then counted among the shown
+    pairs only, for the views as well as for navigation.
+    """
+
+    fetch_size = 1000
+
+    def __init__(self, parent=None):
+        super(PairListModel, self).__init__(parent)
+        self._stems = []
+        self._dates1 = []
+        self._dates2 = []
+        self._checked = bytearray()
+        self._rows = {}  # stem -> row
+        self._fetched = 0
+        # both image paths of each pair, those of row r at 2 * r and 2 * r + 1
+        self._index = NameIndex()
+        self._named = None  # name -> stems, built by stemsNamed
+        self._query = ''
+        self._shown = None  # rows of the pairs matching _query
+        self._shownRows = None  # row -> shown row
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._fetched
+
+    def __len__(self):
+        if self._shown is None:
+            return len(self._stems)
+        return len(self._shown)
+
+    def _source(self, row):
+        """Return the row among all pairs of shown row `row`."""
+        if self._shown is None:
+            return row
+        return self._shown[row]
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetched < len(self)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return
+        self.fetchUntil(self._fetched + self.fetch_size - 1)
+
+    def fetchUntil(self, row):
+        """Make rows up to `row` visible to the views."""
+        row = min(row, len(self) - 1)
+        if row < self._fetched:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), self._fetched, row)
+        self._fetched = row + 1
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._source(index.row())
+        if role == Qt.DisplayRole:
+            return self._stems[row]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self._checked[row] else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def setPairs(self, pairs, checked=None):
+        """Replace all pairs by `pairs`, a list of (date1, date2).
+
+        `checked` is an optional list of the annotated state of each pair.
+        """
+        dates1 = [pair[0] for pair in pairs]
+        if checked is None:
+            checked = bytearray(len(pairs))
+        else:
+            checked = bytearray(bool(c) for c in checked)
+        self._reset(dates1, [pair[1] for pair in pairs],
+                    [pair_stem(filename) for filename in dates1], checked,
+                    self.fetch_size)
+
+    def _reset(self, dates1, dates2, stems, checked, fetched):
+        self.beginResetModel()
+        self._dates1 = dates1
+        self._dates2 = dates2
+        self._stems = stems
+        self._checked = checked
+        self._rows = dict((stem, row) for row, stem in enumerate(self._stems))
+        self._index.clear()
+        self._indexPairs(0)
+        self._named = None
+        self._applyFilter()
+        self._fetched = min(fetched, len(self))
+        self.endResetModel()
+
+    def appendPairs(self, pairs, checked=None):
+        """Add `pairs` after the existing ones, see `setPairs`."""
+        if not pairs:
+            return
+        first = len(self._stems)
+        self._dates1.extend(pair[0] for pair in pairs)
+        self._dates2.extend(pair[1] for pair in pairs)
+        self._stems.extend(pair_stem(pair[0]) for pair in pairs)
+        if checked is None:
+            self._checked.extend(bytearray(len(pairs)))
+        else:
+            self._checked.extend(bytearray(bool(c) for c in checked))
+        for row in range(first, len(self._stems)):
+            self._rows[self._stems[row]] = row
+        self._indexPairs(first)
+        self._named = None
+        if self._shown is not None:
+            for row in self._pairRows(
+                    self._index.search(self._query, start=2 * first)):
+                self._shownRows[row] = len(self._shown)
+                self._shown.append(row)
+        # fill the first screen, later rows are fetched as views scroll
+        self.fetchUntil(self.fetch_size - 1)
+
+    def removeStems(self, stems):
+        """Remove the pairs named `stems`, ignoring unknown ones."""
+        rows = set(self._rows[stem] for stem in stems if stem in self._rows)
+        if not rows:
+            return
+        kept = [row for row in range(len(self._stems)) if row not in rows]
+        self._reset(
+            [self._dates1[row] for row in kept],
+            [self._dates2[row] for row in kept],
+            [self._stems[row] for row in kept],
+            bytearray(self._checked[row] for row in kept),
+            # keep the views scrolled where they were
+            max(self._fetched, self.fetch_size),
+        )
+
+    def clear(self):
+        self.setPairs([])
+
+    def __contains__(self, stem):
+        """Return True if the pair named `stem` exists, even if hidden."""
+        return stem in self._rows
+
+    def allStems(self):
+        """Return the stems of all pairs, including hidden ones."""
+        return list(self._stems)
+
+    def stemsIn(self, dirpath):
+        """Return the stems of all pairs whose images are in `dirpath`."""
+        prefix = osp.join(dirpath, '')
+        start = len(prefix)
+        return [stem for stem in self._stems if stem.startswith(prefix) and
+                self._name(stem) == stem[start:]]
+
+    def stemsNamed(self, name):
+        """Return the stems of all pairs named `name`, in any directory."""
+        if self._named is None:
+            self._named = {}
+            for stem in self._stems:
+                key = self._name(stem)
+                # names are nearly all unique, tuples are cheaper than lists
+                self._named[key] = self._named.get(key, ()) + (stem,)
+        return list(self._named.get(name, ()))
+
+    def _indexPairs(self, first):
+        self._index.extend(
+            filename for row in range(first, len(self._stems))
+            for filename in (self._dates1[row], self._dates2[row]))
+
+    @staticmethod
+    def _pairRows(indices):
+        """Return the rows of the pairs of indexed paths `indices`."""
+        rows = []
+        for i in indices:
+            # sorted, both paths of a pair are next to each other
+            if not rows or rows[-1] != i // 2:
+                rows.append(i // 2)
+        return rows
+
+    @staticmethod
+    def _name(stem):
+        i = stem.rfind(osp.sep)
+        if osp.altsep:
+            i = max(i, stem.rfind(osp.altsep))
+        return stem[i + 1:]
+
+    def filter(self):
+        return self._query
+
+    def setFilter(self, query):
+        """Show only the pairs with an image path matching `query`, or all
+        if empty.
+
+        The filter also applies to the pairs added later.
+        """
+        if query == self._query:
+            return
+        self.beginResetModel()
+        self._query = query
+        self._applyFilter()
+        self._fetched = min(self.fetch_size, len(self))
+        self.endResetModel()
+
+    def _applyFilter(self):
+        if not self._query:
+            self._shown = self._shownRows = None
+            return
+        self._shown = self._pairRows(self._index.search(self._query))
+        self._shownRows = dict(
+            (row, shown) for shown, row in enumerate(self._shown))
+
+    def pair(self, row):
+        row = self._source(row)
+        return self._dates1[row], self._dates2[row]
+
+    def stem(self, row):
+        return self._stems[self._source(row)]
+
+    def rowOfStem(self, stem):
+        """Return the row of the pair named `stem`, or -1 if not shown."""
+        row = self._rows.get(stem, -1)
+        if self._shown is None or row < 0:
+            return row
+        return self._shownRows.get(row, -1)
+
+    def rowOfPair(self, filename_date1, filename_date2):
+        """Return the row of the pair of images, or -1."""
+        if filename_date1 is None:
+            return -1
+        row = self.rowOfStem(pair_stem(filename_date1))
+        if row >= 0 and self.pair(row) == (filename_date1, filename_date2):
+            return row
+        return -1
+
+    def isChecked(self, row):
+        return bool(self._checked[self._source(row)])
+
+    def setChecked(self, row, value=True):
+        self._setChecked(self._source(row), row, value)
+
+    def checkStem(self, stem, value=True):
+        """Set the checked state of the pair named `stem`, even if hidden."""
+        row = self._rows.get(stem, -1)
+        if row >= 0:
+            self._setChecked(row, self.rowOfStem(stem), value)
+
+    def _setChecked(self, row, shown, value):
+        if bool(self._checked[row]) == bool(value):
+            return
+        self._checked[row] = bool(value)
+        if 0 <= shown < self._fetched:
+            index = self.index(shown)
+            self.dataChanged.emit(index, index)
@@ -0,0 +1,178 @@
+from qtpy.QtCore import Qt
+from qtpy import QtCore
+
+
+class ShapeListModel(QtCore.QAbstractListModel):
+
+    """Shapes listed in the polygon dock, in the z-order of the canvas.
+
+    Rows read their label from their shape and their check state from an
+    array of visibility flags, so no item is built per row and views only
+    ask for the rows they paint. A shape -> row dictionary is rebuilt
+    lazily after rows were inserted, removed or moved.
+    """
+
+    visibilityChanged = QtCore.Signal(object)  # list of shapes
+
+    mime_type = 'application/x-labelus-shape-rows'
+
+    def __init__(self, parent=None):
+        super(ShapeListModel, self).__init__(parent)
+        self._shapes = []
+        self._visible = bytearray()
+        self._rows = {}  # shape -> row, None when stale
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._shapes)
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return self._shapes[row].label
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self._visible[row] else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        row = index.row()
+        self._visible[row] = value == Qt.Checked
+        self.dataChanged.emit(index, index)
+        self.visibilityChanged.emit([self._shapes[row]])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            # rows are dropped between rows, not onto them
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | \
+            Qt.ItemIsUserCheckable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [self.mime_type]
+
+    def mimeData(self, indexes):
+        # the rows are moved by the view, which knows them, see
+        # LabelListView.dropEvent; encoding their data is not needed
+        data = QtCore.QMimeData()
+        data.setData(self.mime_type, QtCore.QByteArray())
+        return data
+
+    def shapes(self):
+        return list(self._shapes)
+
+    def shape(self, row):
+        return self._shapes[row]
+
+    def rowOfShape(self, shape):
+        """Return the row of `shape`, or -1."""
+        if self._rows is None:
+            self._rows = dict(
+                (shape, row) for row, shape in enumerate(self._shapes))
+        return self._rows.get(shape, -1)
+
+    def isVisible(self, shape):
+        row = self.rowOfShape(shape)
+        return row < 0 or bool(self._visible[row])
+
+    def setAllVisible(self, value):
+        if not self._shapes:
+            return
+        self._visible = bytearray([bool(value)]) * len(self._shapes)
+        self.dataChanged.emit(self.index(0), self.index(len(self) - 1))
+        self.visibilityChanged.emit(list(self._shapes))
+
+    def setShapes(self, shapes):
+        """Replace all shapes, keeping the flags of the shapes kept."""
+        shapes = list(shapes)
+        if shapes == self._shapes:
+            # labels may have changed
+            if shapes:
+                self.dataChanged.emit(self.index(0),
+                                      self.index(len(shapes) - 1))
+            return
+        visible = bytearray(self.isVisible(shape) for shape in shapes)
+        self.beginResetModel()
+        self._shapes = shapes
+        self._visible = visible
+        self._rows = None
+        self.endResetModel()
+
+    def appendShapes(self, shapes):
+        if not shapes:
+            return
+        first = len(self._shapes)
+        self.beginInsertRows(QtCore.QModelIndex(), first,
+                             first + len(shapes) - 1)
+        self._shapes.extend(shapes)
+        self._visible.extend(bytearray([1]) * len(shapes))
+        if self._rows is not None:
+            for row in range(first, len(self._shapes)):
+                self._rows[self._shapes[row]] = row
+        self.endInsertRows()
+
+    def removeShapes(self, shapes):
+        """Remove `shapes`, ignoring unknown ones."""
+        rows = set(self.rowOfShape(shape) for shape in shapes) - set([-1])
+        if not rows:
+            return
+        runs = _runs(sorted(rows))
+        if len(runs) == 1:
+            first, last = runs[0]
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            del self._shapes[first:last + 1]
+            del self._visible[first:last + 1]
+            self._rows = None
+            self.endRemoveRows()
+        else:
+            # views update their selection on each removal, resetting is
+            # faster than removing many runs one by one
+            self.setShapes(shape for row, shape in enumerate(self._shapes)
+                           if row not in rows)
+
+    def moveShapes(self, rows, destination):
+        """Move `rows` together before row `destination`, in their order."""
+        rows = sorted(rows)
+        moved = set(rows)
+        order = [row for row in range(destination) if row not in moved]
+        order += rows
+        order += [row for row in range(destination, len(self._shapes))
+                  if row not in moved]
+        if order == list(range(len(order))):
+            return False
+        self.layoutAboutToBeChanged.emit()
+        new_rows = dict((old, new) for new, old in enumerate(order))
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(
+            persistent,
+            [self.index(new_rows[index.row()]) for index in persistent])
+        self._shapes = [self._shapes[row] for row in order]
+        self._visible = bytearray(self._visible[row] for row in order)
+        self._rows = None
+        self.layoutChanged.emit()
+        return True
+
+    def clear(self):
+        self.setShapes([])
+
+
+def _runs(rows):
+    """Return (first, last) of the runs of consecutive sorted `rows`."""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
@@ -0,0 +1,45 @@
+import json
+import os
+import os.path as osp
+
+from labelus.autosave import AutoSaver
+
+
+def _save_args(shapes):
+    return dict(
+        shapes=shapes,
+        image_date1Path='401.d1.jpg',
+        image_date2Path='401.d2.jpg',
+        imageHeight=30,
+        imageWidth=40,
+    )
+
+
+def test_AutoSaver_coalesce(qtbot, tmpdir):
+    filename = osp.join(str(tmpdir), 'labels', '401.json')
+    saver = AutoSaver(delay=50)
+    snapshots = []
+
+    def snapshot():
+        snapshots.append(len(snapshots))
+        return _save_args([{'label': str(len(snapshots))}])
+
+    with qtbot.waitSignal(saver.saved):
+        for _ in range(5):
+            saver.schedule(filename, snapshot)
+    saver.stop()
+
+    assert snapshots == [0]
+    with open(filename) as f:
+        assert json.load(f)['shapes'] == [{'label': '1'}]
+    assert os.listdir(osp.dirname(filename)) == ['401.json']
+
+
+def test_AutoSaver_failed(qtbot, tmpdir):
+    filename = osp.join(str(tmpdir), '401.json')
+    os.mkdir(filename)  # cannot be replaced by a file
+    saver = AutoSaver(delay=0)
+    with qtbot.waitSignal(saver.failed) as blocker:
+        saver.schedule(filename, lambda: _save_args([]))
+    assert blocker.args[0] == filename
+    saver.stop()
@@ -0,0 +1,173 @@
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.shape import Shape
+
+from .util import make_canvas
+
+
+def test_Canvas_paint_exposed_only(qtbot, monkeypatch):
+    canvas = make_canvas(qtbot)
+    painted = []
+    monkeypatch.setattr(Shape, 'paint',
+                        lambda shape, painter: painted.append(shape.label))
+
+    image = QtGui.QImage(200, 200, QtGui.QImage.Format_ARGB32)
+    canvas.render(image, QtCore.QPoint(),
+                  QtGui.QRegion(QtCore.QRect(90, 0, 50, 50)))
+    assert painted == ['1']
+
+
+def _render(canvas):
+    image = QtGui.QImage(200, 200, QtGui.QImage.Format_ARGB32)
+    image.fill(QtCore.Qt.white)
+    canvas.render(image)
+    return image
+
+
+def test_Canvas_layer(qtbot, monkeypatch):
+    canvas = make_canvas(qtbot)
+    _render(canvas)
+    painted = []
+    paint = Shape.paint
+
+    def paint_logged(shape, painter):
+        painted.append(shape.label)
+        paint(shape, painter)
+
+    monkeypatch.setattr(Shape, 'paint', paint_logged)
+
+    # dragging a vertex repaints the dragged shape only
+    shape = canvas.shapes[1]
+    canvas.hShape, canvas.hVertex = shape, 1
+    for x in [125, 130]:
+        canvas.boundedMoveVertex(QtCore.QPointF(x, 40))
+        _render(canvas)
+    assert painted == ['1', '1']
+
+    # the shape dropped back into the layer is drawn as if never cached
+    canvas.unHighlight()
+    image = _render(canvas)
+    expected = make_canvas(qtbot)
+    expected.shapes[1][1] = QtCore.QPointF(130, 40)
+    assert image == _render(expected)
+
+
+def test_Canvas_layer_date(qtbot, monkeypatch):
+    canvas = make_canvas(qtbot)
+    pixmap2 = QtGui.QPixmap(1000, 1000)
+    pixmap2.fill(QtCore.Qt.white)
+    canvas.pixmaps['date2'] = pixmap2
+    _render(canvas)
+    painted = []
+    monkeypatch.setattr(Shape, 'paint',
+                        lambda shape, painter: painted.append(shape.label))
+
+    # the shapes are cached apart from the pixmap, swapping dates is a blit
+    canvas.toggleDate()
+    image = _render(canvas)
+    assert painted == []
+    assert image.pixelColor(100, 100) == QtGui.QColor(QtCore.Qt.white)
+
+
+def test_Canvas_drawing_update(qtbot, monkeypatch):
+    canvas = make_canvas(qtbot)
+    canvas.show()
+    qtbot.waitExposed(canvas)
+    canvas.setEditing(False)
+    canvas.current = Shape(shape_type='polygon')
+    for x, y in [(50, 100), (100, 100), (100, 150)]:
+        canvas.current.addPoint(QtCore.QPointF(x, y))
+    canvas.line.points = [canvas.current[-1], canvas.current[-1]]
+    paints = []
+    paint_event = canvas.paintEvent
+
+    def paint_logged(event):
+        paints.append(canvas.current._highlightIndex)
+        paint_event(event)
+
+    monkeypatch.setattr(canvas, 'paintEvent', paint_logged)
+
+    # the moves are painted together, with the start point highlighted
+    for x in [120, 80, 52]:
+        pos = QtCore.QPointF(x, 102)
+        canvas.mouseMoveEvent(QtGui.QMouseEvent(
+            QtCore.QEvent.MouseMove, pos, QtCore.Qt.NoButton,
+            QtCore.Qt.NoButton, QtCore.Qt.NoModifier))
+    assert paints == []
+    qtbot.waitUntil(lambda: len(paints) > 0)
+    assert paints == [0]
+
+
+def test_Canvas_shapesRect(qtbot):
+    canvas = make_canvas(qtbot)
+    shape = canvas.shapes[3]
+    rect = canvas.shapesRect([shape])
+    assert rect.contains(shape.boundingRect())
+    assert not rect.intersects(canvas.shapes[2].boundingRect())
+    assert canvas.transformRect(canvas.widgetRect(rect)).contains(rect)
+
+
+def test_Canvas_toggleDate(qtbot):
+    canvas = make_canvas(qtbot)
+    pixmap1 = canvas.pixmap
+    pixmap2 = QtGui.QPixmap(1000, 1000)
+    canvas.loadPixmaps({'date1': pixmap1, 'date2': pixmap2}, 'date1')
+    with qtbot.waitSignal(canvas.dateChanged):
+        canvas.toggleDate()
+    assert canvas.date == 'date2'
+    assert canvas.pixmap is pixmap2
+    canvas.toggleDate()
+    assert canvas.pixmap is pixmap1
+
+    canvas.setBlinking(True, interval=10)
+    assert canvas.isBlinking()
+    with qtbot.waitSignal(canvas.dateChanged):
+        pass
+    assert canvas.pixmap is pixmap2
+    canvas.setBlinking(False)
+    assert not canvas.isBlinking()
+
+
+def test_Canvas_wheel(qtbot):
+    canvas = make_canvas(qtbot)
+    zooms, scrolls = [], []
+    canvas.zoomRequest.connect(lambda delta, pos: zooms.append((delta, pos)))
+    canvas.scrollRequest.connect(
+        lambda delta, orientation: scrolls.append((delta, orientation)))
+    for _ in range(5):
+        canvas.requestZoom(24, QtCore.QPoint(10, 20))
+        canvas.requestScroll(-30, QtCore.Qt.Vertical)
+    assert not zooms and not scrolls
+    qtbot.waitUntil(lambda: len(zooms) > 0)
+    assert zooms == [(120, QtCore.QPoint(10, 20))]
+    assert scrolls == [(-150, QtCore.Qt.Vertical)]
+    assert canvas.zooming()
+    qtbot.waitUntil(lambda: not canvas.zooming())
+
+
+def test_Canvas_zoom_preview(qtbot, monkeypatch):
+    canvas = make_canvas(qtbot)
+    _render(canvas)
+    painted = []
+    paint = Shape.paint
+
+    def paint_logged(shape, painter):
+        painted.append(shape.label)
+        paint(shape, painter)
+
+    monkeypatch.setattr(Shape, 'paint', paint_logged)
+
+    # while zooming the layer is scaled, the shapes are not drawn again
+    canvas.requestZoom(120, QtCore.QPoint())
+    canvas.scale = 2.0
+    _render(canvas)
+    assert painted == []
+
+    # a full render once the zoom settled
+    canvas.endZoom()
+    image = _render(canvas)
+    assert painted
+    expected = make_canvas(qtbot)
+    expected.scale = 2.0
+    assert image == _render(expected)
@@ -0,0 +1,43 @@
+import os
+
+from labelus.image_cache import ImageCache
+
+from .util import make_image_pair
+
+
+def test_ImageCache_load(tmpdir):
+    filename, _ = make_image_pair(str(tmpdir))
+    cache = ImageCache()
+
+    imageData, image = cache.load(filename)
+    assert image.width() == 40
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.load(filename)[1] is image
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a modified file is decoded again
+    stat = os.stat(filename)
+    os.utime(filename, (stat.st_atime, stat.st_mtime + 10))
+    assert cache.load(filename)[1] is not image
+    assert cache.misses == 2
+
+
+def test_ImageCache_eviction(tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    cache = ImageCache()
+    cache.load(filename_date1)
+    cache.setMaxBytes(cache.nbytes * 3 // 2)
+
+    cache.load(filename_date2)
+    assert len(cache) == 1
+    assert cache.get(filename_date1) is None
+    assert cache.get(filename_date2) is not None
+
+
+def test_ImageCache_keep_data(tmpdir):
+    filename, _ = make_image_pair(str(tmpdir))
+    cache = ImageCache(keep_data=False)
+    imageData, image = cache.load(filename)
+    assert imageData is None
+    assert not image.isNull()
+    assert cache.nbytes == image.byteCount()
@@ -0,0 +1,59 @@
+import io
+import os.path as osp
+
+import numpy as np
+import PIL.Image
+
+from labelus.image_cache import ImageCache
+from labelus.label_file import LabelFile
+
+from .util import make_image_pair
+
+
+def test_read_image_file(tmpdir):
+    filename, _ = make_image_pair(str(tmpdir))
+    imageData, image_pil = LabelFile.read_image_file(filename)
+    assert image_pil is None
+    with open(filename, 'rb') as f:
+        assert imageData == f.read()
+
+
+def test_read_image_file_exif_rotated(tmpdir):
+    filename = osp.join(str(tmpdir), 'rotated.jpg')
+    img = np.random.randint(0, 255, (30, 40, 3), dtype=np.uint8)
+    exif = PIL.Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 270
+    PIL.Image.fromarray(img).save(filename, exif=exif)
+
+    imageData, image_pil = LabelFile.read_image_file(filename)
+    assert imageData is None
+    assert image_pil.size == (30, 40)
+
+    # encoded only when the bytes are asked for
+    imageData, image = ImageCache().load(filename)
+    assert imageData is None
+    assert (image.width(), image.height()) == (30, 40)
+    imageData = LabelFile.load_image_file(filename)
+    assert PIL.Image.open(io.BytesIO(imageData)).size == (30, 40)
+
+
+def test_save_with_image_data(tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    label_file = osp.join(str(tmpdir), '401.json')
+    lf = LabelFile()
+    lf.save(
+        filename=label_file,
+        shapes=[],
+        image_date1Path=osp.basename(filename_date1),
+        image_date2Path=osp.basename(filename_date2),
+        imageHeight=30,
+        imageWidth=40,
+        image_date1Data=LabelFile.load_image_file(filename_date1),
+        image_date2Data=LabelFile.load_image_file(filename_date2),
+    )
+
+    lf = LabelFile(label_file)
+    with open(filename_date2, 'rb') as f:
+        assert lf.image_date2Data == f.read()
+    assert LabelFile._check_image_height_and_width(
+        lf.image_date1Data, 1, 1) == (30, 40)
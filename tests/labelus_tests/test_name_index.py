@@ -0,0 +1,26 @@
+from labelus.utils import NameIndex
+
+
+def test_NameIndex():
+    index = NameIndex()
+    index.extend(['paris_01', 'lyon_01', 'paris_02', 'nice'])
+    assert len(index) == 4
+    assert index.search('') == [0, 1, 2, 3]
+    assert index.search('01') == [0, 1]
+    assert index.search('is_01') == [0]
+    assert index.search('^paris') == [0, 2]
+    assert index.search('^paris_0') == [0, 2]
+    assert index.search('^ice') == []
+    assert index.search('*_0[2-9]') == [2]
+    assert index.search('paris*') == [0, 2]
+    assert index.search('?ice') == [3]
+
+    # a refined query also searches the names added since
+    assert index.search('par') == [0, 2]
+    index.extend(['parma'])
+    assert index.search('pa') == [0, 2, 4]
+    assert index.search('par') == [0, 2, 4]
+    assert index.search('^pa', start=3) == [4]
+
+    index.clear()
+    assert index.search('par') == []
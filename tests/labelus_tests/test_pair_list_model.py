@@ -0,0 +1,110 @@
+from qtpy.QtCore import Qt
+
+from labelus.widgets import pair_stem
+from labelus.widgets import PairListModel
+
+
+def test_pair_stem():
+    assert pair_stem('/data/v1.0/401.d1.jpg') == '/data/v1.0/401'
+    assert pair_stem('401.d2.png') == '401'
+
+
+def test_PairListModel(qtbot):
+    model = PairListModel()
+    pairs = [('d/{}.d1.jpg'.format(i), 'd/{}.d2.jpg'.format(i))
+             for i in range(5)]
+    model.setPairs(pairs, checked=[False, True, False, False, False])
+    assert len(model) == model.rowCount() == 5
+    assert model.pair(3) == pairs[3]
+    assert model.rowOfStem('d/3') == 3
+    assert model.rowOfPair(*pairs[4]) == 4
+    assert model.rowOfPair('d/4.d1.jpg', 'other.d2.jpg') == -1
+    assert model.rowOfStem('d/9') == -1
+
+    index = model.index(1)
+    assert model.data(index) == 'd/1'
+    assert model.data(index, Qt.CheckStateRole) == Qt.Checked
+
+    with qtbot.waitSignal(model.dataChanged):
+        model.setChecked(2)
+    assert model.isChecked(2)
+
+    model.clear()
+    assert len(model) == 0
+    assert model.rowOfStem('d/3') == -1
+
+
+def test_PairListModel_fetchMore(qtbot):
+    model = PairListModel()
+    model.fetch_size = 10
+    pairs = [('{}.d1.jpg'.format(i), '{}.d2.jpg'.format(i))
+             for i in range(25)]
+    model.setPairs(pairs)
+    assert len(model) == 25
+    assert model.rowCount() == 10
+    assert model.rowOfStem('22') == 22
+
+    assert model.canFetchMore()
+    model.fetchMore()
+    assert model.rowCount() == 20
+    model.fetchUntil(22)
+    assert model.rowCount() == 23
+    model.fetchMore()
+    assert model.rowCount() == 25
+    assert not model.canFetchMore()
+
+
+def test_PairListModel_setFilter(qtbot):
+    model = PairListModel()
+    pairs = [('d/{}.a.jpg'.format(i), 'e/{}.b.jpg'.format(i))
+             for i in range(15)]
+    model.setPairs(pairs)
+
+    # the full paths of both images are matched
+    model.setFilter('e/1')
+    assert [model.stem(row) for row in range(len(model))] == \
+        ['d/1', 'd/10', 'd/11', 'd/12', 'd/13', 'd/14']
+
+    model.setFilter('2')
+    assert len(model) == model.rowCount() == 2
+    assert model.stem(0) == 'd/2'
+    assert model.pair(1) == pairs[12]
+    assert model.rowOfStem('d/12') == 1
+    assert model.rowOfStem('d/3') == -1
+
+    model.appendPairs([('d/20.a.jpg', 'e/20.b.jpg'),
+                       ('d/30.a.jpg', 'e/30.b.jpg')])
+    assert len(model) == 3
+    assert model.stem(2) == 'd/20'
+
+    model.checkStem('d/3')
+    model.setChecked(0)
+    model.setFilter('')
+    assert len(model) == 17
+    assert model.isChecked(2) and model.isChecked(3)
+    assert not model.isChecked(12)
+
+
+def test_PairListModel_removeStems(qtbot):
+    model = PairListModel()
+    pairs = [('d/{}.d1.jpg'.format(i), 'd/{}.d2.jpg'.format(i))
+             for i in range(5)] + [('d/e/5.d1.jpg', 'd/e/5.d2.jpg')]
+    model.setPairs(pairs, checked=[False, False, False, True, False, False])
+    assert 'd/3' in model
+    assert model.stemsIn('d') == ['d/0', 'd/1', 'd/2', 'd/3', 'd/4']
+    assert model.stemsIn('d/e') == ['d/e/5']
+
+    model.removeStems(['d/1', 'd/9'])
+    assert 'd/1' not in model
+    assert len(model) == 5
+    assert model.rowOfStem('d/3') == 2
+    assert model.isChecked(2)
+
+
+def test_PairListModel_stemsNamed():
+    model = PairListModel()
+    model.setPairs([('a/401.d1.jpg', 'a/401.d2.jpg'),
+                    ('a/4011.d1.jpg', 'a/4011.d2.jpg'),
+                    ('b/401.d1.jpg', 'b/401.d2.jpg')])
+    assert model.stemsNamed('401') == ['a/401', 'b/401']
+    assert model.stemsNamed('40') == []
@@ -0,0 +1,93 @@
+import json
+import os.path as osp
+import threading
+
+from labelus import label_file as label_file_module
+from labelus import prefetch
+from labelus.label_file import LabelFile
+
+from .util import make_image_pair
+
+
+def test_load_pair_data(tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    pair = prefetch.load_pair_data(filename_date1, filename_date2)
+    assert pair.labelFile is None
+    assert pair.image_date1.width() == 40
+    assert pair.image_date2.height() == 30
+    assert pair.nbytes() > len(pair.image_date1Data)
+
+
+def test_load_pair_data_image_size(tmpdir, monkeypatch):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    label_file = osp.join(str(tmpdir), '401.json')
+    LabelFile().save(
+        filename=label_file,
+        shapes=[],
+        image_date1Path=osp.basename(filename_date1),
+        image_date2Path=osp.basename(filename_date2),
+        imageHeight=30,
+        imageWidth=41,
+    )
+    errors = []
+    monkeypatch.setattr(label_file_module.logger, 'error', errors.append)
+    pair = prefetch.load_pair_data(filename_date1, filename_date2, label_file)
+    assert pair.image_date1.width() == 40
+    # the size of both images was checked, the width does not match
+    assert len(errors) == 2
+
+
+def test_PairPrefetcher(qtbot, tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    label_file = osp.join(str(tmpdir), '401.json')
+
+    prefetcher = prefetch.PairPrefetcher(memory_budget=1024 * 1024)
+    prefetcher.prefetch([(filename_date1, filename_date2, label_file)])
+    qtbot.waitUntil(lambda: prefetcher.nbytes > 0)
+
+    # a label file written after prefetching makes the pair stale
+    with open(label_file, 'w') as f:
+        json.dump({}, f)
+    assert prefetcher.take(filename_date1, filename_date2, label_file) \
+        is None
+    assert prefetcher.nbytes == 0
+
+
+def test_PairPrefetcher_memory_budget(qtbot, tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+
+    prefetcher = prefetch.PairPrefetcher(memory_budget=1)
+    prefetcher.prefetch([(filename_date1, filename_date2, None)])
+    qtbot.waitUntil(lambda: not prefetcher._pending)
+    assert prefetcher.take(filename_date1, filename_date2) is None
+
+
+def test_PairPrefetcher_cancel_in_flight(qtbot, tmpdir, monkeypatch):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    load_pair_data = prefetch.load_pair_data
+
+    def load_blocked(*args):
+        calls.append(args)
+        started.set()
+        release.wait()
+        return load_pair_data(*args)
+
+    monkeypatch.setattr(prefetch, 'load_pair_data', load_blocked)
+    prefetcher = prefetch.PairPrefetcher(memory_budget=1024 * 1024)
+    prefetcher.prefetch([(filename_date1, filename_date2, None)])
+    assert started.wait(5)
+
+    # the pair being decoded is neither forgotten nor decoded again
+    prefetcher.cancel()
+    prefetcher.prefetch([(filename_date1, filename_date2, None)])
+    threading.Timer(0.1, release.set).start()
+    pair = prefetcher.take(filename_date1, filename_date2)
+    assert pair.image_date1.width() == 40
+    assert len(calls) == 1
+    qtbot.waitUntil(lambda: prefetcher._pool.activeThreadCount() == 0)
+    qtbot.wait(50)
+    assert not prefetcher._pending
+    assert prefetcher.nbytes == 0
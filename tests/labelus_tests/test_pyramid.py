@@ -0,0 +1,76 @@
+import json
+import os
+import os.path as osp
+
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.prefetch import load_pair_data
+from labelus.pyramid import PyramidCache
+import labelus.pyramid
+
+from .util import make_image_pair
+
+
+def test_PyramidCache_load(tmpdir, monkeypatch):
+    filename, _ = make_image_pair(str(tmpdir), height=700, width=1000)
+    cache = PyramidCache(cache_dir=osp.join(str(tmpdir), 'cache'),
+                         min_pixels=1, tile_size=256)
+
+    pyramid = cache.load(filename)
+    assert pyramid.size() == QtCore.QSize(1000, 700)
+    assert pyramid.levels == [(1000, 700), (500, 350), (250, 175)]
+    assert pyramid.levelFor(2) == 0
+    assert pyramid.levelFor(0.5) == 1
+    assert pyramid.levelFor(0.1) == 2
+    assert pyramid.tile(0, 3, 2).size() == QtCore.QSize(232, 188)
+
+    # only the tiles in the drawn area are read
+    image = QtGui.QImage(100, 100, QtGui.QImage.Format_RGB32)
+    painter = QtGui.QPainter(image)
+    painter.scale(0.5, 0.5)
+    pyramid.draw(painter, QtCore.QRectF(600, 0, 200, 200), 0.5)
+    painter.end()
+    assert pyramid.byteCount() > 0
+    assert (1, 1, 0) in pyramid._tiles
+    assert (1, 0, 0) not in pyramid._tiles
+
+    # built only once
+    built = []
+    monkeypatch.setattr(labelus.pyramid, 'build_pyramid',
+                        lambda *args: built.append(args))
+    assert cache.load(filename).levels == pyramid.levels
+    assert built == []
+
+
+def test_PyramidCache_small_image(tmpdir):
+    filename_date1, filename_date2 = make_image_pair(str(tmpdir))
+    cache = PyramidCache(cache_dir=str(tmpdir), min_pixels=10000)
+    assert cache.load(filename_date1) is None
+
+    pair = load_pair_data(filename_date1, filename_date2)
+    assert isinstance(pair.image_date1, QtGui.QImage)
+
+
+def test_PyramidCache_evict(tmpdir):
+    cache_dir = osp.join(str(tmpdir), 'cache')
+    filename_date1, filename_date2 = make_image_pair(
+        str(tmpdir), height=700, width=1000)
+    cache = PyramidCache(cache_dir=cache_dir, min_pixels=1, tile_size=256)
+
+    # a new version of an image replaces the pyramid of the previous one
+    old = cache.dirname(filename_date1)
+    cache.load(filename_date1)
+    stat = os.stat(filename_date1)
+    os.utime(filename_date1, (stat.st_atime, stat.st_mtime + 10))
+    new = cache.dirname(filename_date1)
+    cache.load(filename_date1)
+    assert os.listdir(cache_dir) == [osp.basename(new)]
+    assert not osp.exists(old)
+
+    # beyond the budget, the least recently used pyramids are removed
+    with open(osp.join(new, 'pyramid.json')) as f:
+        cache.disk_bytes = json.load(f)['nbytes'] + 1
+    cache.load(filename_date2)
+    assert os.listdir(cache_dir) == [osp.basename(
+        cache.dirname(filename_date2))]
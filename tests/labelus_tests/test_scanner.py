@@ -0,0 +1,130 @@
+import os
+import os.path as osp
+import threading
+
+import labelus.scanner
+from labelus.scanner import PairScanner
+from labelus.scanner import ScanManifest
+from labelus.scanner import scan_dir_pairs
+from labelus.scanner import scan_pairs
+
+
+def _touch(*paths):
+    for path in paths:
+        if not osp.exists(osp.dirname(path)):
+            os.makedirs(osp.dirname(path))
+        open(path, 'w').close()
+
+
+def _make_tree(root):
+    _touch(
+        osp.join(root, '2.d1.jpg'), osp.join(root, '2.d2.jpg'),
+        osp.join(root, '1.d1.png'), osp.join(root, '1.d2.png'),
+        osp.join(root, '3.d1.jpg'),  # no date2
+        osp.join(root, 'notes.txt'),
+        osp.join(root, 'sub', '4.d1.jpg'), osp.join(root, 'sub', '4.d2.jpg'),
+        osp.join(root, 'sub', '4.json'),
+    )
+
+
+def test_scan_pairs(tmpdir):
+    root = str(tmpdir)
+    _make_tree(root)
+    result = list(scan_pairs(root, ['.jpg', '.png']))
+    assert result == [
+        ([(osp.join(root, '1.d1.png'), osp.join(root, '1.d2.png')),
+          (osp.join(root, '2.d1.jpg'), osp.join(root, '2.d2.jpg'))],
+         [False, False]),
+        ([(osp.join(root, 'sub', '4.d1.jpg'),
+           osp.join(root, 'sub', '4.d2.jpg'))],
+         [True]),
+    ]
+
+    label_dir = osp.join(root, 'labels')
+    _touch(osp.join(label_dir, '2.json'))
+    checked = [c for _, dir_checked in scan_pairs(root, ['.jpg', '.png'],
+                                                  label_dir=label_dir)
+               for c in dir_checked]
+    assert checked == [False, True, False]
+
+    cancelled = threading.Event()
+    cancelled.set()
+    assert list(scan_pairs(root, ['.jpg'], cancelled=cancelled)) == []
+
+    dirs = []
+    list(scan_pairs(root, ['.jpg'], dirs=dirs))
+    assert dirs == [root, label_dir, osp.join(root, 'sub')]
+
+
+def test_scan_dir_pairs(tmpdir):
+    root = str(tmpdir)
+    _make_tree(root)
+    subdirs, pairs, checked = scan_dir_pairs(
+        osp.join(root, 'sub'), ['.jpg'], label_files=set(['5.json']))
+    assert subdirs == []
+    assert pairs == [(osp.join(root, 'sub', '4.d1.jpg'),
+                      osp.join(root, 'sub', '4.d2.jpg'))]
+    assert checked == [False]
+    subdirs, pairs, checked = scan_dir_pairs(root, ['.jpg', '.png'])
+    assert subdirs == [osp.join(root, 'sub')]
+    assert len(pairs) == 2
+
+
+def test_PairScanner(qtbot, tmpdir):
+    root = str(tmpdir)
+    _make_tree(root)
+    scanner = PairScanner(batch_size=1)
+    found = []
+    scanner.found.connect(lambda pairs, checked: found.extend(pairs))
+    with qtbot.waitSignal(scanner.finished):
+        scanner.scan(root, ['.jpg', '.png'])
+    assert len(found) == 3
+
+    # several directories at once
+    del found[:]
+    subdir = osp.join(root, 'sub')
+    with qtbot.waitSignal(scanner.finished):
+        scanner.scan([subdir, osp.join(root, 'missing')], ['.jpg'])
+    assert found == [(osp.join(subdir, '4.d1.jpg'),
+                      osp.join(subdir, '4.d2.jpg'))]
+    assert scanner.dirs == [subdir]
+
+    # batches of a cancelled scan are dropped
+    del found[:]
+    scanner.scan(root, ['.jpg', '.png'])
+    scanner.cancel()
+    scanner.wait()
+    assert found == []
+
+
+def test_scan_pairs_manifest(tmpdir, monkeypatch):
+    root = osp.join(str(tmpdir), 'data')
+    _make_tree(root)
+    filename = osp.join(str(tmpdir), 'cache', 'manifest.json')
+    extensions = ['.jpg', '.png']
+    monkeypatch.setattr(ScanManifest, 'min_age', 0)
+
+    manifest = ScanManifest(filename, root, extensions)
+    manifest.load()
+    expected = list(scan_pairs(root, extensions, manifest=manifest))
+    manifest.save()
+
+    # unchanged directories are not listed again
+    listed = []
+    scan_dir = labelus.scanner._scan_dir
+    monkeypatch.setattr(labelus.scanner, '_scan_dir',
+                        lambda root, ext: listed.append(root) or
+                        scan_dir(root, ext))
+    manifest = ScanManifest(filename, root, extensions)
+    manifest.load()
+    assert list(scan_pairs(root, extensions, manifest=manifest)) == expected
+    assert listed == []
+
+    # a changed directory is
+    _touch(osp.join(root, 'sub', '5.d1.jpg'),
+           osp.join(root, 'sub', '5.d2.jpg'))
+    stat = os.stat(osp.join(root, 'sub'))
+    os.utime(osp.join(root, 'sub'), (stat.st_atime, stat.st_mtime + 10))
+    result = list(scan_pairs(root, extensions, manifest=manifest))
+    assert listed == [osp.join(root, 'sub')]
+    assert len(result[1][0]) == 2
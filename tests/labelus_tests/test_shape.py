@@ -0,0 +1,129 @@
+import numpy as np
+from qtpy import QtCore
+from qtpy import QtGui
+
+import labelus.utils
+from labelus.shape import Shape
+
+
+def _make_shape(points):
+    shape = Shape()
+    for x, y in points:
+        shape.addPoint(QtCore.QPointF(x, y))
+    shape.close()
+    return shape
+
+
+def test_Shape_distances():
+    points = np.random.RandomState(0).uniform(0, 100, (20, 2))
+    shape = _make_shape(points)
+    point = QtCore.QPointF(50, 50)
+
+    vertex_dists = shape.vertexDistances(point)
+    edge_dists = shape.edgeDistances(point)
+    for i in range(len(shape)):
+        assert np.isclose(vertex_dists[i],
+                          labelus.utils.distance(shape[i] - point))
+        line = [shape[i - 1], shape[i]]
+        assert np.isclose(edge_dists[i],
+                          labelus.utils.distancetoline(point, line))
+
+
+def test_Shape_pointsArray():
+    shape = _make_shape([(0, 0), (10, 0), (10, 10)])
+    point = QtCore.QPointF(11, 11)
+    assert shape.nearestVertex(point, epsilon=2) == 2
+    assert shape.nearestEdge(QtCore.QPointF(5, 1), epsilon=2) == 1
+
+    shape.moveBy(QtCore.QPointF(100, 0))
+    shape.moveVertexBy(0, QtCore.QPointF(0, 5))
+    shape.insertPoint(1, QtCore.QPointF(105, 0))
+    expected = [(p.x(), p.y()) for p in shape.points]
+    np.testing.assert_allclose(shape.pointsArray, expected)
+    assert shape.nearestVertex(point, epsilon=2) is None
+
+
+def test_Shape_cached_paths():
+    shape = _make_shape([(0, 0), (10, 0), (10, 10)])
+    path = shape.linePath()
+    assert shape.linePath() is path
+    assert shape.boundingRect() == QtCore.QRectF(0, 0, 10, 10)
+
+    shape.moveBy(QtCore.QPointF(5, 5))
+    assert shape.boundingRect() == QtCore.QRectF(5, 5, 10, 10)
+    assert shape.containsPoint(QtCore.QPointF(14, 6))
+
+    shape.moveVertexBy(2, QtCore.QPointF(10, 0))
+    assert shape.boundingRect() == QtCore.QRectF(5, 5, 20, 10)
+
+    vertex_path = shape.vertexPath()
+    assert shape.vertexPath() is vertex_path
+    shape.highlightVertex(0, Shape.MOVE_VERTEX)
+    assert shape.vertexPath() is not vertex_path
+
+    copied = shape.copy()
+    copied.moveBy(QtCore.QPointF(100, 0))
+    assert shape.boundingRect() == QtCore.QRectF(5, 5, 20, 10)
+    assert copied.boundingRect() == QtCore.QRectF(105, 5, 20, 10)
+
+
+def test_Shape_points_storage():
+    shape = Shape()
+    for i in range(10):
+        shape.addPoint(QtCore.QPointF(i, 2 * i))
+    shape.addPoint(QtCore.QPointF(0, 0))
+    assert shape.isClosed()
+    assert len(shape) == 10
+    assert shape[-1] == QtCore.QPointF(9, 18)
+    assert shape[1:3] == [QtCore.QPointF(1, 2), QtCore.QPointF(2, 4)]
+
+    shape[0] = QtCore.QPointF(-1, -1)
+    assert shape.removePoint(0) == QtCore.QPointF(-1, -1)
+    assert shape.popPoint() == QtCore.QPointF(9, 18)
+    assert len(shape) == 8 and shape[0] == QtCore.QPointF(1, 2)
+
+    shape.points = np.array([[1, 1], [2, 2]])
+    assert shape.points == [QtCore.QPointF(1, 1), QtCore.QPointF(2, 2)]
+    assert not hasattr(shape, '__dict__')
+
+
+def test_Shape_copy():
+    shape = _make_shape([(0, 0), (10, 0), (10, 10)])
+    shape.label = 'a'
+    shape.flags = {'occluded': False}
+    shape.fill_color = QtGui.QColor(1, 2, 3)
+    shape.linePath()
+
+    copied = shape.copy()
+    copied.moveVertexBy(0, QtCore.QPointF(-5, 0))
+    copied.flags['occluded'] = True
+    copied.fill_color.setAlpha(64)
+    copied.label = 'b'
+    assert shape.label == 'a' and shape.flags == {'occluded': False}
+    assert shape.fill_color.alpha() == 255
+    assert copied.line_color is Shape.default_line_color
+    assert shape[0] == QtCore.QPointF(0, 0)
+    assert shape.boundingRect() == QtCore.QRectF(0, 0, 10, 10)
+    assert copied.boundingRect() == QtCore.QRectF(-5, 0, 15, 10)
+
+
+def test_Shape_lodPath(monkeypatch):
+    theta = np.linspace(0, 2 * np.pi, 1000, endpoint=False)
+    shape = _make_shape(np.stack(
+        [500 + 400 * np.cos(theta), 500 + 400 * np.sin(theta)], axis=1))
+    monkeypatch.setattr(Shape, 'scale', 0.05)
+    path = shape.lodPath()
+    assert path.elementCount() < 100
+    assert shape.lodPath() is path
+    # markers are hidden, vertices are 0.13 screen pixels apart
+    assert shape.meanEdgeLength() * Shape.scale < Shape.lod_marker_spacing
+
+    shape.moveBy(QtCore.QPointF(10, 0))
+    assert shape.lodPath() is path
+    assert path.boundingRect().center().x() > 505
+
+    monkeypatch.setattr(Shape, 'scale', 1.0)
+    assert shape.lodPath() is shape.linePath()
+    monkeypatch.setattr(Shape, 'scale', 0.05)
+    shape.moveVertexBy(0, QtCore.QPointF(1, 0))
+    assert shape.lodPath() is not path
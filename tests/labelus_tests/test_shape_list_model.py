@@ -0,0 +1,64 @@
+from qtpy.QtCore import Qt
+
+from labelus.shape import Shape
+from labelus.widgets import LabelListView
+from labelus.widgets import ShapeListModel
+
+
+def _make_model(n_shapes):
+    model = ShapeListModel()
+    shapes = [Shape(label=str(i)) for i in range(n_shapes)]
+    model.appendShapes(shapes)
+    return model, shapes
+
+
+def test_ShapeListModel(qtbot):
+    model, shapes = _make_model(6)
+    assert len(model) == model.rowCount() == 6
+    assert model.data(model.index(2)) == '2'
+    assert model.rowOfShape(shapes[4]) == 4
+    assert model.rowOfShape(Shape()) == -1
+
+    with qtbot.waitSignal(model.visibilityChanged) as blocker:
+        model.setData(model.index(1), Qt.Unchecked, Qt.CheckStateRole)
+    assert blocker.args == [[shapes[1]]]
+    assert model.data(model.index(1), Qt.CheckStateRole) == Qt.Unchecked
+    assert not model.isVisible(shapes[1])
+
+    # one run of rows, then several runs
+    model.removeShapes([shapes[2], shapes[3]])
+    assert model.shapes() == [shapes[0], shapes[1], shapes[4], shapes[5]]
+    model.removeShapes([shapes[0], shapes[5]])
+    assert model.shapes() == [shapes[1], shapes[4]]
+    assert not model.isVisible(shapes[1]) and model.isVisible(shapes[4])
+
+    # undo and redo set the shapes of the canvas
+    model.setShapes([shapes[4], shapes[0], shapes[1]])
+    assert [model.isVisible(s) for s in model.shapes()] == \
+        [True, True, False]
+
+    model.setAllVisible(False)
+    assert not any(model.isVisible(s) for s in model.shapes())
+
+
+def test_ShapeListModel_moveShapes(qtbot):
+    model, shapes = _make_model(5)
+    model.setData(model.index(0), Qt.Unchecked, Qt.CheckStateRole)
+    assert model.moveShapes([0, 2], 4)
+    assert model.shapes() == [shapes[i] for i in [1, 3, 0, 2, 4]]
+    assert model.rowOfShape(shapes[0]) == 2
+    assert model.data(model.index(2), Qt.CheckStateRole) == Qt.Unchecked
+    assert not model.moveShapes([2, 3], 2)
+
+
+def test_LabelListView_selection(qtbot):
+    model, shapes = _make_model(10)
+    view = LabelListView()
+    qtbot.addWidget(view)
+    view.setModel(model)
+
+    view.selectShapes(shapes[2:5] + [shapes[7]])
+    assert view.selectedShapes() == shapes[2:5] + [shapes[7]]
+    assert len(view.selectionModel().selection()) == 2
+    view.selectShapes([shapes[0]])
+    assert view.selectedShapes() == [shapes[0]]
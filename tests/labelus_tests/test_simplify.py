@@ -0,0 +1,26 @@
+import numpy as np
+
+from labelus.utils import simplify_polyline
+
+
+def test_simplify_polyline():
+    # an L with noise below the tolerance
+    t = np.arange(101.0)
+    points = np.stack([np.minimum(t, 50), np.maximum(t - 50, 0)], axis=1)
+    points += 0.1 * np.sin(t)[:, None]
+    np.testing.assert_array_equal(
+        simplify_polyline(points, tolerance=1), [0, 50, 100])
+    assert len(simplify_polyline(points, tolerance=0.01)) > 50
+    np.testing.assert_array_equal(simplify_polyline(points[:2], 1), [0, 1])
+
+
+def test_simplify_polyline_closed():
+    theta = np.linspace(0, 2 * np.pi, 1000, endpoint=False)
+    circle = 100 * np.stack([np.cos(theta), np.sin(theta)], axis=1)
+    indices = simplify_polyline(circle, tolerance=1, closed=True)
+    assert indices[0] == 0 and 10 < len(indices) < 100
+    # the chords stay within the tolerance of the circle
+    kept = circle[indices]
+    chords = np.roll(kept, -1, axis=0) - kept
+    sagitta = 100 - np.sqrt(100 ** 2 - (np.hypot(*chords.T) / 2) ** 2)
+    assert sagitta.max() <= 1
@@ -0,0 +1,32 @@
+from labelus.utils.spatial import GridIndex
+
+
+def test_GridIndex():
+    index = GridIndex(cell_size=10, max_cells=4)
+    index.insert('a', (0, 0, 5, 5))
+    index.insert('b', (12, 12, 18, 18))
+    index.insert('large', (0, 0, 100, 100))
+    assert len(index) == 3
+
+    assert sorted(index.query(3, 3)) == ['a', 'large']
+    assert sorted(index.query(15, 15)) == ['b', 'large']
+    assert sorted(index.query(9, 9, radius=4)) == ['a', 'b', 'large']
+    assert index.query(200, 200) == []
+
+    index.update('a', (50, 50, 55, 55))
+    assert sorted(index.query(3, 3)) == ['large']
+    assert sorted(index.query(52, 52)) == ['a', 'large']
+
+    index.remove('large')
+    index.update('large', (0, 0, 1, 1))  # not registered anymore
+    assert index.query(3, 3) == []
+    assert 'large' not in index
+
+
+def test_GridIndex_intersect():
+    index = GridIndex(cell_size=10)
+    for i in range(10):
+        index.insert(i, (i * 10, 0, i * 10 + 5, 5))
+    assert sorted(index.intersect((16, 0, 31, 1))) == [2, 3]
+    assert sorted(index.intersect((-100, -100, 1000, 1000))) == list(range(10))
+    assert index.intersect((0, 6, 100, 10)) == []
@@ -0,0 +1,78 @@
+from qtpy import QtCore
+
+from labelus.undo import MoveShapes
+from labelus.undo import MoveVertex
+from labelus.undo import SetAttribute
+from labelus.undo import UndoStack
+
+from .util import make_canvas
+
+
+def test_Canvas_undo_delete(qtbot):
+    canvas = make_canvas(qtbot, n_shapes=3, spacing=50)
+    shapes = list(canvas.shapes)
+    assert not canvas.canUndo()
+
+    canvas.selectedShapes = [shapes[0], shapes[2]]
+    canvas.deleteSelected()
+    assert canvas.shapes == [shapes[1]]
+    assert canvas.canUndo()
+
+    canvas.undo()
+    assert canvas.shapes == shapes
+    assert canvas.shapesAt(QtCore.QPointF(110, 20)) == [shapes[2]]
+    assert canvas.canRedo()
+    canvas.redo()
+    assert canvas.shapes == [shapes[1]]
+    assert not canvas.canRedo()
+
+
+def test_Canvas_undo_edits(qtbot):
+    canvas = make_canvas(qtbot, n_shapes=3, spacing=50)
+    shape = canvas.shapes[0]
+    points = list(shape.points)
+
+    canvas.hShape, canvas.hEdge = shape, 1
+    canvas.prevMovePoint = QtCore.QPointF(5, 5)
+    canvas.addPointToEdge()
+    assert len(shape) == 3
+
+    canvas.moveShapesBy([shape], QtCore.QPointF(100, 0))
+    canvas.pushCommand(MoveShapes([shape], QtCore.QPointF(100, 0)))
+    canvas.pushCommand(MoveVertex(shape, 0, shape[0], QtCore.QPointF(0, 0)))
+    canvas.setVertex(shape, 0, QtCore.QPointF(0, 0))
+    canvas.pushCommand(SetAttribute([shape], 'label', ['0'], 'car'))
+    shape.label = 'car'
+    canvas.reorderShapes(canvas.shapes[::-1])
+    assert canvas.shapes[-1] is shape
+
+    for _ in range(3):
+        canvas.undo()
+    assert canvas.shapes[0] is shape
+    assert shape.label == '0'
+    assert shape[0] == points[0] + QtCore.QPointF(100, 0)
+    canvas.undo()
+    canvas.undo()
+    assert shape.points == points
+    assert not canvas.canUndo()
+
+    for _ in range(4):
+        canvas.redo()
+    assert shape.label == 'car'
+    assert shape[0] == QtCore.QPointF(0, 0)
+    assert len(shape) == 3
+
+
+def test_UndoStack_max_bytes(qtbot):
+    canvas = make_canvas(qtbot, n_shapes=5000, spacing=50)
+    stack = UndoStack(max_bytes=MoveVertex.nbytes * 10)
+    shape = canvas.shapes[0]
+    for i in range(20):
+        stack.push(MoveVertex(shape, 0, shape[0], shape[0]))
+    # recording an edit does not depend on the number of shapes
+    assert len(stack) == 10
+    assert stack.nbytes == MoveVertex.nbytes * 10
+    stack.undo(canvas)
+    stack.push(MoveVertex(shape, 0, shape[0], shape[0]))
+    assert not stack.canRedo()
+    assert stack.nbytes == MoveVertex.nbytes * 10
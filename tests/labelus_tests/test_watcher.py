@@ -0,0 +1,22 @@
+import os.path as osp
+
+from labelus.watcher import DirectoryWatcher
+
+
+def test_DirectoryWatcher(qtbot, tmpdir):
+    root = str(tmpdir)
+    watcher = DirectoryWatcher(delay=50)
+    watcher.addDirectories([root])
+    assert watcher.directories() == [root]
+
+    # several changes are reported once
+    changes = []
+    watcher.changed.connect(changes.append)
+    with qtbot.waitSignal(watcher.changed):
+        for i in range(3):
+            open(osp.join(root, '{}.json'.format(i)), 'w').close()
+    qtbot.wait(100)
+    assert changes == [set([root])]
+
+    watcher.clear()
+    assert watcher.directories() == []
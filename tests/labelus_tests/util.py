@@ -0,0 +1,47 @@
+import os.path as osp
+
+import numpy as np
+import PIL.Image
+from qtpy import QtCore
+from qtpy import QtGui
+
+from labelus.shape import Shape
+from labelus.widgets.canvas import Canvas
+
+
+here = osp.dirname(osp.abspath(__file__))
+data_dir = osp.join(here, 'data')
+
+
+def make_image_pair(dirpath, stem='401', height=30, width=40):
+    filenames = []
+    for date in ['d1', 'd2']:
+        filename = osp.join(dirpath, '{}.{}.jpg'.format(stem, date))
+        img = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+        PIL.Image.fromarray(img).save(filename)
+        filenames.append(filename)
+    return filenames
+
+
+def make_rectangle(label, x):
+    shape = Shape(label=label, shape_type='rectangle')
+    shape.addPoint(QtCore.QPointF(x, 10))
+    shape.addPoint(QtCore.QPointF(x + 20, 30))
+    shape.close()
+    return shape
+
+
+def make_canvas(qtbot, n_shapes=10, spacing=100):
+    """Return a 200x200 canvas at scale 1 over a black 1000x1000 image, with
+    `n_shapes` 20x20 rectangles `spacing` apart along y=10.
+    """
+    canvas = Canvas()
+    qtbot.addWidget(canvas)
+    pixmap = QtGui.QPixmap(1000, 1000)
+    pixmap.fill(QtCore.Qt.black)
+    canvas.scale = 1.0
+    canvas.loadPixmap(pixmap, 'date1')
+    canvas.resize(200, 200)
+    canvas.loadShapes([make_rectangle(str(i), i * spacing)
+                       for i in range(n_shapes)])
+    return canvas